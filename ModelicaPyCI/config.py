@@ -36,6 +36,7 @@ class ResultConfig(BaseModelNoExtra):
     check_result_dir: str = 'Dymola_check'
     naming_violation_file: str = "naming_violations.txt"
     OM_check_result_dir: str = "OM_check"
+    result_store_file: str = "check_results.sqlite"
 
 
 class FilesConfig(BaseModelNoExtra):
@@ -62,6 +63,8 @@ class PlotConfig(BaseModelNoExtra):
     templates_chart_file: str = 'MoCITempGen/templates/google_templates/google_chart.txt'
     templates_index_file: str = 'MoCITempGen/templates/google_templates/index.txt'
     templates_layout_file: str = 'MoCITempGen/templates/google_templates/layout_index.txt'
+    # Maximal number of points of a trace in the charts, 0 plots all points
+    max_points_per_trace: int = 2000
 
 
 class ArtifactsConfig(BaseModelNoExtra):
@@ -76,6 +79,47 @@ class InteractConfig(BaseModelNoExtra):
     update_ref_file: str = 'update_ref.txt'
 
 
+class CacheConfig(BaseModelNoExtra):
+    dir: str = 'cache'
+    library_index_file: str = 'library_index.json'
+    check_result_dir: str = 'check_results'
+    check_result_max_size_mb: float = 500
+    html_tidy_file: str = 'html_tidy_sections.json'
+    html_tidy_max_entries: int = 50000
+    naming_verdict_file: str = 'naming_verdicts.json'
+    naming_verdict_max_entries: int = 200000
+    reference_result_dir: str = 'reference_results'
+
+
+class RetryConfig(BaseModelNoExtra):
+    # Failed checks or simulations are only repeated if the log contains one of these signatures.
+    # Keep them specific: model errors, e.g. a missing table file, must not be retried.
+    transient_signatures: list = [
+        # License checkout of Dymola
+        "Failed to check out a license",
+        "Cannot connect to license server system",
+        "License server machine is down or not responding",
+        "Licensed number of users already reached",
+        # Files locked by another Dymola instance or a running dymosim
+        "being used by another process",
+        "Text file busy",
+        "cannot open output file dymosim",
+    ]
+    max_attempts: int = 3
+    backoff_seconds: float = 5
+    backoff_factor: float = 2
+
+
+class LicenseConfig(BaseModelNoExtra):
+    # State of the license server shared by the CI jobs of one runner, default is in the temp directory
+    lock_file: str = ""
+    min_poll_seconds: float = 5
+    max_poll_seconds: float = 180
+    # Licenses of starting Dymola instances are not yet visible on the server
+    claim_seconds: float = 120
+    max_wait_seconds: float = 1800
+
+
 class CIConfig(BaseModelNoExtra):
     library_root: str = ""
     dir: str = "ci"
@@ -85,6 +129,9 @@ class CIConfig(BaseModelNoExtra):
     artifacts: ArtifactsConfig = ArtifactsConfig()
     interact: InteractConfig = InteractConfig()
     plots: PlotConfig = PlotConfig()
+    cache: CacheConfig = CacheConfig()
+    retry: RetryConfig = RetryConfig()
+    license: LicenseConfig = LicenseConfig()
     naming_guideline_file: str = "naming_guideline.toml"
 
     def get_file_path(self, files_type, file_name, different_library_root: Path = None) -> Path:
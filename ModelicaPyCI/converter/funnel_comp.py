@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from ModelicaPyCI.utils import logger
+
+# Results of the funnel comparison of buildingspy in each folder of funnel_comp
+FUNNEL_FILES = ("reference", "test", "errors")
+
+
+def get_funnel_folders(funnel_path: Union[str, Path]):
+    """
+    Scan the funnel_comp directory once.
+    The folders are named e.g. AixLib.Fluid.Examples.Pipe.mat_pipe.port_a.m_flow
+    Returns:
+        folders (): dict with the folder of each (model, variable)
+    """
+    folders = {}
+    if not os.path.isdir(funnel_path):
+        return folders
+    with os.scandir(funnel_path) as entries:
+        for entry in entries:
+            model, sep, variable = entry.name.partition(".mat_")
+            if entry.is_dir() and sep:
+                folders[(model, variable)] = Path(entry.path)
+    return folders
+
+
+def load_funnel_comp(funnel_path: Union[str, Path], variables: list = None, n_workers: int = None):
+    """
+    Read the csv files of the funnel comparison with parallel threads.
+    Args:
+        funnel_path (): funnel_comp directory of the regression test
+        variables (): list of (model, variable) to read, default are all folders
+        n_workers (): number of threads, default of ThreadPoolExecutor if None
+    Returns:
+        df (): DataFrame with the columns file (reference, test or errors), x and y,
+            indexed by model and variable.
+    """
+    folders = get_funnel_folders(funnel_path=funnel_path)
+    if variables is not None:
+        missing = [key for key in variables if key not in folders]
+        for model, variable in missing:
+            logger.error(f'Cant find folder for model {model} and variable {variable} in {funnel_path}')
+        folders = {key: folders[key] for key in variables if key in folders}
+    csv_files = [
+        (key, file, folder.joinpath(f"{file}.csv"))
+        for key, folder in folders.items()
+        for file in FUNNEL_FILES
+        if os.path.isfile(folder.joinpath(f"{file}.csv"))
+    ]
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        frames = list(executor.map(lambda item: read_funnel_csv(item[2]), csv_files))
+    frames = [
+        (key, file, frame) for (key, file, _), frame in zip(csv_files, frames) if frame is not None
+    ]
+    if not frames:
+        return pd.DataFrame(
+            {"file": [], "x": [], "y": []},
+            index=pd.MultiIndex.from_tuples([], names=["model", "variable"])
+        )
+    lengths = [len(frame) for _, _, frame in frames]
+    index = pd.MultiIndex.from_arrays(
+        [
+            np.repeat([model for (model, _), _, _ in frames], lengths),
+            np.repeat([variable for (_, variable), _, _ in frames], lengths)
+        ],
+        names=["model", "variable"]
+    )
+    df = pd.DataFrame({
+        "file": pd.Categorical(np.repeat([file for _, file, _ in frames], lengths), categories=FUNNEL_FILES),
+        "x": np.concatenate([frame["x"].to_numpy(dtype=float) for _, _, frame in frames]),
+        "y": np.concatenate([frame["y"].to_numpy(dtype=float) for _, _, frame in frames]),
+    }, index=index)
+    return df.sort_index(kind="stable")
+
+
+def get_funnel_data(df: pd.DataFrame, model: str, variable: str, file: str):
+    """
+    Returns the x and y values of one file of load_funnel_comp, e.g. the test result of a variable.
+    """
+    if (model, variable) not in df.index:
+        return pd.DataFrame({"x": [], "y": []})
+    data = df.loc[(model, variable)]
+    return data.loc[data["file"] == file, ["x", "y"]].reset_index(drop=True)
+
+
+def read_funnel_csv(csv_file: Path):
+    """
+    Returns the x and y columns of a csv file of the funnel comparison, None if it can not be read.
+    """
+    try:
+        return pd.read_csv(csv_file, usecols=["x", "y"], dtype=float, engine="c")
+    except (pd.errors.EmptyDataError, ValueError) as err:
+        logger.error(f'Could not read {csv_file}: {err}')
+        return None
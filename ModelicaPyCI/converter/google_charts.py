@@ -1,40 +1,57 @@
 import argparse
 import os
-import re
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Union
 
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs
+from ModelicaPyCI.converter.funnel_comp import get_funnel_data, get_funnel_folders, load_funnel_comp, read_funnel_csv
+from ModelicaPyCI.converter.unit_test_log import ModelNameIndex, get_model_name_index, iter_unit_test_failures
 from ModelicaPyCI.load_global_config import CI_CONFIG
 from ModelicaPyCI.structure import config_structure
-from ModelicaPyCI.utils import logger
-from ModelicaPyCI.structure.sort_mo_model import get_models
+from ModelicaPyCI.utils import logger, profile
+from ModelicaPyCI.unittest.reference_result import get_reference_result
 from mako.template import Template
 from plotly.subplots import make_subplots
 
+# plotly.js is written once per chart directory, all charts refer to it.
+PLOTLY_JS_FILE = "plotly.min.js"
+
 
 class PlotCharts:
 
-    def __init__(self, result_path, library):
+    def __init__(self, result_path, library, use_cache: bool = False, n_workers: int = None,
+                 max_points: int = None):
         self.library = library
+        self.use_cache = use_cache
+        self.n_workers = n_workers
+        self.max_points = CI_CONFIG.plots.max_points_per_trace if max_points is None else max_points
         self.f_log = result_path.joinpath("unitTests-dymola.log")
         self.temp_chart_path = Path(CI_CONFIG.plots.chart_dir).joinpath(package)
         self.funnel_path = result_path.joinpath("funnel_comp")
         self.ref_path = Path(self.library).joinpath(CI_CONFIG.artifacts.library_ref_results_dir)
         self.index_html_file = self.temp_chart_path.joinpath("index.html")
 
+    @profile("plot new reference results", category="phase")
     def plot_new_regression_results(self):
         reference_file_list = get_new_reference_files()
         new_ref_list = _check_ref_file(reference_file_list=reference_file_list)
-        for reference_file in new_ref_list:
-            df = load_txt_to_dataframe(file_path=reference_file)
-            reference_file_name = Path(reference_file).stem
-            fig = create_new_reference_plot(df=df, reference_file_name=reference_file_name)
-            output_file = self.temp_chart_path.joinpath(f"{reference_file_name}.html")
-            fig.write_html(output_file)
-            logger.info(f"Plot saved under {output_file}")
+        self._run_plots(
+            function=_plot_new_reference,
+            kwargs_list=[
+                dict(
+                    reference_file=reference_file,
+                    output_file=self.temp_chart_path.joinpath(f"{Path(reference_file).stem}.html"),
+                    use_cache=self.use_cache,
+                    max_points=self.max_points
+                )
+                for reference_file in new_ref_list
+            ]
+        )
 
     def check_folder_path(self):
         if os.path.isdir(self.funnel_path) is False:
@@ -47,20 +64,43 @@ class PlotCharts:
             os.mkdir(self.temp_chart_path)
             logger.info(f'Save plot in {self.temp_chart_path}')
 
+    @profile("plot regression errors", category="phase")
     def plot_regression_errors(self):
-        model_var_list = read_unit_test_log(self.f_log, library=self.library)
+        funnel_models = sorted({model for model, _ in get_funnel_folders(funnel_path=self.funnel_path)})
+        model_var_list = read_unit_test_log(self.f_log, library=self.library, model_names=funnel_models)
         models = group_models_and_variables(model_var_list)
+        funnel_df = load_funnel_comp(funnel_path=self.funnel_path, variables=model_var_list)
+        funnel_data = {model: data for model, data in funnel_df.groupby(level="model")}
 
         logger.info('Plot line chart with different reference results for %s models.', len(models))
-        for model, variables in models.items():
-            fig = create_regression_error_plot(model, variables, funnel_path=self.funnel_path)
-            if fig is None:
-                continue
-            # Save as interactive HTML in the 'plots' folder
-            output_file = self.temp_chart_path.joinpath(f"{model.replace('.', '_')}.html")
-            fig.write_html(output_file)
-            logger.info(f"Plot saved under {output_file}")
+        self._run_plots(
+            function=_plot_regression_error,
+            kwargs_list=[
+                dict(
+                    model=model,
+                    variables=variables,
+                    funnel_data=funnel_data.get(model, funnel_df.iloc[:0]),
+                    # Save as interactive HTML in the 'plots' folder
+                    output_file=self.temp_chart_path.joinpath(f"{model.replace('.', '_')}.html"),
+                    max_points=self.max_points
+                )
+                for model, variables in models.items()
+            ]
+        )
 
+    def _run_plots(self, function, kwargs_list: list):
+        """
+        Create the plots in parallel processes, each call of function writes one html file.
+        """
+        if not kwargs_list:
+            return
+        with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+            futures = [executor.submit(function, **kwargs) for kwargs in kwargs_list]
+            output_files = [future.result() for future in futures]
+        if any(output_file is not None for output_file in output_files):
+            write_plotly_js(chart_path=self.temp_chart_path)
+
+    @profile("create index layout", category="log")
     def create_index_layout(self):
         """
         Create an index layout from a template
@@ -80,6 +120,39 @@ class PlotCharts:
             logger.info(f'Create html file with reference results.')
 
 
+def _plot_regression_error(
+        model: str, variables: list, funnel_data: pd.DataFrame, output_file: Path, max_points: int
+):
+    fig = create_regression_error_plot(model, variables, funnel_data=funnel_data, max_points=max_points)
+    if fig is None:
+        return None
+    write_html(fig=fig, output_file=output_file)
+    return output_file
+
+
+def _plot_new_reference(reference_file: str, output_file: Path, use_cache: bool, max_points: int):
+    df = load_txt_to_dataframe(file_path=reference_file, use_cache=use_cache)
+    fig = create_new_reference_plot(df=df, reference_file_name=Path(reference_file).stem, max_points=max_points)
+    write_html(fig=fig, output_file=output_file)
+    return output_file
+
+
+def write_html(fig, output_file: Path):
+    """
+    Save the figure as interactive html, plotly.js is loaded from the file PLOTLY_JS_FILE
+    in the same directory instead of being embedded in each chart.
+    """
+    fig.write_html(output_file, include_plotlyjs=PLOTLY_JS_FILE)
+    logger.info(f"Plot saved under {output_file}")
+
+
+def write_plotly_js(chart_path: Path):
+    plotly_js_file = Path(chart_path).joinpath(PLOTLY_JS_FILE)
+    if not os.path.isfile(plotly_js_file):
+        with open(plotly_js_file, "w", encoding="utf-8") as file:
+            file.write(get_plotlyjs())
+
+
 def get_new_reference_files():
     new_ref_file = CI_CONFIG.get_file_path("ci_files", "new_create_ref_file")
     if os.path.isfile(new_ref_file) is False:
@@ -99,45 +172,29 @@ def get_new_reference_files():
     return reference_list
 
 
-def read_unit_test_log(f_log, library: str):
+def read_unit_test_log(f_log, library: str, model_names: list = None):
     """
     Read unitTest_log from regressionTest, write variable and model name with difference
+    Args:
+        f_log (): unit test log
+        library (): library name
+        model_names (): models to resolve the names of the log, e.g. of the funnel_comp folders.
+            The models of the library are only searched if a name is not found.
     Returns:
+        model_variable_list (): list of (model, variable)
     """
-    with open(f_log, "r") as log_file:
-        lines = log_file.readlines()
-    model_variable_list = list()
-    all_models = get_models(
-        path=Path().joinpath(library),
-        library=library,
-        simulate_flag=False
-    )
-    for idx, line in enumerate(lines):
-        error_indicator = "Errors during result verification"
-        error_syntax = "*** Error: "
-        if line.startswith(error_syntax) and error_indicator in line:
-            # Convert e.g. "*** Error: BESMod_Examples_DesignOptimization_BESNoDHW.txt: Errors during result verification."
-            # to BESMod_Examples_DesignOptimization_BESNoDHW
-            model = line.replace(error_syntax, "").split(".txt")[0].strip()
-            model = get_model_name_based_on_underscores(name=model, model_names=all_models)
-            for next_line in lines[idx + 1:]:
-                if not next_line.strip().startswith("Absolute error"):
-                    break
-                variable = next_line.strip().split(" ")[-1]
-                model_variable_list.append((model, variable))
-
-    return model_variable_list
-
-
-def get_model_name_based_on_underscores(name: str, model_names: list):
-    parts = name.split("_")
-    joined_model_name = ".".join(parts)
-    if ".".join(parts) in model_names:
-        return joined_model_name
-    model_names_with_underscore = {model.replace("_", "."): model for model in model_names if "_" in model}
-    if joined_model_name not in model_names_with_underscore:
-        raise KeyError(f"Model {name} not found in all models")
-    return model_names_with_underscore[joined_model_name]
+    name_index = get_model_name_index(library=library)
+    name_index.update(model_names or [])
+    return [
+        (failure.model, failure.variable)
+        for failure in iter_unit_test_failures(f_log=f_log, name_index=name_index)
+    ]
+
+
+def get_model_name_based_on_underscores(name: str, model_names: Union[list, ModelNameIndex]):
+    if not isinstance(model_names, ModelNameIndex):
+        model_names = ModelNameIndex(model_names=model_names)
+    return model_names.resolve(name)
 
 
 def _check_ref_file(reference_file_list):
@@ -192,97 +249,33 @@ def get_values(reference_list):
     return time_str, measure_list, measure_len
 
 
-def _read_data(reference_file):
+def _read_data(reference_file, use_cache: bool = False):
     """
     Read Reference results in AixLib\Resources\ReferenceResults\Dymola\…
     Args:
         reference_file ():
+        use_cache (): read the values from the binary cache of the reference file
     Returns:
+        value_list (): rows of the time and the values of all variables
+        legend_list (): names of the variables
     """
-    time_int = list()
-    legend_list = list()
-    value_list = list()
-    distriction_values = {}
-    time_interval_list = list()
-    time_interval_steps = int
-    with open(reference_file, 'r') as ref_file:
-        lines = ref_file.readlines()
-    for line in lines:
-        current_value = list()
-        if line.find("last-generated=") > -1 or line.find("statistics-simulation=") > -1 or line.find(
-                "statistics-initialization=") > -1:
-            continue
-        elif line.find("time=") > -1:
-            time_int = line.split("=")[1]
-            time_int = time_int.split(",")
-            continue
-        if line.find("=") > -1:
-            values = line.split("=")
-            if len(values) < 2:
-                continue
-            legend = values[0]
-            numbers = values[1]
-            time_interval_steps = len(numbers.split(","))
-            distriction_values[legend] = numbers
-            legend_list.append(legend)
-            number = numbers.split(",")
-            for n in number:
-                value = n.replace("[", "").lstrip()
-                value = value.replace("]", "")
-                value = float(value)
-                current_value.append(value)
-            value_list.append(current_value)
-            continue
-    first_time_interval = float((time_int[0].replace("[", "").lstrip()))
-    last_time_interval = float((time_int[len(time_int) - 1].replace("]", "").lstrip()))
-    time_interval = last_time_interval / time_interval_steps
-    time = first_time_interval
-    for step in range(1, time_interval_steps + 1, 1):
-        if time == first_time_interval:
-            time_interval_list.append(time)
-            time = time + time_interval
-        elif step == time_interval_steps:
-            time = time + time_interval
-            time_interval_list.append(time)
-        else:
-            time_interval_list.append(time)
-            time = time + time_interval
-    value_list.insert(0, time_interval_list)
-    value_list = list(map(list, zip(*value_list)))
-    return value_list, legend_list
+    df = get_reference_result(reference_file, use_cache=use_cache)
+    value_list = np.column_stack([df.index.to_numpy(), df.to_numpy()]).tolist()
+    return value_list, list(df.columns)
 
 
 def read_csv_funnel(path):
     """
     Read the different variables from csv_file and test_file
     """
-    csv_file = "reference.csv"
-    test_csv = "test.csv"
-    csv_file = Path(path).joinpath(csv_file)
-    test_csv = Path(path).joinpath(test_csv)
-    try:
-        var_model = pd.read_csv(csv_file)
-        var_test = pd.read_csv(test_csv)
-        temps = var_model[['x', 'y']]
-        d = temps.values.tolist()
-        test_tmp = var_test[['x', 'y']]
-        e = test_tmp.values.tolist()
-        e_list = list()
-        for i in range(0, len(e)):
-            e_list.append((e[i][1]))
-        results = zip(d, e_list)
-        result_set = list(results)
-        value_list = list()
-        for i in result_set:
-            i = str(i)
-            i = i.replace("(", "")
-            i = i.replace("[", "")
-            i = i.replace("]", "")
-            i = i.replace(")", "")
-            value_list.append("[" + i + "]")
-        return value_list
-    except pd.errors.EmptyDataError:
-        logger.error(f'{csv_file} is empty')
+    var_model = read_funnel_csv(Path(path).joinpath("reference.csv"))
+    var_test = read_funnel_csv(Path(path).joinpath("test.csv"))
+    if var_model is None or var_test is None:
+        return None
+    return [
+        f"[{x}, {y}, {y_test}]"
+        for x, y, y_test in zip(var_model["x"].tolist(), var_model["y"].tolist(), var_test["y"].tolist())
+    ]
 
 
 def create_central_index_html(chart_dir: Path, layout_html_file: Path):
@@ -310,7 +303,63 @@ def create_central_index_html(chart_dir: Path, layout_html_file: Path):
         )
 
 
-def create_regression_error_plot(model, variables, funnel_path: Path):
+def downsample(x: np.ndarray, y: np.ndarray, max_points: int, keep: np.ndarray = None):
+    """
+    Select the points of a trace to plot with min/max bucketing: the points are
+    split into max_points / 2 buckets and the minimum and maximum of each bucket
+    are kept, so peaks and steps remain visible. The first and last points and
+    the points in keep, e.g. violations of the funnel, are always kept.
+    Args:
+        x (): x values, only used for the number of points
+        y (): y values
+        max_points (): point budget of the trace, 0 keeps all points
+        keep (): boolean mask of points which must be kept
+    Returns:
+        indices (): sorted indices of the points to plot
+    """
+    n_points = len(x)
+    if max_points <= 0 or n_points <= max_points:
+        return np.arange(n_points)
+    y = np.asarray(y, dtype=float)
+    n_buckets = max(1, max_points // 2)
+    buckets = np.arange(n_points) * n_buckets // n_points
+    # Sorted by bucket and value: the first point of a bucket is its minimum, the last its maximum.
+    order = np.lexsort((y, buckets))
+    bucket_starts = np.flatnonzero(np.diff(buckets[order], prepend=-1))
+    bucket_ends = np.append(bucket_starts[1:], n_points) - 1
+    indices = [order[bucket_starts], order[bucket_ends], [0, n_points - 1]]
+    if keep is not None:
+        indices.append(np.flatnonzero(keep))
+    return np.unique(np.concatenate(indices))
+
+
+def _get_funnel_violations(errors_df: pd.DataFrame, x: np.ndarray):
+    """
+    Returns a mask of the test points around the points at which the test result
+    is outside the funnel, based on the errors.csv of the funnel comparison.
+    errors.csv is written on the grid of the funnel, hence each violation
+    keeps both test points of the interval which contains it.
+    """
+    if errors_df.empty or len(x) == 0:
+        return None
+    violations = errors_df.loc[errors_df["y"] != 0, "x"].to_numpy(dtype=float)
+    upper = np.searchsorted(x, violations, side="right")
+    mask = np.zeros(len(x), dtype=bool)
+    mask[np.clip(upper - 1, 0, len(x) - 1)] = True
+    mask[np.clip(upper, 0, len(x) - 1)] = True
+    return mask
+
+
+def create_regression_error_plot(model, variables, funnel_data: pd.DataFrame, max_points: int = None):
+    """
+    Args:
+        model (): model name
+        variables (): variables with errors
+        funnel_data (): funnel_comp results of the model, see funnel_comp.load_funnel_comp
+        max_points (): point budget per trace, see downsample
+    """
+    if max_points is None:
+        max_points = CI_CONFIG.plots.max_points_per_trace
     # Determine the number of subplots
     n_subplots = len(variables)
 
@@ -318,14 +367,17 @@ def create_regression_error_plot(model, variables, funnel_path: Path):
     fig = make_subplots(rows=n_subplots, cols=1, shared_xaxes=True)  #, vertical_spacing=0.05)
 
     for i, variable in enumerate(variables, 1):
-        folder = funnel_path.joinpath(f"{model}.mat_{variable}")
-        if not os.path.exists(folder):
-            logger.error(f'Cant find folder: {folder} for model {model} and variable {variable}')
+        if (model, variable) not in funnel_data.index:
+            logger.error(f'Cant find funnel_comp results for model {model} and variable {variable}')
             return None
 
         # Read reference and test data
-        ref_df = pd.read_csv(folder.joinpath('reference.csv'))
-        test_df = pd.read_csv(folder.joinpath('test.csv'))
+        ref_df = get_funnel_data(funnel_data, model=model, variable=variable, file="reference")
+        test_df = get_funnel_data(funnel_data, model=model, variable=variable, file="test")
+        errors_df = get_funnel_data(funnel_data, model=model, variable=variable, file="errors")
+        violations = _get_funnel_violations(errors_df=errors_df, x=test_df['x'].to_numpy())
+        ref_df = ref_df.iloc[downsample(x=ref_df['x'], y=ref_df['y'], max_points=max_points)]
+        test_df = test_df.iloc[downsample(x=test_df['x'], y=test_df['y'], max_points=max_points, keep=violations)]
 
         # Add traces for reference and test data
         fig.add_trace(
@@ -370,7 +422,9 @@ def create_regression_error_plot(model, variables, funnel_path: Path):
     return fig
 
 
-def create_new_reference_plot(df: pd.DataFrame, reference_file_name: str):
+def create_new_reference_plot(df: pd.DataFrame, reference_file_name: str, max_points: int = None):
+    if max_points is None:
+        max_points = CI_CONFIG.plots.max_points_per_trace
     # Determine the number of subplots
     n_subplots = len(df.columns)
 
@@ -378,11 +432,13 @@ def create_new_reference_plot(df: pd.DataFrame, reference_file_name: str):
     fig = make_subplots(rows=n_subplots, cols=1, shared_xaxes=True)  #, vertical_spacing=0.05)
 
     for i, variable in enumerate(df.columns, 1):
+        values = df.loc[:, variable]
+        indices = downsample(x=df.index, y=values, max_points=max_points)
         # Read reference and test data
         fig.add_trace(
             go.Scatter(
-                x=df.index,
-                y=df.loc[:, variable],
+                x=df.index[indices],
+                y=values.iloc[indices],
                 name=variable,
                 line=dict(color='blue'),
                 mode='lines+markers',  # Add markers
@@ -408,40 +464,9 @@ def create_new_reference_plot(df: pd.DataFrame, reference_file_name: str):
     return fig
 
 
-def load_txt_to_dataframe(file_path):
-    with open(file_path, 'r') as file:
-        content = file.read()
-
-    # Extract time and variable data
-    pattern = r'(\w+(?:\.\w+)*(?:\[[^\]]+\])?)=\[(.*?)\]'
-    matches = re.findall(pattern, content, re.DOTALL)
-
-    max_lenghts = 0
-    data = {}
-    data_two_points = {}
-    for variable, values in matches:
-        values = [float(v) for v in values.split(',')]
-        new_lenghts = len(values)
-        if new_lenghts == 2:
-            data_two_points[variable] = values
-            continue
-        if max_lenghts == 0:
-            max_lenghts = new_lenghts
-        elif max_lenghts != new_lenghts:
-            raise ValueError("Reference results are not equally sampled")
-        data[variable] = values
-    # Create DataFrame
-    if data:
-        df = pd.DataFrame(data)
-        for col, points in data_two_points.items():
-            df.loc[:, col] = np.NAN
-            df.loc[df.index[0], col] = points[0]
-            df.loc[df.index[-1], col] = points[1]
-    else:
-        df = pd.DataFrame(data_two_points)  # Only two points in all results
-    df = df.interpolate()
-    df = df.set_index("time")
-    logger.info("Found the following columns in .txt files with regex: %s", df.columns)
+def load_txt_to_dataframe(file_path, use_cache: bool = False):
+    df = get_reference_result(file_path, use_cache=use_cache)
+    logger.info("Found the following columns in .txt files: %s", df.columns)
     return df
 
 
@@ -488,6 +513,19 @@ def parse_args():
                                  help="Plot new models with new created reference files",
                                  default=False,
                                  action="store_true")
+    unit_test_group.add_argument("--use-cache",
+                                 help="Read reference results from their binary cache in ci/cache",
+                                 default=False,
+                                 action="store_true")
+    unit_test_group.add_argument("--n-workers",
+                                 help="Number of parallel processes (default: number of cpus)",
+                                 default=None,
+                                 type=int)
+    unit_test_group.add_argument("--max-points",
+                                 help="Maximal number of points per trace, 0 plots all points "
+                                      "(default: plots.max_points_per_trace of the CI config)",
+                                 default=None,
+                                 type=int)
     return parser.parse_args()
 
 
@@ -517,7 +555,10 @@ if __name__ == '__main__':
                         package, result_path)
             continue
         charts = PlotCharts(result_path=result_path,
-                            library=args.library)
+                            library=args.library,
+                            use_cache=args.use_cache,
+                            n_workers=args.n_workers,
+                            max_points=args.max_points)
         delete_folder()
         charts.check_folder_path()
         if args.error_flag is True and args.funnel_comp_flag is True:
@@ -0,0 +1,94 @@
+import os
+from pathlib import Path
+from typing import NamedTuple, Union
+
+from ModelicaPyCI.structure.sort_mo_model import get_models
+
+_ERROR_SYNTAX = "*** Error: "
+_ERROR_INDICATOR = "Errors during result verification"
+_VARIABLE_ERROR = "Absolute error"
+
+_MODEL_NAME_INDICES = {}
+
+
+class UnitTestFailure(NamedTuple):
+    """Variable of a model which failed the result verification of the regression test."""
+    model: str
+    variable: str
+    message: str
+
+
+class ModelNameIndex:
+
+    def __init__(self, model_names: list = None, library: str = None):
+        """
+        Maps the names of reference files, e.g. AixLib_Fluid_Examples_Pipe,
+        to models, e.g. AixLib.Fluid.Examples.Pipe. Models with underscores
+        in their name are found by replacing all underscores with dots.
+        Args:
+            model_names (): known model names
+            library (): if given, all models of the library are added on the first unknown name.
+        """
+        self.library = library
+        self.model_names = set()
+        self.underscore_names = {}
+        self.update(model_names or [])
+
+    def update(self, model_names: list):
+        for model in model_names:
+            self.model_names.add(model)
+            if "_" in model:
+                self.underscore_names[model.replace("_", ".")] = model
+
+    def resolve(self, name: str):
+        model = self._resolve(name)
+        if model is None and self.library is not None:
+            self.update(get_models(path=Path().joinpath(self.library), library=self.library, simulate_flag=False))
+            # The library is only scanned once
+            self.library = None
+            model = self._resolve(name)
+        if model is None:
+            raise KeyError(f"Model {name} not found in all models")
+        return model
+
+    def _resolve(self, name: str):
+        joined_model_name = ".".join(name.split("_"))
+        if joined_model_name in self.model_names:
+            return joined_model_name
+        return self.underscore_names.get(joined_model_name)
+
+
+def get_model_name_index(library: str):
+    """
+    Returns the name index of the library, shared by all logs parsed in this process.
+    """
+    key = os.path.normpath(library)
+    if key not in _MODEL_NAME_INDICES:
+        _MODEL_NAME_INDICES[key] = ModelNameIndex(library=library)
+    return _MODEL_NAME_INDICES[key]
+
+
+def iter_unit_test_failures(f_log: Union[str, Path], name_index: ModelNameIndex):
+    """
+    Read the unit test log of the regression test line by line, e.g.
+    *** Error: AixLib_Fluid_Examples_Pipe.txt: Errors during result verification.
+      Absolute error = 1.2e-02 ... pipe.port_a.m_flow
+    Args:
+        f_log (): unit test log
+        name_index (): index to get the model of a reference file
+    Yields:
+        failure (): one UnitTestFailure for each variable with an error
+    """
+    with open(f_log, "r") as log_file:
+        model = None
+        for line in log_file:
+            if line.startswith(_ERROR_SYNTAX) and _ERROR_INDICATOR in line:
+                # Convert e.g. "*** Error: BESMod_Examples_DesignOptimization_BESNoDHW.txt: Errors during result verification."
+                # to BESMod_Examples_DesignOptimization_BESNoDHW
+                model = name_index.resolve(line.replace(_ERROR_SYNTAX, "").split(".txt")[0].strip())
+                continue
+            line = line.strip()
+            if model is None or not line.startswith(_VARIABLE_ERROR):
+                model = None
+                continue
+            yield UnitTestFailure(model=model, variable=line.split(" ")[-1], message=line)
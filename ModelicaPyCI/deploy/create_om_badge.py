@@ -5,11 +5,10 @@ from pathlib import Path
 
 from ModelicaPyCI.load_global_config import CI_CONFIG
 from ModelicaPyCI.structure import config_structure
+from ModelicaPyCI.unittest.result_store import ResultStore, SUCCESS, WARNING
 
 
 def create_badge(badge_name: str, library: str):
-    import anybadge
-
     website = urllib.request.urlopen(
         f'https://libraries.openmodelica.org/branches/master/{library}/{library}.html'
     )
@@ -37,6 +36,26 @@ def create_badge(badge_name: str, library: str):
     # column indices for "Total" and "Simulation" define where the corresponding values are stored
     om_readiness = round(values[simulate_find[0]] /
                          values[total_find[0]], 2)
+    return write_badge(badge_name=badge_name, om_readiness=om_readiness)
+
+
+def create_badge_from_result_store(badge_name: str, library: str, result_store_file: Path = None):
+    """
+    Create the badge from the simulations of om_check in the result store, using the last run
+    which simulated each package, so packages simulated in separate CI jobs all count.
+    The readiness is the share of successfully simulated models, models with warnings count as successful.
+    """
+    with ResultStore(db_file=result_store_file) as result_store:
+        results = result_store.get_last_results(tool="openmodelica", library=library, option="simulate")
+    if not results:
+        raise ValueError(f"No OpenModelica simulations of {library} in the result store.")
+    n_successful = sum(result.status in (SUCCESS, WARNING) for result in results)
+    om_readiness = round(n_successful / len(results), 2)
+    return write_badge(badge_name=badge_name, om_readiness=om_readiness)
+
+
+def write_badge(badge_name: str, om_readiness: float):
+    import anybadge
 
     # Define thresholds:
     thresholds = {0.6: 'red',
@@ -67,14 +86,27 @@ def parse_args():
         "--main-branch",
         help="your base branch (main) - has no impact anymore"
     )
+    check_test_group.add_argument(
+        "--from-result-store",
+        default=False,
+        action="store_true",
+        help="Use the simulations of the last om_check run in the result store "
+             "instead of the OpenModelica library testing website"
+    )
     return parser.parse_args()
 
 
 if __name__ == '__main__':
     args = parse_args()
-    om_badge_file = create_badge(
-        badge_name=args.om_badge_name,
-        library=args.library
-    )
+    if args.from_result_store:
+        om_badge_file = create_badge_from_result_store(
+            badge_name=args.om_badge_name,
+            library=args.library
+        )
+    else:
+        om_badge_file = create_badge(
+            badge_name=args.om_badge_name,
+            library=args.library
+        )
     config_structure.create_path(CI_CONFIG.get_dir_path("result"))
     shutil.copy(om_badge_file, CI_CONFIG.get_dir_path("result").joinpath(args.om_badge_name))
@@ -0,0 +1,310 @@
+import multiprocessing
+import queue
+import signal
+import sys
+import time
+from pathlib import Path
+
+from ModelicaPyCI.pydyminterface import python_dymola_interface
+from ModelicaPyCI.pydyminterface.license_scheduler import LicenseScheduler
+from ModelicaPyCI.utils import logger
+
+# Seconds a worker gets to close its Dymola instance before it is killed
+_STOP_SECONDS = 60
+
+
+class DymolaWorkerPool:
+
+    def __init__(self,
+                 packages: list,
+                 n_workers: int,
+                 startup_mos: str = None,
+                 dymola_log: Path = None,
+                 max_restarts: int = 2,
+                 license_scheduler: LicenseScheduler = None,
+                 timeout: float = None):
+        """
+        Pool of Dymola processes to check or simulate models in parallel.
+        All workers pull the next model from one shared task queue, so a slow
+        model only blocks its own worker. Results are returned in the order of
+        the given model list.
+        Args:
+            packages (): packages to load in each Dymola instance.
+            n_workers (): number of Dymola instances
+            startup_mos (): Path to possible startup mos
+            dymola_log (): If given, each worker saves its Dymola log next to this file.
+            max_restarts (): How often crashed workers are replaced.
+            license_scheduler (): If given, n_workers is the maximal number of workers.
+                Workers are started as soon as licenses are usable and stopped after
+                their current model if the licenses are needed by others.
+            timeout (): Maximal time in seconds to check or simulate one model. The worker
+                of a model which takes longer is stopped and replaced, the model fails.
+        """
+        self.packages = packages
+        self.n_workers = n_workers
+        self.startup_mos = startup_mos
+        self.dymola_log = dymola_log
+        self.max_restarts = max_restarts
+        self.timeout = timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._task_queue = None
+        self._result_queue = None
+        self._workers = {}
+        self._next_worker_id = 0
+        self._n_restarts = 0
+        self.license_scheduler = license_scheduler
+        self._stop_events = {}
+        # Workers whose license is claimed until they report that Dymola started
+        self._claimed_workers = set()
+        # Seconds from the start to the result of each model of the last call of check_models
+        self.durations = {}
+
+    def check_models(self, dym_models: list, sim_ex_flag: bool):
+        """
+        Check or simulate all models and return the results in the order of dym_models.
+        Each result is a ModelCheckResult, see python_dymola_interface.check_or_simulate
+        """
+        self.durations = {}
+        if not dym_models:
+            return []
+        if not self._workers:
+            self._start_workers()
+        for idx, dym_model in enumerate(dym_models):
+            self._task_queue.put((idx, dym_model, sim_ex_flag))
+        results = {}
+        running = {}
+        start_times = {}
+        while len(results) < len(dym_models):
+            try:
+                message = self._result_queue.get(timeout=self._get_poll_timeout(start_times=start_times))
+            except queue.Empty:
+                pass
+            else:
+                self._handle_message(
+                    message=message, running=running, results=results, start_times=start_times, dym_models=dym_models
+                )
+            self._handle_dead_workers(running=running, results=results, start_times=start_times, dym_models=dym_models)
+            self._handle_timeouts(running=running, results=results, start_times=start_times, dym_models=dym_models)
+            self._scale_workers(n_pending=len(dym_models) - len(results) - len(running), n_running=len(running))
+        return [results[idx] for idx in range(len(dym_models))]
+
+    def _handle_message(self, message: tuple, running: dict, results: dict, start_times: dict, dym_models: list):
+        kind, worker_id, idx, value = message
+        self._release_claim(worker_id=worker_id)
+        if kind == "started":
+            running[worker_id] = idx
+            start_times[idx] = time.monotonic()
+        elif kind == "done":
+            running.pop(worker_id, None)
+            # Results of models which timed out are not overwritten
+            if idx not in results:
+                results[idx] = value
+            if idx in start_times:
+                self.durations[dym_models[idx]] = time.monotonic() - start_times.pop(idx)
+        elif kind == "error":
+            logger.error("Dymola worker %s could not start: %s", worker_id, value)
+            self._remove_worker(worker_id=worker_id)
+            if not self._workers:
+                raise ConnectionError("No Dymola worker could be started.")
+        elif kind == "stopped":
+            logger.info("Stopped Dymola worker %s to free its license.", worker_id)
+            self._remove_worker(worker_id=worker_id)
+
+    def _get_poll_timeout(self, start_times: dict):
+        if self.timeout is None or not start_times:
+            return 10
+        next_deadline = min(start_times.values()) + self.timeout
+        return min(10, max(next_deadline - time.monotonic(), 0.1))
+
+    def close(self):
+        for _ in self._workers:
+            self._task_queue.put(None)
+        for process in self._workers.values():
+            process.join(timeout=_STOP_SECONDS)
+            if process.is_alive():
+                _stop_process(process)
+        for worker_id in list(self._claimed_workers):
+            self._release_claim(worker_id=worker_id)
+        self._workers = {}
+        self._stop_events = {}
+
+    def _start_workers(self):
+        self._task_queue = self._context.Queue()
+        self._result_queue = self._context.Queue()
+        if self.license_scheduler is None:
+            n_workers = self.n_workers
+        else:
+            n_workers = max(1, min(self.n_workers, self.license_scheduler.get_number_of_usable_licenses()))
+        logger.info("Starting %s Dymola workers.", n_workers)
+        for _ in range(n_workers):
+            self._start_worker()
+
+    def _start_worker(self):
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+        if self.dymola_log is None:
+            dymola_log = None
+        else:
+            dymola_log = Path(self.dymola_log)
+            dymola_log = dymola_log.with_name(f"{dymola_log.stem}_{worker_id}{dymola_log.suffix}")
+        process = self._context.Process(
+            target=_dymola_worker,
+            kwargs=dict(
+                worker_id=worker_id,
+                packages=self.packages,
+                startup_mos=self.startup_mos,
+                dymola_log=dymola_log,
+                task_queue=self._task_queue,
+                result_queue=self._result_queue,
+                stop_event=self._stop_events.setdefault(worker_id, self._context.Event())
+            ),
+            daemon=True
+        )
+        if self.license_scheduler is not None:
+            self.license_scheduler.claim()
+            self._claimed_workers.add(worker_id)
+        process.start()
+        self._workers[worker_id] = process
+
+    def _release_claim(self, worker_id: int):
+        if worker_id in self._claimed_workers:
+            self._claimed_workers.remove(worker_id)
+            self.license_scheduler.release()
+
+    def _scale_workers(self, n_pending: int, n_running: int):
+        """
+        Start workers for pending models if licenses are usable and all workers are busy,
+        stop one worker if the licenses are needed by others.
+        Args:
+            n_pending (): number of models which are not started yet
+            n_running (): number of models which are checked at the moment
+        """
+        if self.license_scheduler is None:
+            return
+        n_stopping = sum(event.is_set() for event in self._stop_events.values())
+        n_active = len(self._workers) - n_stopping
+        while (
+                n_active < self.n_workers and n_pending > n_active - n_running and
+                self.license_scheduler.get_number_of_usable_licenses() >= 1
+        ):
+            logger.info("Starting an additional Dymola worker, licenses are available.")
+            self._start_worker()
+            n_active += 1
+        if n_active > 1 and n_stopping == 0 and self.license_scheduler.get_number_of_usable_licenses() < 0:
+            worker_id = max(worker_id for worker_id, event in self._stop_events.items() if not event.is_set())
+            self._stop_events[worker_id].set()
+
+    def _remove_worker(self, worker_id: int):
+        # The worker may already be removed by _handle_dead_workers if it exited before its message was read
+        process = self._workers.pop(worker_id, None)
+        if process is not None:
+            process.join()
+        self._stop_events.pop(worker_id, None)
+
+    def _handle_dead_workers(self, running: dict, results: dict, start_times: dict, dym_models: list):
+        dead_workers = [worker_id for worker_id, process in self._workers.items() if not process.is_alive()]
+        if not dead_workers:
+            return
+        # The messages of a worker are sent before it exits. Reading them first, workers which
+        # stopped or failed to start are removed by their message and not replaced as crashed.
+        while True:
+            try:
+                message = self._result_queue.get_nowait()
+            except queue.Empty:
+                break
+            self._handle_message(
+                message=message, running=running, results=results, start_times=start_times, dym_models=dym_models
+            )
+        for worker_id in dead_workers:
+            process = self._workers.pop(worker_id, None)
+            if process is None:
+                continue
+            process.join()
+            self._stop_events.pop(worker_id, None)
+            self._release_claim(worker_id=worker_id)
+            idx = running.pop(worker_id, None)
+            if idx is not None:
+                start_times.pop(idx, None)
+                msg = f"Dymola worker {worker_id} died while checking {dym_models[idx]}."
+                logger.error(msg)
+                results[idx] = python_dymola_interface.ModelCheckResult(result=msg, attempts=1, cacheable=False)
+            if self._n_restarts < self.max_restarts:
+                self._n_restarts += 1
+                logger.info("Replacing crashed Dymola worker %s.", worker_id)
+                self._start_worker()
+        if not self._workers:
+            raise ConnectionError("All Dymola workers crashed.")
+
+    def _handle_timeouts(self, running: dict, results: dict, start_times: dict, dym_models: list):
+        if self.timeout is None:
+            return
+        now = time.monotonic()
+        for worker_id, idx in list(running.items()):
+            if now - start_times[idx] < self.timeout:
+                continue
+            msg = (
+                f"Check of {dym_models[idx]} took longer than {self.timeout} seconds, "
+                f"stopped Dymola worker {worker_id}."
+            )
+            logger.error(msg)
+            results[idx] = python_dymola_interface.ModelCheckResult(result=msg, attempts=1, cacheable=False)
+            del running[worker_id]
+            start_times.pop(idx)
+            process = self._workers.pop(worker_id, None)
+            self._stop_events.pop(worker_id, None)
+            self._release_claim(worker_id=worker_id)
+            if process is not None:
+                _stop_process(process)
+            # A model which hangs is no crash of the worker, hence it is always replaced
+            self._start_worker()
+
+
+def _stop_process(process):
+    """
+    Terminate the worker, so it closes its Dymola instance, and kill it if it does not exit in time.
+    """
+    process.terminate()
+    process.join(timeout=_STOP_SECONDS)
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+
+def _raise_system_exit(signum, frame):
+    sys.exit(1)
+
+
+def _dymola_worker(worker_id: int,
+                   packages: list,
+                   startup_mos: str,
+                   dymola_log: Path,
+                   task_queue,
+                   result_queue,
+                   stop_event):
+    # Terminating the worker closes Dymola in the finally clause, also during a check
+    signal.signal(signal.SIGTERM, _raise_system_exit)
+    try:
+        dymola_api = python_dymola_interface.load_dymola_api(
+            packages=packages, startup_mos=startup_mos, min_number_of_unused_licences=0
+        )
+    except Exception as err:
+        result_queue.put(("error", worker_id, None, str(err)))
+        return
+    try:
+        while True:
+            if stop_event.is_set():
+                result_queue.put(("stopped", worker_id, None, None))
+                break
+            task = task_queue.get()
+            if task is None:
+                break
+            idx, dym_model, sim_ex_flag = task
+            result_queue.put(("started", worker_id, idx, None))
+            result = python_dymola_interface.check_or_simulate(
+                dict(dymola_api=dymola_api, dym_model=dym_model, sim_ex_flag=sim_ex_flag)
+            )
+            result_queue.put(("done", worker_id, idx, result))
+        if dymola_log is not None:
+            dymola_api.dymola.savelog(f'{dymola_log}')
+    finally:
+        dymola_api.close()
@@ -0,0 +1,239 @@
+import json
+import os
+import random
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from ModelicaPyCI.load_global_config import CI_CONFIG
+from ModelicaPyCI.utils import logger, profile
+
+try:
+    import fcntl
+except ImportError:  # Windows, the jobs do not share the license state
+    fcntl = None
+
+_LICENSE_LINE_START = "Users of DymolaStandard:  "
+
+_LICENSE_SCHEDULERS = {}
+
+
+def get_number_of_unused_licenses(url, port):
+    try:
+        licenses = subprocess.run(
+            ["lmutil", "lmstat", "-c", f"{port}@{url}", "-a"],
+            capture_output=True, text=True, timeout=60
+        ).stdout
+    except (OSError, subprocess.TimeoutExpired) as err:
+        logger.error("Could not query the license server: %s", err)
+        return 0
+    for line in licenses.split("\n"):
+        if not line.startswith(_LICENSE_LINE_START):
+            continue
+        # line = "(Total of 93 licenses issued;  Total of 36 licenses in use)"
+        for delete in [
+            _LICENSE_LINE_START, "Total of", "licenses", "issued",
+            "in", "use", "(", ")", " "
+        ]:
+            line = line.replace(delete, "")
+        # line = "93;36"
+        num_licenses, num_in_use = line.split(";")
+        return int(num_licenses) - int(num_in_use)
+    logger.error("Could not find line '%s' in content %s", _LICENSE_LINE_START, licenses)
+    return 0
+
+
+class LicenseScheduler:
+
+    def __init__(self, url: str, port: int, min_number_of_unused_licences: int = 1):
+        """
+        Polls the number of unused Dymola licenses in a background thread.
+        The poll interval starts at CI_CONFIG.license.min_poll_seconds and is doubled,
+        up to max_poll_seconds, as long as the number does not change.
+        The CI jobs of one runner share the last poll and their claims of starting
+        Dymola instances through a lock file, so only one job queries the server
+        at a time and waiting jobs do not all start Dymola on the same free license.
+        Args:
+            url (): url of the license server
+            port (): port of the license server
+            min_number_of_unused_licences (): licenses to keep unused for real users,
+                see python_dymola_interface.load_dymola_api
+        """
+        self.url = url
+        self.port = port
+        self.min_number_of_unused_licences = int(min_number_of_unused_licences)
+        if CI_CONFIG.license.lock_file:
+            self.lock_file = Path(CI_CONFIG.license.lock_file)
+        else:
+            self.lock_file = Path(tempfile.gettempdir()).joinpath(f"modelicapyci_dymola_licenses_{port}_{url}.json")
+        self._claim_id = f"{socket.gethostname()}_{os.getpid()}"
+        self._n_unused = None
+        self._n_claimed = 0
+        self._condition = threading.Condition()
+        self._poll_requested = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def get_number_of_unused_licenses(self):
+        """
+        Returns the number of unused licenses of the last poll, waits for the first poll.
+        """
+        self._start()
+        with self._condition:
+            self._condition.wait_for(lambda: self._n_unused is not None)
+            return self._n_unused
+
+    def get_number_of_usable_licenses(self):
+        """
+        Returns the unused licenses which are neither claimed by other jobs nor
+        kept free for real users. Negative if licenses should be released.
+        """
+        self._start()
+        with self._condition:
+            self._condition.wait_for(lambda: self._n_unused is not None)
+            return self._get_number_of_usable_licenses()
+
+    def wait_for_licenses(self, n_licenses: int = 1, timeout: float = None):
+        """
+        Block until n_licenses are usable. Returns the number of usable licenses.
+        Raises:
+            TimeoutError: if the licenses are not usable within timeout seconds
+        """
+        self._start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with profile("Dymola license", category="license"):
+            with self._condition:
+                while True:
+                    if self._n_unused is not None:
+                        n_usable = self._get_number_of_usable_licenses()
+                        if n_usable >= n_licenses:
+                            return n_usable
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"{n_licenses} Dymola licenses were not available within {timeout} s.")
+                    self._condition.wait(timeout=remaining)
+
+    def request_poll(self):
+        """
+        Poll the server again as soon as possible, e.g. if Dymola could not get a license.
+        """
+        self._start()
+        self._poll_requested.set()
+
+    def claim(self, n_licenses: int = 1):
+        """
+        Claim licenses for Dymola instances which are starting, until they are
+        released or claim_seconds passed. Claimed licenses are not usable for other
+        instances of all jobs, as they are not yet in use on the license server.
+        """
+        self._update_state(claim=n_licenses)
+
+    def release(self, n_licenses: int = 1):
+        """
+        Release claimed licenses once the Dymola instances got their license or failed to start.
+        """
+        self._update_state(claim=-n_licenses)
+        self.request_poll()
+
+    def close(self):
+        self._closed = True
+        self._poll_requested.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _get_number_of_usable_licenses(self):
+        return self._n_unused - self._n_claimed - max(self.min_number_of_unused_licences - 1, 0)
+
+    def _start(self):
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._poll, name="dymola-license-poll", daemon=True)
+            self._thread.start()
+
+    def _poll(self):
+        interval = CI_CONFIG.license.min_poll_seconds
+        while not self._closed:
+            n_unused = self._n_unused
+            self._update_state()
+            if self._n_unused != n_unused:
+                interval = CI_CONFIG.license.min_poll_seconds
+            else:
+                interval = min(interval * 2, CI_CONFIG.license.max_poll_seconds)
+            # The jitter keeps the jobs of a runner from polling in lockstep
+            self._poll_requested.wait(timeout=interval * random.uniform(0.8, 1.2))
+            self._poll_requested.clear()
+
+    def _update_state(self, claim: int = 0):
+        """
+        Change the claims of this process and query the server if no job did in the last
+        min_poll_seconds. The server is queried outside of the file lock, so the claims
+        of the other jobs are not blocked by a slow license server.
+        """
+        state, query_server = self._modify_state(claim=claim, reserve_query=claim == 0)
+        if query_server:
+            n_unused = get_number_of_unused_licenses(url=self.url, port=self.port)
+            state, _ = self._modify_state(n_unused=n_unused)
+        with self._condition:
+            if "n_unused" in state:
+                self._n_unused = state["n_unused"]
+            self._n_claimed = sum(n_claimed for _, n_claimed in state["claims"].values())
+            self._condition.notify_all()
+
+    def _modify_state(self, claim: int = 0, reserve_query: bool = False, n_unused: int = None):
+        """
+        Read, modify and write the state shared by the jobs under the file lock.
+        Returns:
+            state (): the new state
+            query_server (): True if this job reserved the next query of the server
+        """
+        os.makedirs(self.lock_file.parent, exist_ok=True)
+        query_server = False
+        with open(self.lock_file, "a+") as file:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            try:
+                file.seek(0)
+                try:
+                    state = json.loads(file.read() or "{}")
+                except ValueError:
+                    state = {}
+                now = time.time()
+                claims = {
+                    claim_id: value for claim_id, value in state.get("claims", {}).items()
+                    if value[0] > now and value[1] > 0
+                }
+                if claim != 0:
+                    n_claimed = claims.get(self._claim_id, (0, 0))[1]
+                    claims[self._claim_id] = (now + CI_CONFIG.license.claim_seconds, n_claimed + claim)
+                if n_unused is not None:
+                    state["n_unused"] = n_unused
+                    state["time"] = now
+                elif reserve_query and (
+                        now - state.get("time", 0) >= CI_CONFIG.license.min_poll_seconds or "n_unused" not in state
+                ):
+                    # The other jobs use the last poll while this job queries the server
+                    state["time"] = now
+                    query_server = True
+                state["claims"] = {claim_id: value for claim_id, value in claims.items() if value[1] > 0}
+                file.seek(0)
+                file.truncate()
+                json.dump(state, file)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+        return state, query_server
+
+
+def get_license_scheduler(url: str, port: int, min_number_of_unused_licences: int = 1):
+    """
+    Returns the license scheduler of the server, shared by all Dymola instances of this process.
+    """
+    key = (url, int(port), int(min_number_of_unused_licences))
+    if key not in _LICENSE_SCHEDULERS:
+        _LICENSE_SCHEDULERS[key] = LicenseScheduler(
+            url=url, port=port, min_number_of_unused_licences=min_number_of_unused_licences
+        )
+    return _LICENSE_SCHEDULERS[key]
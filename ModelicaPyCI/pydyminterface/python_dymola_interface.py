@@ -1,12 +1,18 @@
 import os
+import random
 import sys
 import time
 from pathlib import Path
 import multiprocessing
+from typing import NamedTuple, Union
 
 from ebcpy import DymolaAPI
 
-from ModelicaPyCI.utils import logger
+from ModelicaPyCI.load_global_config import CI_CONFIG
+from ModelicaPyCI.pydyminterface.license_scheduler import (
+    LicenseScheduler, get_license_scheduler, get_number_of_unused_licenses
+)
+from ModelicaPyCI.utils import compile_exceptions, logger, profile
 
 
 def load_dymola_api(
@@ -18,27 +24,50 @@ def load_dymola_api(
     min_number_of_unused_licences = int(min_number_of_unused_licences)
     if min_number_of_unused_licences > 0:
         check_enough_licenses_available(min_number_of_unused_licences=min_number_of_unused_licences)
-    dymola_api = _start_dymola_api(
-        packages=packages, startup_mos=startup_mos, use_mp=use_mp
-    )
-    logger.info(f'Using Dymola port {str(dymola_api.dymola._portnumber)}.')
-
-    lic_counter = 0
-    dym_sta_lic_available = dymola_api.license_is_available()
-    while not dym_sta_lic_available:
-        logger.error('No Dymola License is available. Check Dymola license after 15 seconds')
-        dymola_api.close()
-        time.sleep(15)
+        license_scheduler = get_dymola_license_scheduler(min_number_of_unused_licences=min_number_of_unused_licences)
+        # Other jobs do not count on the license while Dymola starts
+        license_scheduler.claim()
+    else:
+        license_scheduler = None
+    try:
         dymola_api = _start_dymola_api(
-            packages=packages, startup_mos=startup_mos
+            packages=packages, startup_mos=startup_mos, use_mp=use_mp
         )
-        dym_sta_lic_available = dymola_api.license_is_available()
-        lic_counter += 1
-        if lic_counter > 60:
-            logger.error(f'There are currently no available Dymola licenses available. Please try again later.')
+        logger.info(f'Using Dymola port {str(dymola_api.dymola._portnumber)}.')
+
+        deadline = time.monotonic() + CI_CONFIG.license.max_wait_seconds
+        delay = CI_CONFIG.license.min_poll_seconds
+        while not dymola_api.license_is_available():
             dymola_api.close()
-            raise ConnectionError("License is not available, even though minimal "
-                                  "number of licenses are apparently free.")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error(f'There are currently no available Dymola licenses available. Please try again later.')
+                raise ConnectionError("License is not available, even though minimal "
+                                      "number of licenses are apparently free.")
+            if license_scheduler is not None:
+                logger.error('No Dymola License is available. Waiting for the next free license.')
+                # Release polls the server again, the wait is timed by the scheduler
+                license_scheduler.release()
+                try:
+                    license_scheduler.wait_for_licenses(timeout=remaining)
+                finally:
+                    license_scheduler.claim()
+            else:
+                logger.error('No Dymola License is available. Check Dymola license after %.0f seconds', delay)
+                # The jitter keeps jobs which failed at the same time from retrying at the same time
+                with profile("Dymola license", category="license"):
+                    time.sleep(min(delay * random.uniform(0.5, 1), remaining))
+                delay = min(delay * 2, CI_CONFIG.license.max_poll_seconds)
+            dymola_api = _start_dymola_api(
+                packages=packages, startup_mos=startup_mos
+            )
+    except TimeoutError as err:
+        logger.error(f'There are currently no available Dymola licenses available. Please try again later.')
+        raise ConnectionError("License is not available, even though minimal "
+                              "number of licenses are apparently free.") from err
+    finally:
+        if license_scheduler is not None:
+            license_scheduler.release()
     dymola_api.dymola.ExecuteCommand("Advanced.TranslationInCommandLog:=true;")
     success = dymola_api.dymola.ExecuteCommand("Advanced.CompileWith64 = 2;")
     if not success:
@@ -49,7 +78,11 @@ def load_dymola_api(
     return dymola_api
 
 
-def check_enough_licenses_available(min_number_of_unused_licences: int = 1) -> bool:
+def get_license_server():
+    """
+    Returns the url and port of the Dymola license server based on DYMOLA_RUNTIME_LICENSE,
+    which is either "port@url" or the path to a license file.
+    """
     lic = os.environ.get("DYMOLA_RUNTIME_LICENSE", "50064@license2.rz.rwth-aachen.de")
     if "@" in lic:
         port, url = lic.split("@")
@@ -67,45 +100,45 @@ def check_enough_licenses_available(min_number_of_unused_licences: int = 1) -> b
                 raise ValueError(
                     "Did not find SERVER line in license file content: %s" % "\n".join(lines)
                 )
-    port = int(port)
+    return url, int(port)
+
+
+def get_dymola_license_scheduler(min_number_of_unused_licences: int = 1) -> LicenseScheduler:
+    """
+    Returns the license scheduler of the license server of DYMOLA_RUNTIME_LICENSE.
+    """
+    url, port = get_license_server()
+    return get_license_scheduler(url=url, port=port, min_number_of_unused_licences=min_number_of_unused_licences)
+
+
+@profile("license server", category="license")
+def check_enough_licenses_available(min_number_of_unused_licences: int = 1) -> bool:
+    url, port = get_license_server()
     server_is_available = check_server_connection(url=url, port=port)
     if not server_is_available:
         raise ConnectionError("Can't reach license server!")
-    lic_counter = 0
-    n_licenses = get_number_of_unused_licenses(url=url, port=port)
-    while n_licenses < min_number_of_unused_licences:
-        msg = (f'Only {n_licenses} Dymola licenses are available, '
-               f'mininum number required is set to {min_number_of_unused_licences}.')
-        logger.error('%s. Check Dymola license after 180.0 seconds', msg)
-        time.sleep(180.0)
-        n_licenses = get_number_of_unused_licenses(url=url, port=port)
-        lic_counter += 1
-        if lic_counter > 10:
-            logger.error(f'%s. Stopping, please try again later.', msg)
+    license_scheduler = get_license_scheduler(
+        url=url, port=port, min_number_of_unused_licences=min_number_of_unused_licences
+    )
+    n_licenses = license_scheduler.get_number_of_unused_licenses()
+    if license_scheduler.get_number_of_usable_licenses() < 1:
+        logger.error(
+            'Only %s Dymola licenses are available, mininum number required is set to %s. '
+            'Waiting until enough licenses are free.', n_licenses, min_number_of_unused_licences
+        )
+        try:
+            license_scheduler.wait_for_licenses(timeout=CI_CONFIG.license.max_wait_seconds)
+        except TimeoutError:
+            logger.error(
+                'Only %s Dymola licenses are available, mininum number required is set to %s. '
+                'Stopping, please try again later.',
+                license_scheduler.get_number_of_unused_licenses(), min_number_of_unused_licences
+            )
             exit(1)
+        n_licenses = license_scheduler.get_number_of_unused_licenses()
     logger.info(f'Enough Dymola licenses (%s) are available.', n_licenses)
 
 
-def get_number_of_unused_licenses(url, port):
-    from ModelicaPyCI.utils import os_system_with_return
-    licenses = os_system_with_return(f"lmutil lmstat -c {port}@{url} -a")
-    _start_line = "Users of DymolaStandard:  "
-    for line in licenses.split("\n"):
-        if not line.startswith(_start_line):
-            continue
-        # line = "(Total of 93 licenses issued;  Total of 36 licenses in use)"
-        for delete in [
-            _start_line, "Total of", "licenses", "issued",
-            "in", "use", "(", ")", " "
-        ]:
-            line = line.replace(delete, "")
-        # line = "93;36"
-        num_licenses, num_in_use = line.split(";")
-        return int(num_licenses) - int(num_in_use)
-    logger.error("Could not find line '%s' in content %s", _start_line, licenses)
-    return 0
-
-
 def check_server_connection(url, port, timeout=5):
     import socket
     try:
@@ -118,6 +151,7 @@ def check_server_connection(url, port, timeout=5):
         return False
 
 
+@profile("Dymola start", category="dymola")
 def _start_dymola_api(packages: list, startup_mos: str = None, use_mp: bool = False) -> DymolaAPI:
     if "win" in sys.platform:
         dymola_exe_path = None
@@ -139,6 +173,19 @@ def _start_dymola_api(packages: list, startup_mos: str = None, use_mp: bool = Fa
     )
 
 
+def get_dymola_version() -> str:
+    """
+    Returns a string identifying the installed Dymola version without starting Dymola.
+    Uses the environment variable DYMOLA_VERSION if set, else the resolved path
+    of the Dymola executable, which contains the version on linux.
+    """
+    if "DYMOLA_VERSION" in os.environ:
+        return os.environ["DYMOLA_VERSION"]
+    if "win" in sys.platform:
+        return "dymola"
+    return os.path.realpath("/usr/local/bin/dymola")
+
+
 def add_libraries_to_load_from_mos_to_modelicapath(startup_mos_path):
     libraries_to_load = []
     with open(startup_mos_path, "r") as file:
@@ -168,19 +215,61 @@ def parallel_model_check(dymola_api: DymolaAPI, sim_ex_flag: bool, dym_models: l
     return results
 
 
+class ModelCheckResult(NamedTuple):
+    """Result of check_or_simulate."""
+    # True or the error log of the model, None if the Dymola interface raised an exception
+    result: Union[bool, str, None]
+    # Number of checkModel calls
+    attempts: int
+    # False if the result depends on the state of the runner, e.g. a license error
+    cacheable: bool
+
+
+def get_transient_signature(log: str, transient_signatures: list = None):
+    """
+    Returns the first line of the log which matches a transient signature of
+    CI_CONFIG.retry, e.g. a license or file lock error, None if the failure is not transient.
+    """
+    if transient_signatures is None:
+        transient_signatures = CI_CONFIG.retry.transient_signatures
+    pattern = compile_exceptions(transient_signatures)
+    if pattern is None or not log:
+        return None
+    for line in log.split("\n"):
+        if pattern.search(line):
+            return line
+    return None
+
+
 def check_or_simulate(kwargs: dict):
+    """
+    Check or simulate the model. Failures matching a transient signature
+    of CI_CONFIG.retry are repeated with an exponential backoff.
+    Returns:
+        result (): ModelCheckResult
+    """
     dymola_api = kwargs["dymola_api"]
     dym_model = kwargs["dym_model"]
     sim_ex_flag = kwargs["sim_ex_flag"]
-    try:
-        res = dymola_api.dymola.checkModel(dym_model, simulate=sim_ex_flag)
-        if res is True:
-            return True
-        # Second test for model
-        sec_result = dymola_api.dymola.checkModel(dym_model, simulate=sim_ex_flag)
-        if sec_result is True:
-            return True
-        log = dymola_api.dymola.getLastError()
-        return log
-    except Exception as ex:
-        logger.error("Simulation failed: " + str(ex))
+    retry = CI_CONFIG.retry
+    with profile(dym_model, category="simulate" if sim_ex_flag else "check", tool="dymola"):
+        attempt = 1
+        while True:
+            try:
+                if dymola_api.dymola.checkModel(dym_model, simulate=sim_ex_flag) is True:
+                    return ModelCheckResult(result=True, attempts=attempt, cacheable=True)
+                log = dymola_api.dymola.getLastError()
+            except Exception as ex:
+                logger.error("Simulation failed: " + str(ex))
+                return ModelCheckResult(result=None, attempts=attempt, cacheable=False)
+            signature = get_transient_signature(log=log)
+            if signature is None:
+                return ModelCheckResult(result=log, attempts=attempt, cacheable=True)
+            if attempt >= retry.max_attempts:
+                logger.error("%s failed %s times with the transient error: %s", dym_model, attempt, signature)
+                return ModelCheckResult(result=log, attempts=attempt, cacheable=False)
+            delay = retry.backoff_seconds * retry.backoff_factor ** (attempt - 1)
+            logger.warning("Transient error of %s, retry in %s seconds: %s", dym_model, delay, signature)
+            with profile("retry", category="retry", model=dym_model):
+                time.sleep(delay)
+            attempt += 1
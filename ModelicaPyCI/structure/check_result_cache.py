@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Union
+
+from ModelicaPyCI.structure.dependency_graph import get_dependency_graph
+from ModelicaPyCI.utils import logger
+
+# Hashes of resource files by path, reused while their mtime and size do not change
+_RESOURCE_HASHES = {}
+
+
+class CheckResultCache:
+
+    def __init__(self,
+                 cache_dir: Union[str, Path],
+                 library_path: Union[str, Path],
+                 tool: str,
+                 tool_version: str,
+                 flags: dict = None,
+                 additional_libraries: list = None,
+                 max_size_mb: float = 500):
+        """
+        On-disk cache for check and simulate results of models.
+        The key of a result is the hash of the model source and the sources of
+        all library classes it depends on, the resources they read (modelica:// files
+        and the Include and Library directories of external functions),
+        the sources of the additional libraries, the tool, its version and the flags.
+        The cache is evicted in least recently used order if it grows larger
+        than max_size_mb, so the cache_dir can be shared as a CI cache.
+        Args:
+            cache_dir (): directory of the cache.
+            library_path (): path of the library (e.g. ../AixLib).
+            tool (): dymola or openmodelica
+            tool_version (): Any string identifying the tool version.
+            flags (): Further settings which influence the results, e.g. the startup script.
+            additional_libraries (): package.mo files of the libraries loaded next to the library.
+            max_size_mb (): Maximal size of the cache directory.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.library_path = Path(library_path)
+        self.tool = tool
+        self.tool_version = tool_version
+        self.flags = flags if flags is not None else {}
+        self.additional_libraries = [Path(package_mo) for package_mo in additional_libraries or []]
+        self.max_size_mb = max_size_mb
+        self._library_hashes = None
+        self.n_hits = 0
+        self.n_misses = 0
+
+    def get_key(self, model: str, simulate: bool):
+        dependency_graph = get_dependency_graph(library_path=self.library_path)
+        if model not in dependency_graph.class_files:
+            return None
+        library_index = dependency_graph.library_index
+        dependency_files = dependency_graph.get_dependency_files(class_name=model)
+        source_hashes = [
+            (Path(file).relative_to(self.library_path.parent).as_posix(), library_index.files[file]["hash"])
+            for file in dependency_files
+        ]
+        resources = set()
+        for file in dependency_files:
+            entry = library_index.files[file]
+            resources.update(entry["resources"])
+            if entry["external"]:
+                # Default directories of the Include and Library annotations
+                resources.add(f"modelica://{self.library_path.name}/Resources/Include")
+                resources.add(f"modelica://{self.library_path.name}/Resources/Library")
+        key_content = json.dumps({
+            "model": model,
+            "simulate": simulate,
+            "tool": self.tool,
+            "tool_version": self.tool_version,
+            "flags": self.flags,
+            "sources": source_hashes,
+            "resources": [(uri, self._get_resource_hash(uri)) for uri in sorted(resources)],
+            "libraries": self._get_library_hashes()
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(key_content.encode("utf-8")).hexdigest()
+
+    def _get_library_hashes(self):
+        """
+        Returns the hash of all .mo files of each additional library, computed once.
+        """
+        if self._library_hashes is None:
+            library_index = get_dependency_graph(library_path=self.library_path).library_index
+            self._library_hashes = {}
+            for package_mo in self.additional_libraries:
+                library_path = package_mo.parent
+                files = sorted(library_index.get_files(library_path))
+                content = json.dumps([
+                    (Path(file).relative_to(library_path).as_posix(), library_index.files[file]["hash"])
+                    for file in files
+                ])
+                self._library_hashes[library_path.name] = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return self._library_hashes
+
+    def _get_resource_hash(self, uri: str):
+        """
+        Returns the hash of the file or of all files of the directory of a modelica:// uri,
+        None if it is not in the library or an additional library.
+        """
+        host, _, path = uri[len("modelica://"):].partition("/")
+        top_level, *packages = host.split(".")
+        library_paths = {package_mo.parent.name: package_mo.parent for package_mo in self.additional_libraries}
+        library_paths[self.library_path.name] = self.library_path
+        if top_level not in library_paths:
+            return None
+        resource = library_paths[top_level].joinpath(*packages, *[part for part in path.split("/") if part])
+        if resource.is_file():
+            return _get_file_hash(resource)
+        if resource.is_dir():
+            file_hashes = [
+                (Path(subdir, filename).relative_to(resource).as_posix(), _get_file_hash(Path(subdir, filename)))
+                for subdir, _, filenames in os.walk(resource) for filename in filenames
+            ]
+            return hashlib.sha256(json.dumps(sorted(file_hashes)).encode("utf-8")).hexdigest()
+        return "missing"
+
+    def get(self, model: str, simulate: bool):
+        """
+        Returns the cached result or None if the model has no valid cache entry.
+        """
+        key = self.get_key(model=model, simulate=simulate)
+        cache_file = self.cache_dir.joinpath(f"{key}.json")
+        if key is None or not os.path.isfile(cache_file):
+            self.n_misses += 1
+            return None
+        try:
+            with open(cache_file, "r", encoding="utf-8") as file:
+                result = json.load(file)["result"]
+        except (OSError, ValueError, KeyError) as err:
+            logger.warning("Could not read cached result of %s: %s", model, err)
+            self.n_misses += 1
+            return None
+        os.utime(cache_file)
+        self.n_hits += 1
+        return result
+
+    def set(self, model: str, simulate: bool, result):
+        if result is None:
+            return
+        key = self.get_key(model=model, simulate=simulate)
+        if key is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_file = self.cache_dir.joinpath(f"{key}.json")
+        tmp_file = cache_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as file:
+            json.dump({"model": model, "result": result}, file)
+        os.replace(tmp_file, cache_file)
+
+    def evict(self):
+        """
+        Remove the least recently used results until the cache is smaller than max_size_mb.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        cache_files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".json"):
+                stat = entry.stat()
+                cache_files.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(file[1] for file in cache_files)
+        max_size = self.max_size_mb * 1024 * 1024
+        n_removed = 0
+        for _, file_size, path in sorted(cache_files):
+            if size <= max_size:
+                break
+            os.remove(path)
+            size -= file_size
+            n_removed += 1
+        logger.info(
+            "Result cache: %s hits, %s misses, removed %s old results.",
+            self.n_hits, self.n_misses, n_removed
+        )
+
+
+def _get_file_hash(path: Path):
+    stat = path.stat()
+    key = os.path.normpath(path)
+    cached = _RESOURCE_HASHES.get(key)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    with open(path, "rb") as file:
+        file_hash = hashlib.sha1(file.read()).hexdigest()
+    _RESOURCE_HASHES[key] = (stat.st_mtime_ns, stat.st_size, file_hash)
+    return file_hash
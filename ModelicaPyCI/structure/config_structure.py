@@ -1,11 +1,22 @@
-import distutils.dir_util
+import errno
 import glob
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from ModelicaPyCI.utils import logger
 
+try:
+    import fcntl
+except ImportError:  # Windows, files are copied without reflinks
+    fcntl = None
+
+# ioctl to clone the extents of a file (reflink) on btrfs, xfs, ...
+_FICLONE = 0x40049409
+# Devices on which reflinks failed, the files are copied there.
+_NO_REFLINK_DEVICES = set()
+
 
 def check_arguments_settings(**kwargs):
     logger.info(f'*** --- Argument setting --- ****')
@@ -109,32 +120,42 @@ def delete_spec_file(root: str = None, pattern: str = None):
 
 
 def prepare_data(source_target_dict: dict,
-                 del_flag: bool = False):
+                 del_flag: bool = False,
+                 n_workers: int = None):
     """
     Prepare Result:
+    Files are moved with a rename if they are deleted and on the same file system,
+    else they are copied as reflink, if the file system supports it, or with parallel copies.
+    A folder is renamed as a whole if its target does not exist yet.
         Args:
         file_path_dict (): {dst:src}
         del_flag (): True: delete files if True, dont delete files if False
+        n_workers (): number of threads to copy the files of a folder
     """
     logger.info(f'\n**** Prepare Data ****')
     for source, target_path in source_target_dict.items():
+        if os.path.isdir(source) and del_flag and not _is_non_empty_dir(target_path):
+            if os.path.isdir(target_path):
+                os.rmdir(target_path)
+            os.makedirs(Path(target_path).parent, exist_ok=True)
+            if _replace(source, target_path):
+                logger.info(f'Result Folder {source} was moved to {target_path}')
+                continue
         if not os.path.exists(target_path):
             logger.info(f'Create path: {target_path}')
             os.makedirs(target_path)
         if os.path.isfile(source):
             path, file_name = os.path.split(source)
             target = os.path.join(target_path, file_name)
-            shutil.copyfile(source, target)
+            _stage_file(source=source, target=target, move=del_flag, copy_function=shutil.copyfile)
             logger.info(
                 f'Result file {source} '
                 f'was copied to {target}'
             )
-            if del_flag is True:
-                os.remove(source)
-                if os.path.isfile(source):
-                    logger.error("Removing %s did not work.", source)
+            if del_flag is True and os.path.isfile(source):
+                logger.error("Removing %s did not work.", source)
         elif os.path.isdir(source):
-            distutils.dir_util.copy_tree(source, str(target_path))
+            _stage_tree(source=source, target_path=target_path, move=del_flag, n_workers=n_workers)
             if del_flag is True:
                 shutil.rmtree(source)
             logger.info(
@@ -144,3 +165,73 @@ def prepare_data(source_target_dict: dict,
 
         else:
             raise FileNotFoundError(f"File to copy does not exist: {source}")
+
+
+def _is_non_empty_dir(path):
+    return os.path.isdir(path) and any(os.scandir(path))
+
+
+def _replace(source, target):
+    """
+    Rename source to target, returns False if they are on different file systems.
+    """
+    try:
+        os.replace(source, target)
+        return True
+    except OSError as err:
+        if err.errno == errno.EXDEV:
+            return False
+        raise
+
+
+def _stage_tree(source, target_path, move: bool, n_workers: int = None):
+    """
+    Merge the content of the folder source into target_path, like distutils.dir_util.copy_tree.
+    """
+    files = []
+    for subdir, dirs, file_names in os.walk(source):
+        target_dir = os.path.join(target_path, os.path.relpath(subdir, source))
+        os.makedirs(target_dir, exist_ok=True)
+        files.extend(
+            (os.path.join(subdir, file_name), os.path.join(target_dir, file_name)) for file_name in file_names
+        )
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        list(executor.map(
+            lambda item: _stage_file(
+                source=item[0], target=item[1], move=move, copy_function=shutil.copy2
+            ),
+            files
+        ))
+
+
+def _stage_file(source, target, move: bool, copy_function):
+    """
+    Stage one file: rename if it is moved, else reflink, else copy.
+    """
+    if move and _replace(source, target):
+        return
+    # The target may share its data with another file, e.g. a hardlink, and must not be overwritten in place
+    if os.path.lexists(target):
+        os.remove(target)
+    if not _reflink(source, target):
+        copy_function(source, target)
+    if move:
+        os.remove(source)
+
+
+def _reflink(source, target):
+    if fcntl is None:
+        return False
+    device = os.stat(os.path.dirname(os.path.abspath(target))).st_dev
+    if device in _NO_REFLINK_DEVICES:
+        return False
+    try:
+        with open(source, "rb") as source_file, open(target, "wb") as target_file:
+            fcntl.ioctl(target_file.fileno(), _FICLONE, source_file.fileno())
+    except OSError:
+        _NO_REFLINK_DEVICES.add(device)
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+    shutil.copystat(source, target)
+    return True
@@ -0,0 +1,174 @@
+import os
+from pathlib import Path
+from typing import Union
+
+from ModelicaPyCI.structure.library_index import LibraryIndex, get_library_index
+from ModelicaPyCI.utils import logger
+
+_DEPENDENCY_GRAPHS = {}
+
+
+class ModelicaDependencyGraph:
+
+    def __init__(self, library_path: Union[str, Path], library_index: LibraryIndex = None):
+        """
+        Static dependency graph of all classes of a library, based on the .mo sources.
+        Each file is one node. Edges are of the kind
+        - "extends": extends clauses
+        - "uses": instantiated classes, called functions and other referenced classes
+        - "within": the enclosing package of the class
+        Names are resolved with the Modelica lookup rules: nested classes,
+        imports, the enclosing packages and wildcard imports.
+        Classes outside the library (e.g. Modelica.*) are ignored.
+        Args:
+            library_path (): path of the library, e.g. ../AixLib
+            library_index (): index to read the parsed files from, default is the index of this process.
+        """
+        self.library_path = os.path.normpath(library_path)
+        self.library_index = library_index if library_index is not None else get_library_index()
+        self.class_files = {}
+        self.file_classes = {}
+        self.dependencies = {}
+        self.dependents = {}
+        self._build()
+
+    def _build(self):
+        files = self.library_index.get_files(self.library_path)
+        for file in files:
+            class_name = self.library_index.get_class_name(file)
+            self.class_files[class_name] = file
+            self.file_classes[file] = class_name
+        for file in files:
+            for nested_class in self.library_index.files[file]["classes"]:
+                self.class_files.setdefault(f"{self.file_classes[file]}.{nested_class}", file)
+        for file, class_name in self.file_classes.items():
+            entry = self.library_index.files[file]
+            dependencies = {}
+            for reference in entry["references"]:
+                dependency = self._resolve(name=reference, class_name=class_name, entry=entry)
+                if dependency is not None:
+                    dependencies[dependency] = "uses"
+            for extended_class in entry["extends"]:
+                dependency = self._resolve(name=extended_class, class_name=class_name, entry=entry)
+                if dependency is not None:
+                    dependencies[dependency] = "extends"
+            package = class_name.rpartition(".")[0]
+            if package in self.class_files:
+                dependencies.setdefault(self.file_classes[self.class_files[package]], "within")
+            dependencies.pop(class_name, None)
+            self.dependencies[class_name] = dependencies
+            for dependency in dependencies:
+                self.dependents.setdefault(dependency, set()).add(class_name)
+        logger.info(
+            "Built dependency graph of %s classes with %s edges.",
+            len(self.dependencies), sum(len(dependencies) for dependencies in self.dependencies.values())
+        )
+
+    def _find_class(self, name: str, min_parts: int):
+        parts = name.split(".")
+        for idx in range(len(parts), min_parts - 1, -1):
+            file = self.class_files.get(".".join(parts[:idx]))
+            if file is not None:
+                return self.file_classes[file]
+        return None
+
+    def _resolve(self, name: str, class_name: str, entry: dict):
+        first, _, rest = name.partition(".")
+        for alias, target in entry["imports"]:
+            if alias == first:
+                return self._find_class(f"{target}.{rest}" if rest else target, min_parts=1)
+        scope = class_name.split(".")
+        for n_parts in range(len(scope), -1, -1):
+            scope_name = ".".join(scope[:n_parts])
+            dependency = self._find_class(f"{scope_name}.{name}" if scope_name else name, min_parts=n_parts + 1)
+            if dependency is not None:
+                return dependency
+        for alias, target in entry["imports"]:
+            if alias == "*":
+                dependency = self._find_class(f"{target}.{name}", min_parts=len(target.split(".")) + 1)
+                if dependency is not None:
+                    return dependency
+        return None
+
+    def get_class_name(self, filepath: Union[str, Path]):
+        return self.file_classes.get(os.path.normpath(filepath))
+
+    def is_example(self, class_name: str):
+        file = self.class_files.get(class_name)
+        return file is not None and self.library_index.files[file]["is_example"]
+
+    def get_dependencies(self, class_name: str, transitive: bool = False, kinds: tuple = ("extends", "uses")):
+        """
+        Returns the classes the given class depends on.
+        Args:
+            class_name (): full Modelica name of the class
+            transitive (): If True, dependencies of dependencies are included.
+            kinds (): kinds of edges to follow
+        """
+        return self._walk(class_name=class_name, edges=self.dependencies, transitive=transitive, kinds=kinds)
+
+    def get_dependents(self, class_name: str, transitive: bool = True, kinds: tuple = ("extends", "uses")):
+        """
+        Returns the classes which depend on the given class.
+        Args:
+            class_name (): full Modelica name of the class
+            transitive (): If True, dependents of dependents are included.
+            kinds (): kinds of edges to follow
+        """
+        return self._walk(class_name=class_name, edges=self.dependents, transitive=transitive, kinds=kinds)
+
+    def _walk(self, class_name: str, edges: dict, transitive: bool, kinds: tuple):
+        visited = set()
+        to_visit = [class_name]
+        while to_visit:
+            current = to_visit.pop()
+            for neighbour in edges.get(current, ()):
+                if neighbour in visited:
+                    continue
+                if edges is self.dependencies:
+                    kind = self.dependencies[current][neighbour]
+                else:
+                    kind = self.dependencies[neighbour][current]
+                if kind not in kinds:
+                    continue
+                visited.add(neighbour)
+                if transitive:
+                    to_visit.append(neighbour)
+        visited.discard(class_name)
+        return sorted(visited)
+
+    def get_dependency_files(self, class_name: str):
+        """
+        Returns the file of the class and the files of all classes it depends on
+        transitively, including enclosing packages.
+        """
+        classes = [class_name] + self.get_dependencies(
+            class_name=class_name, transitive=True, kinds=("extends", "uses", "within")
+        )
+        return sorted(self.class_files[name] for name in classes if name in self.class_files)
+
+    def get_affected_examples(self, changed_files: list):
+        """
+        Returns all examples which are changed or depend on a class of the changed files.
+        Args:
+            changed_files (): paths of changed .mo files
+        """
+        affected_examples = set()
+        for file in changed_files:
+            class_name = self.get_class_name(file)
+            if class_name is None:
+                continue
+            for affected_class in [class_name] + self.get_dependents(class_name=class_name, transitive=True):
+                if self.is_example(affected_class):
+                    affected_examples.add(affected_class)
+        return sorted(affected_examples)
+
+
+def get_dependency_graph(library_path: Union[str, Path]):
+    """
+    Returns the dependency graph of the library, built once per process.
+    """
+    library_path = os.path.normpath(library_path)
+    if library_path not in _DEPENDENCY_GRAPHS:
+        _DEPENDENCY_GRAPHS[library_path] = ModelicaDependencyGraph(library_path=library_path)
+    return _DEPENDENCY_GRAPHS[library_path]
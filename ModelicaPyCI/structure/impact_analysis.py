@@ -0,0 +1,113 @@
+import os
+from pathlib import Path
+from typing import Union
+
+from ModelicaPyCI.load_global_config import CI_CONFIG
+from ModelicaPyCI.structure.dependency_graph import get_dependency_graph
+from ModelicaPyCI.utils import logger
+
+_IMPACT_ANALYSES = {}
+
+
+class RegressionImpactAnalysis:
+
+    def __init__(self, library_path: Union[str, Path]):
+        """
+        Maps changed files of a library to the regression tests which have to run.
+        The regression scripts (.mos with simulateModel) and reference results
+        are indexed once, the affected models of changed .mo files are
+        found with the reverse dependencies of the dependency graph.
+        Args:
+            library_path (): path of the library, e.g. ../AixLib
+        """
+        self.library_path = Path(library_path)
+        self.library = self.library_path.name
+        self.script_dir = self.library_path.joinpath(CI_CONFIG.artifacts.library_resource_dir)
+        self.reference_dir = self.library_path.joinpath(CI_CONFIG.artifacts.library_ref_results_dir)
+        self.dependency_graph = get_dependency_graph(library_path=self.library_path)
+        self.script_models = {}
+        self.reference_models = {}
+        self._build()
+
+    def _build(self):
+        for subdir, dirs, files in os.walk(self.script_dir):
+            for file in files:
+                if not file.endswith(".mos"):
+                    continue
+                filepath = Path(subdir, file)
+                with open(filepath, "r", encoding="utf-8", errors="ignore") as mos_file:
+                    if mos_file.read().find("simulateModel") == -1:
+                        continue
+                model = self._get_script_model(filepath.relative_to(self.script_dir))
+                self.script_models[model] = filepath
+                self.reference_models[f'{model.replace(".", "_")}.txt'] = model
+        logger.info("Found %s regression scripts in %s", len(self.script_models), self.script_dir)
+
+    def _get_script_model(self, relative_path: Path):
+        return ".".join((self.library, *relative_path.with_suffix("").parts))
+
+    def _get_library_path(self, changed_file: str):
+        parts = Path(changed_file.strip()).parts
+        if self.library not in parts:
+            return None
+        return self.library_path.joinpath(*parts[parts.index(self.library) + 1:])
+
+    def get_affected_models(self, changed_files: list, package: str = None):
+        """
+        Returns all models with a regression script, which are affected by the changed files:
+        - changed reference results
+        - changed regression scripts
+        - changed models and all models which depend on them
+        Args:
+            changed_files (): paths of changed files, as written by git diff
+            package (): If given, only models of this package are returned, e.g. AixLib.Fluid
+        Returns:
+            affected_models (): sorted list of models
+        """
+        affected_models = set()
+        for changed_file in changed_files:
+            filepath = self._get_library_path(changed_file)
+            if filepath is None:
+                continue
+            if filepath.suffix == ".txt" and filepath.parent == self.reference_dir:
+                model = self.reference_models.get(filepath.name)
+                if model is not None and _is_in_package(model=model, package=package):
+                    logger.info(f'Changed reference files: {changed_file.strip()}')
+                    affected_models.add(model)
+            elif filepath.suffix == ".mos" and self.script_dir in filepath.parents:
+                model = self._get_script_model(filepath.relative_to(self.script_dir))
+                if model in self.script_models and _is_in_package(model=model, package=package):
+                    logger.info(f'Changed mos script files: {changed_file.strip()}')
+                    affected_models.add(model)
+            elif filepath.suffix == ".mo":
+                class_name = self.dependency_graph.get_class_name(filepath)
+                if class_name is None:
+                    continue
+                for model in [class_name] + self.dependency_graph.get_dependents(class_name=class_name):
+                    if model in self.script_models and _is_in_package(model=model, package=package):
+                        logger.info(f'Changed model files: {model}')
+                        affected_models.add(model)
+        return sorted(affected_models)
+
+    def get_affected_packages(self, changed_files: list, package: str = None):
+        """
+        Returns the packages of all affected models, see get_affected_models.
+        """
+        return sorted({
+            model.rpartition(".")[0]
+            for model in self.get_affected_models(changed_files=changed_files, package=package)
+        })
+
+
+def _is_in_package(model: str, package: str):
+    return package is None or model == package or model.startswith(f"{package}.")
+
+
+def get_impact_analysis(library_path: Union[str, Path]):
+    """
+    Returns the impact analysis of the library, built once per process.
+    """
+    library_path = os.path.normpath(library_path)
+    if library_path not in _IMPACT_ANALYSES:
+        _IMPACT_ANALYSES[library_path] = RegressionImpactAnalysis(library_path=library_path)
+    return _IMPACT_ANALYSES[library_path]
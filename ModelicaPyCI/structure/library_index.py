@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Union
+
+from ModelicaPyCI.utils import logger
+
+INDEX_VERSION = 5
+
+_WITHIN_PATTERN = re.compile(r"^\s*within\s*([\w.]*)\s*;", re.MULTILINE)
+_EXTENDS_PATTERN = re.compile(r"\bextends\s+([A-Za-z_][\w.]*)")
+_COMMENT_OR_STRING_PATTERN = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\])*"', re.DOTALL)
+_REFERENCE_PATTERN = re.compile(r"(?<![\w.])[A-Z]\w*(?:\.[A-Za-z_]\w*)*")
+_CALL_PATTERN = re.compile(r"(?<![\w.])([a-z]\w*(?:\.[A-Za-z_]\w*)*)\s*\(")
+_IMPORT_PATTERN = re.compile(r"\bimport\s+(?:(\w+)\s*=\s*)?([A-Za-z_][\w.]*?)(\.\*|\.\{[^}]*\})?\s*;")
+_CLASS_PATTERN = re.compile(
+    r"(?<![\w.])(?:model|block|connector|record|package|function|type|class)\s+(?!extends\b)([A-Za-z_]\w*)"
+)
+_END_PATTERN = re.compile(r"\bend\s+[A-Za-z_]\w*\s*;")
+# Whole word, so packages extending Modelica.Icons.ExamplesPackage are no examples
+_EXAMPLE_PATTERN = re.compile(r"\bModelica\.Icons\.Example\b")
+# Files read by the model, e.g. tables or external C sources
+_RESOURCE_PATTERN = re.compile(r'modelica://[^"\s\\]+')
+_EXTERNAL_PATTERN = re.compile(r"\bexternal\b")
+
+_LIBRARY_INDEX = None
+
+
+class LibraryIndex:
+
+    def __init__(self, index_file: Union[str, Path] = None):
+        """
+        Index of all .mo files of a library. Each file is stored with its
+        mtime, size, content hash, the within clause, the classes defined in it,
+        the imports, the extends clauses, all other referenced class and function
+        names, the referenced modelica:// resources, whether it has external functions
+        and whether it is an example (extends Modelica.Icons.Example).
+        Files are only read again if their mtime or size changed, and parsed
+        again if their content hash changed.
+        Args:
+            index_file (): json file to persist the index between runs. If None, the index is kept in memory only.
+        """
+        self.index_file = index_file
+        self.files = {}
+        self._scanned_files = {}
+        self._changed = False
+        if index_file is not None and os.path.isfile(index_file):
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as err:
+            logger.warning("Could not read library index %s, creating a new one: %s", self.index_file, err)
+            return
+        if data.get("version") != INDEX_VERSION:
+            logger.info("Library index %s has an outdated version, creating a new one.", self.index_file)
+            return
+        self.files = data["files"]
+        logger.info("Loaded library index with %s files from %s", len(self.files), self.index_file)
+
+    def save(self):
+        if self.index_file is None or not self._changed:
+            return
+        os.makedirs(Path(self.index_file).parent, exist_ok=True)
+        tmp_file = f"{self.index_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as file:
+            json.dump({"version": INDEX_VERSION, "files": self.files}, file)
+        os.replace(tmp_file, self.index_file)
+        self._changed = False
+
+    def get_files(self, path: Union[str, Path]):
+        """
+        Returns all .mo files below the given path and updates their index entries.
+        The directory tree is only walked once per process and path.
+        Args:
+            path (): library or package path.
+        Returns:
+            files (): list of file paths in os.walk order
+        """
+        root = os.path.normpath(path)
+        if root not in self._scanned_files:
+            files = []
+            for subdir, dirs, filenames in os.walk(root):
+                for filename in filenames:
+                    if filename.endswith(".mo"):
+                        files.append(os.path.normpath(os.path.join(subdir, filename)))
+            self._scanned_files[root] = files
+        files = [filepath for filepath in self._scanned_files[root] if self._update_entry(filepath) is not None]
+        self.save()
+        return files
+
+    def get_entry(self, filepath: Union[str, Path]):
+        """
+        Returns the up-to-date index entry of a single file or None if the file does not exist.
+        """
+        entry = self._update_entry(os.path.normpath(filepath))
+        self.save()
+        return entry
+
+    def get_class_name(self, filepath: Union[str, Path]):
+        """
+        Returns the full Modelica name of the class defined in the file, based on its within clause.
+        """
+        filepath = os.path.normpath(filepath)
+        entry = self._update_entry(filepath)
+        if entry is None:
+            return None
+        path = Path(filepath)
+        name = path.parent.name if path.name == "package.mo" else path.stem
+        if entry["within"]:
+            return f"{entry['within']}.{name}"
+        return name
+
+    def _update_entry(self, filepath: str):
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            if self.files.pop(filepath, None) is not None:
+                self._changed = True
+            return None
+        entry = self.files.get(filepath)
+        if entry is not None and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry
+        with open(filepath, "rb") as file:
+            content = file.read()
+        content_hash = hashlib.sha1(content).hexdigest()
+        if entry is None or entry["hash"] != content_hash:
+            entry = {"hash": content_hash, **_parse_content(content.decode("utf-8", errors="ignore"))}
+        entry["mtime"] = stat.st_mtime_ns
+        entry["size"] = stat.st_size
+        self.files[filepath] = entry
+        self._changed = True
+        return entry
+
+
+def _parse_content(content: str):
+    within = _WITHIN_PATTERN.search(content)
+    # The enclosing package is only linked by the "within" edge of the dependency graph
+    code = _WITHIN_PATTERN.sub(" ", _COMMENT_OR_STRING_PATTERN.sub(" ", content))
+    is_example = any(
+        line.find("extends") > -1 and _EXAMPLE_PATTERN.search(line) is not None
+        for line in content.splitlines()
+    )
+    imports = []
+    for alias, target, suffix in _IMPORT_PATTERN.findall(code):
+        if suffix == ".*":
+            imports.append(["*", target])
+        elif suffix:
+            for name in suffix[2:-1].split(","):
+                imports.append([name.strip(), f"{target}.{name.strip()}"])
+        else:
+            imports.append([alias if alias else target.split(".")[-1], target])
+    code_without_imports = _IMPORT_PATTERN.sub(" ", code)
+    classes = list(dict.fromkeys(_CLASS_PATTERN.findall(_END_PATTERN.sub(" ", code_without_imports))))
+    references = set(_REFERENCE_PATTERN.findall(code_without_imports))
+    references.update(_CALL_PATTERN.findall(code_without_imports))
+    return {
+        "within": within.group(1) if within else None,
+        "classes": classes[1:],
+        "imports": imports,
+        "extends": list(dict.fromkeys(_EXTENDS_PATTERN.findall(code))),
+        "references": sorted(references),
+        "resources": sorted(set(_RESOURCE_PATTERN.findall(content))),
+        "external": _EXTERNAL_PATTERN.search(code) is not None,
+        "is_example": is_example
+    }
+
+
+def get_library_index():
+    """
+    Returns the library index of this process, loaded from the ci cache directory.
+    """
+    global _LIBRARY_INDEX
+    if _LIBRARY_INDEX is None:
+        from ModelicaPyCI.load_global_config import CI_CONFIG
+        _LIBRARY_INDEX = LibraryIndex(index_file=CI_CONFIG.get_file_path("cache", "library_index_file"))
+    return _LIBRARY_INDEX
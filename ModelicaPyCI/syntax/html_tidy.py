@@ -1,13 +1,18 @@
 import argparse
+import hashlib
+import io
+import json
 import os
 import shutil
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 from tidylib import Tidy
 from ModelicaPyCI.structure import config_structure
 from ModelicaPyCI.structure import sort_mo_model as mo
 from ModelicaPyCI.load_global_config import CI_CONFIG
-from ModelicaPyCI.utils import logger
+from ModelicaPyCI.utils import logger, profile
 
 from pathlib import Path
 
@@ -47,6 +52,13 @@ In case of trouble just put the dll in your working dir.
 [https://binaries.html-tidy.org/](https://binaries.html-tidy.org/)
 """
 
+_TIDY = None
+# Version of the tidy options, cached sections of other versions are not used.
+_SECTION_CACHE_VERSION = 1
+# Tidy result of each html section by hash, only set if the cache is used
+_SECTION_CACHE = None
+_FILE_SECTIONS = {}
+
 
 class HtmlTidy:
     """Class to Check Packages and run CheckModel Tests"""
@@ -58,7 +70,8 @@ class HtmlTidy:
                  correct_view: bool,
                  library: str,
                  whitelist_library: str,
-                 filter_whitelist: bool):
+                 filter_whitelist: bool,
+                 use_cache: bool = False):
         """
         Args:
             package (): package to test
@@ -68,6 +81,7 @@ class HtmlTidy:
             library ():  library to test
             whitelist_library ():  library on the whitelist
             filter_whitelist (): argument(default:false): filter models that are on the whitelist
+            use_cache (): argument(default:false): reuse the tidy results of unchanged html sections
         """
         self.package = package
         self.correct_overwrite = correct_overwrite
@@ -76,6 +90,7 @@ class HtmlTidy:
         self.library = library
         self.whitelist_library = whitelist_library
         self.filter_whitelist = filter_whitelist
+        self.use_cache = use_cache
         config_structure.check_arguments_settings(library_root=CI_CONFIG.library_root)
         self.html_error_log = Path(CI_CONFIG.library_root, "HTML_error_log.txt")
         self.html_correct_log = Path(CI_CONFIG.library_root, "HTML_correct_log.txt")
@@ -84,73 +99,151 @@ class HtmlTidy:
             create_flag=True
         )
 
-    def check_html_files(self, model_list: list = None):
-        file_counter = 0
-        if model_list is None or len(model_list) == 0:
-            return
-        for model in model_list:
-            model_file = Path(model.replace(".", os.sep) + ".mo")
-            correct_code, error_list, html_correct_code, html_code = _getInfoRevisionsHTML(
-                model_file=model_file)
-            if len(error_list) == 0:
-                continue
-            if self.correct_overwrite:
-                # Filter errors which are ignored:
-                filter_error_list = []
-                for error in error_list:
-                    if not error_is_on_whitelist(error):
-                        logger.error(f'Error in file {model_file} with error: {error}')
-                        filter_error_list.append(error)
-                if filter_error_list:
-                    logger.info(f'Overwrite model: {model_file}')
-                    _call_correct_overwrite(model_name=model_file, document_corr=correct_code)
-                if self.log:
-                    correct_code, error_list, html_correct_code, html_code = _getInfoRevisionsHTML(
-                        model_file=model_file)
-                    self._call_write_log(model_file=model_file,
-                                         error_list=error_list,
-                                         html_correct_code=html_correct_code,
-                                         html_code=html_code)
-            if self.correct_view:
-                _call_correct_view(model_file=model_file,
-                                   error_list=error_list,
-                                   html_correct_code=html_correct_code,
-                                   html_code=html_code)
-                if self.log:
-                    self._call_write_log(model_file=model_file,
-                                         error_list=error_list,
-                                         html_correct_code=html_correct_code,
-                                         html_code=html_code)
-
-    def _call_write_log(self, model_file, error_list, html_correct_code, html_code):
+    @profile("check html files", category="phase")
+    def check_html_files(self, model_list: list = None, n_workers: int = None):
         """
-        Write a log file of the html test.
+        Check the html code of all models. The files are distributed to a pool of processes,
+        the results are handled in the order of model_list.
         Args:
-            model_file (): model to check
-            error_list (): list of errors for each model
-            html_correct_code (): corrected html code
-            html_code (): html code of a modelica file
+            model_list (): models to check
+            n_workers (): number of processes, default is the number of cpus
         """
+        if model_list is None or len(model_list) == 0:
+            return
+        model_files = [str(Path(model.replace(".", os.sep) + ".mo")) for model in model_list]
+        section_cache = _load_section_cache() if self.use_cache else None
+        n_sections = n_cached_sections = 0
+        with ProcessPoolExecutor(
+                max_workers=n_workers, initializer=_set_section_cache, initargs=(section_cache,)
+        ) as executor, \
+                open(self.html_error_log, "a", encoding="utf-8") as error_log_file, \
+                open(self.html_correct_log, "a", encoding="utf-8") as correct_log_file:
+            chunksize = max(1, len(model_files) // (4 * (n_workers or os.cpu_count() or 1)))
+            # With overwrite and log, the corrected code is checked again in the worker and its
+            # remaining errors are logged, so errors which were corrected do not fail the run.
+            for model_file, correct_code, error_list, html_correct_code, html_code, sections, corrected in \
+                    executor.map(_check_html_file, model_files, repeat(self.correct_overwrite and self.log),
+                                 chunksize=chunksize):
+                if section_cache is not None:
+                    for key, section in sections.items():
+                        n_sections += 1
+                        n_cached_sections += section_cache.pop(key, None) is not None
+                        # Re-insert to keep the most recently used sections at the end
+                        section_cache[key] = section
+                if len(error_list) == 0:
+                    continue
+                if self.correct_overwrite:
+                    # Filter errors which are ignored:
+                    filter_error_list = []
+                    for error in error_list:
+                        if not error_is_on_whitelist(error):
+                            logger.error(f'Error in file {model_file} with error: {error}')
+                            filter_error_list.append(error)
+                    if filter_error_list:
+                        logger.info(f'Overwrite model: {model_file}')
+                        _call_correct_overwrite(model_name=model_file, document_corr=correct_code)
+                    if self.log:
+                        corrected_error_list, corrected_html_correct_code, corrected_html_code = (
+                            corrected if filter_error_list else (error_list, html_correct_code, html_code)
+                        )
+                        _call_write_log(error_log_file=error_log_file,
+                                        correct_log_file=correct_log_file,
+                                        model_file=model_file,
+                                        error_list=corrected_error_list,
+                                        html_correct_code=corrected_html_correct_code,
+                                        html_code=corrected_html_code)
+                if self.correct_view:
+                    _call_correct_view(model_file=model_file,
+                                       error_list=error_list,
+                                       html_correct_code=html_correct_code,
+                                       html_code=html_code)
+                    if self.log:
+                        _call_write_log(error_log_file=error_log_file,
+                                        correct_log_file=correct_log_file,
+                                        model_file=model_file,
+                                        error_list=error_list,
+                                        html_correct_code=html_correct_code,
+                                        html_code=html_code)
+        if section_cache is not None:
+            logger.info(f'Reused tidy results of {n_cached_sections} of {n_sections} html sections.')
+            _save_section_cache(section_cache)
+
+
+def _load_section_cache():
+    cache_file = CI_CONFIG.get_file_path("cache", "html_tidy_file")
+    if not os.path.isfile(cache_file):
+        return {}
+    try:
+        with open(cache_file, "r", encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError) as err:
+        logger.warning(f'Could not read html tidy cache {cache_file}: {err}')
+        return {}
+    if data.get("version") != _SECTION_CACHE_VERSION:
+        return {}
+    return data["sections"]
+
+
+def _save_section_cache(section_cache: dict):
+    """
+    Save the cache, only the most recently used sections are kept.
+    """
+    cache_file = CI_CONFIG.get_file_path("cache", "html_tidy_file")
+    keys = list(section_cache)[-CI_CONFIG.cache.html_tidy_max_entries:]
+    os.makedirs(cache_file.parent, exist_ok=True)
+    tmp_file = cache_file.with_suffix(".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        json.dump({"version": _SECTION_CACHE_VERSION, "sections": {key: section_cache[key] for key in keys}}, file)
+    os.replace(tmp_file, cache_file)
+
+
+def _set_section_cache(section_cache: dict):
+    global _SECTION_CACHE
+    _SECTION_CACHE = section_cache
+
+
+def _call_write_log(error_log_file, correct_log_file, model_file, error_list, html_correct_code, html_code):
+    """
+    Write a log file of the html test.
+    Args:
+        error_log_file (): opened error log
+        correct_log_file (): opened log of the corrected code
+        model_file (): model to check
+        error_list (): list of errors for each model
+        html_correct_code (): corrected html code
+        html_code (): html code of a modelica file
+    """
+    if error_list is not None and len(error_list) > 0:
+        error_log_file.write(f'\n---- {model_file} ----')
+        correct_log_file.write(
+            f'\n---- {model_file} ----'
+            f'\n-------- HTML Code --------'
+            f'\n{html_code}'
+            f'\n-------- Corrected Code --------'
+            f'\n{html_correct_code}'
+            f'\n-------- Errors --------')
+        for error in error_list:
+            error_log_file.write(f'\n{error}\n')
+            correct_log_file.write(f'\n{error}\n')
+
+
+def _check_html_file(model_file: str, check_corrected_code: bool = False):
+    _FILE_SECTIONS.clear()
+    correct_code, error_list, html_correct_code, html_code = _getInfoRevisionsHTML(model_file=model_file)
+    corrected = None
+    if len(error_list) == 0:
+        # The corrected code is only required for models with errors.
+        correct_code = None
+    elif check_corrected_code:
+        # Same result as checking the overwritten file again
+        _, corrected_error_list, corrected_html_correct_code, corrected_html_code = _getInfoRevisionsHTML(
+            model_file=model_file, lines=io.StringIO(correct_code).readlines()
+        )
+        corrected = (corrected_error_list, corrected_html_correct_code, corrected_html_code)
+    return model_file, correct_code, error_list, html_correct_code, html_code, dict(_FILE_SECTIONS), corrected
 
-        if len(error_list) > 0 and error_list is not None:
-            with open(f'{self.html_error_log}', "a", encoding="utf-8") as error_log_file, open(
-                    f'{self.html_correct_log}', "a", encoding="utf-8") as correct_log_file:
-                # logger.error(f'Error-log-file is saved in {self.html_error_log}')
-                # logger.error(f'Correct-log-file is saved in {self.html_correct_log}')
-                error_log_file.write(f'\n---- {model_file} ----')
-                correct_log_file.write(
-                    f'\n---- {model_file} ----'
-                    f'\n-------- HTML Code --------'
-                    f'\n{html_code}'
-                    f'\n-------- Corrected Code --------'
-                    f'\n{html_correct_code}'
-                    f'\n-------- Errors --------')
-                for error in error_list:
-                    error_log_file.write(f'\n{error}\n')
-                    correct_log_file.write(f'\n{error}\n')
-
-
-def _getInfoRevisionsHTML(model_file):
+
+def _getInfoRevisionsHTML(model_file, lines: list = None):
     """
     Returns a list that contains the html code
     This function returns a list that contain the html code of the
@@ -159,6 +252,7 @@ def _getInfoRevisionsHTML(model_file):
     Parameters
     ----------
     model_file : str - The name of a Modelica source file.
+    lines : list - If given, these lines are checked instead of the content of model_file.
     Returns
     -------
     The list of strings of the info and revisions section.
@@ -166,17 +260,22 @@ def _getInfoRevisionsHTML(model_file):
         model_file ():
     Returns:
     """
-    with open(model_file, mode="r", encoding="utf-8-sig") as f:
-        lines = f.readlines()
+    if lines is None:
+        with open(model_file, mode="r", encoding="utf-8-sig") as f:
+            lines = f.readlines()
     nLin = len(lines)
     is_tag_closed = True
     html_section_code = list()
     error_list = list()
     html_correct_code = list()
     html_code = list()
-    all_code = ""
+    # Lines of the code, the html sections are replaced by the corrected code.
+    all_code = list()
+    section_start = 0
     for i in range(nLin):
-        all_code = f'{all_code}{lines[i]}'
+        all_code.append(lines[i])
+        if not html_section_code:
+            section_start = len(all_code) - 1
         if is_tag_closed:  # search for opening tag
             idxO = lines[i].find("<html>")
             if idxO > -1:  # search for closing tag on same line as opening tag
@@ -201,14 +300,17 @@ def _getInfoRevisionsHTML(model_file):
                 html_correct_code.append(html_corr)
                 if len(errors) > 0:
                     error_list.append(errors)
-                all_code = all_code.replace(html_string, html_corr)
+                # Only the lines of this section can contain the html string
+                all_code[section_start:] = [''.join(all_code[section_start:]).replace(html_string, html_corr)]
 
                 html_section_code = list()
                 is_tag_closed = True
                 idxO = lines[i].find("<html>")
                 if idxO > -1:
+                    section_start = len(all_code) - 1
                     html_section_code.append(f'{lines[i][idxO + 6:]}')
                     is_tag_closed = False
+    all_code = ''.join(all_code)
     html_code = ''.join(html_code)
     html_correct_code = ''.join(html_correct_code)
 
@@ -225,14 +327,18 @@ def _htmlCorrection(html_code):
     """
     substitutions_dict: dict = {'"': '\\"', '<br>': '<br/>', '<br/>': '<br/>'}
     html_str = join_body(html_list=html_code)
-
-    if sys.platform == "win32":
-        # Enable local testing, requires ModelicaPyCI to be cloned, and then installed.
-        dll_path = str(Path(__file__).parent.joinpath("tidy-5.6.0-vc10-64b", "bin", "tidy.dll"))
-        tidy_document = Tidy(lib_names=[dll_path]).tidy_document
-    else:
-        tidy_document = Tidy().tidy_document
-    html_correct, errors = tidy_document(
+    if _SECTION_CACHE is not None:
+        key = hashlib.sha256(html_str.encode("utf-8")).hexdigest()
+        section = _SECTION_CACHE.get(key)
+        if section is None:
+            section = _tidy_html(html_str=html_str, substitutions_dict=substitutions_dict)
+        _FILE_SECTIONS[key] = section
+        return section[0], section[1]
+    return _tidy_html(html_str=html_str, substitutions_dict=substitutions_dict)
+
+
+def _tidy_html(html_str: str, substitutions_dict: dict):
+    html_correct, errors = _get_tidy().tidy_document(
         f"{html_str}",
         options={'doctype': 'html5',
                  'show-body-only': 1,
@@ -248,6 +354,21 @@ def _htmlCorrection(html_code):
     return document_corr, errors
 
 
+def _get_tidy():
+    """
+    Returns the Tidy instance of this process, the library is only loaded once.
+    """
+    global _TIDY
+    if _TIDY is None:
+        if sys.platform == "win32":
+            # Enable local testing, requires ModelicaPyCI to be cloned, and then installed.
+            dll_path = str(Path(__file__).parent.joinpath("tidy-5.6.0-vc10-64b", "bin", "tidy.dll"))
+            _TIDY = Tidy(lib_names=[dll_path])
+        else:
+            _TIDY = Tidy()
+    return _TIDY
+
+
 def join_body(html_list: list) -> str:
     """
     Joins a list of strings into a single string and makes replacements
@@ -568,6 +689,10 @@ def parse_args():
     parser.add_argument("--correct-view-flag", action="store_true", default=False,
                         help="Check and print the Correct HTML Code")
     parser.add_argument("--filter-whitelist-flag", default=False, action="store_true", help="Argument for ")
+    parser.add_argument("--use-cache", default=False, action="store_true",
+                        help="Reuse the tidy results of unchanged html sections (cache in ci/cache)")
+    parser.add_argument("--n-workers", default=None, type=int,
+                        help="Number of parallel processes (default: number of cpus)")
     return parser.parse_args()
 
 
@@ -585,14 +710,15 @@ if __name__ == '__main__':
             correct_view=args.correct_view_flag,
             library=args.library,
             whitelist_library=args.whitelist_library,
-            filter_whitelist=args.filter_whitelist_flag)
+            filter_whitelist=args.filter_whitelist_flag,
+            use_cache=args.use_cache)
 
         html_model = mo.get_model_list(
             library=args.library,
             package=PACKAGE,
             filter_whitelist_flag=args.filter_whitelist_flag
         )
-        html_tidy_check.check_html_files(model_list=html_model)
+        html_tidy_check.check_html_files(model_list=html_model, n_workers=args.n_workers)
         if args.log_flag is True:
             variable = call_read_log(
                 html_error_log=html_tidy_check.html_error_log,
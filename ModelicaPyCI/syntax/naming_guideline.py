@@ -1,8 +1,11 @@
 import argparse
+import hashlib
+import json
 import math
 import os
 import re
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import List, Union, Dict
 
@@ -12,7 +15,7 @@ from pydantic import BaseModel
 from ModelicaPyCI.api_script.api_github import PullRequestGithub
 from ModelicaPyCI.load_global_config import CI_CONFIG
 from ModelicaPyCI.structure import sort_mo_model as mo
-from ModelicaPyCI.utils import logger
+from ModelicaPyCI.utils import logger, profile
 
 
 class NamingGuidelineConfig(BaseModel):
@@ -175,11 +178,142 @@ class NamingGuidelineConfig(BaseModel):
     ]
 
 
+_COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.DOTALL)
+_EQUATION_START_PATTERN = re.compile(r'\nequation\n|\ninitial equation\n|\ninitial algorithm\n|\nalgorithm\n')
+_STRING_PATTERN = re.compile(r'\".*?\"')
+_LAST_DIGIT_PATTERN = re.compile(r'\d(?=\D*$)')
+# Modelica identifiers only contain ascii characters
+_CAMEL_CASE_PATTERN = re.compile(r'(?<!^)(?=[A-Z])')
+
+_COMPILED_NAMING_CONFIG = (None, None)
+# Compiled config of a worker process of get_possibly_wrong_code_sections
+_WORKER_NAMING_CONFIG = None
+_NAME_VERDICT_CACHE_VERSION = 1
+
+
+class CompiledNamingGuideline:
+
+    def __init__(self, naming_config: NamingGuidelineConfig):
+        """
+        The lists of the NamingGuidelineConfig compiled to sets and lookup tables,
+        so checking a name does not loop over the lists.
+        Special ends and starts are looked up by their length, the first
+        matching entry of the list is used, as the order of the lists is important.
+        Args:
+            naming_config (): config to compile
+        """
+        self.modelica_types = frozenset(naming_config.modelica_types)
+        self.library_prefixes = tuple(f"{lib}." for lib in naming_config.libraries)
+        self.modelica_special_names = frozenset(naming_config.modelica_special_names)
+        self.special_names = frozenset(naming_config.special_names)
+        self.special_parts_with_upper = tuple(naming_config.special_parts_with_upper)
+        self.special_parts = frozenset(naming_config.special_parts)
+        self.short_words = frozenset(naming_config.two_character_words + naming_config.four_character_words)
+        self.special_ends, self.special_end_lengths = _compile_affixes(naming_config.special_ends)
+        self.special_starts, self.special_start_lengths = _compile_affixes(naming_config.special_starts)
+        self.config_hash = get_config_hash(naming_config)
+        # Verdicts of check_if_name_is_ok, as names repeat in all models of a library
+        self.name_verdicts = {}
+        # Verdicts used since the last call of pop_used_name_verdicts
+        self.used_name_verdicts = {}
+
+    def pop_used_name_verdicts(self):
+        used_name_verdicts = self.used_name_verdicts
+        self.used_name_verdicts = {}
+        return used_name_verdicts
+
+    def is_valid_modelica_type(self, string: str):
+        return string in self.modelica_types or string.startswith(self.library_prefixes)
+
+    def get_special_end(self, part: str):
+        return _get_first_affix(
+            affixes=self.special_ends, lengths=self.special_end_lengths,
+            get_affix=lambda length: part[len(part) - length:], max_length=len(part)
+        )
+
+    def get_special_start(self, part: str):
+        return _get_first_affix(
+            affixes=self.special_starts, lengths=self.special_start_lengths,
+            get_affix=lambda length: part[:length], max_length=len(part)
+        )
+
+
+def _compile_affixes(affixes: list):
+    index = {}
+    for idx, affix in enumerate(affixes):
+        index.setdefault(affix, idx)
+    return index, sorted({len(affix) for affix in index})
+
+
+def _get_first_affix(affixes: dict, lengths: list, get_affix, max_length: int):
+    best_idx = None
+    best_affix = None
+    for length in lengths:
+        if length > max_length:
+            break
+        affix = get_affix(length)
+        idx = affixes.get(affix)
+        if idx is not None and (best_idx is None or idx < best_idx):
+            best_idx = idx
+            best_affix = affix
+    return best_affix
+
+
+def compile_naming_config(naming_config: NamingGuidelineConfig):
+    """
+    Returns the compiled config, the last compiled config is reused.
+    """
+    global _COMPILED_NAMING_CONFIG
+    if isinstance(naming_config, CompiledNamingGuideline):
+        return naming_config
+    if _COMPILED_NAMING_CONFIG[0] is not naming_config:
+        _COMPILED_NAMING_CONFIG = (naming_config, CompiledNamingGuideline(naming_config))
+    return _COMPILED_NAMING_CONFIG[1]
+
+
+def get_config_hash(naming_config: NamingGuidelineConfig):
+    """
+    Returns a hash of the config, cached verdicts of names are only valid for the same config.
+    """
+    config = json.dumps(naming_config.model_dump(), sort_keys=True)
+    return hashlib.sha256(config.encode("utf-8")).hexdigest()
+
+
+def _load_name_verdict_cache(config_hash: str):
+    cache_file = CI_CONFIG.get_file_path("cache", "naming_verdict_file")
+    if not os.path.isfile(cache_file):
+        return {}
+    try:
+        with open(cache_file, "r", encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError) as err:
+        logger.warning(f'Could not read naming verdict cache {cache_file}: {err}')
+        return {}
+    if data.get("version") != _NAME_VERDICT_CACHE_VERSION or data.get("config_hash") != config_hash:
+        logger.info("Naming guideline config changed, the verdict cache is not used.")
+        return {}
+    return {name: tuple(verdict) for name, verdict in data["verdicts"].items()}
+
+
+def _save_name_verdict_cache(config_hash: str, name_verdicts: dict):
+    """
+    Save the cache, only the most recently used verdicts are kept.
+    """
+    cache_file = CI_CONFIG.get_file_path("cache", "naming_verdict_file")
+    names = list(name_verdicts)[-CI_CONFIG.cache.naming_verdict_max_entries:]
+    os.makedirs(cache_file.parent, exist_ok=True)
+    tmp_file = cache_file.with_suffix(".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        json.dump({
+            "version": _NAME_VERDICT_CACHE_VERSION,
+            "config_hash": config_hash,
+            "verdicts": {name: name_verdicts[name] for name in names}
+        }, file)
+    os.replace(tmp_file, cache_file)
+
+
 def is_valid_modelica_type(string, naming_config: NamingGuidelineConfig):
-    return (
-            (string in naming_config.modelica_types) or
-            any([string.startswith(lib + ".") for lib in naming_config.libraries])
-    )
+    return compile_naming_config(naming_config).is_valid_modelica_type(string)
 
 
 def get_all_repo_files(repo_path):
@@ -198,56 +332,56 @@ def remove_annotation(line, naming_config: NamingGuidelineConfig):
     return "annotation".join(line.split("annotation")[:-1])
 
 
+@profile("check naming guidelines", category="phase")
 def get_possibly_wrong_code_sections(
-        files: list, library: str, naming_config: NamingGuidelineConfig
+        files: list, library: str, naming_config: NamingGuidelineConfig,
+        n_workers: int = None, use_cache: bool = False
 ):
+    """
+    Check the names and documentation of all expressions of the given models.
+    Args:
+        files (): models to check
+        library (): library name
+        naming_config (): naming guideline config
+        n_workers (): number of parallel processes, default is the number of cpus
+        use_cache (): load and save the verdicts of names in ci/cache.
+            The cache is invalidated if the naming guideline config changes.
+    Returns:
+        all_problematic_expressions (): dict with the reason of each problematic expression
+        filename (): file with the problematic expressions of each file
+    """
+    config_hash = get_config_hash(naming_config)
+    name_verdicts = _load_name_verdict_cache(config_hash=config_hash) if use_cache else {}
     output = ""
     all_problematic_expressions = {}
+    model_files = []
     for model_name in files:
         parts = model_name.split(".")
         parts[-1] += ".mo"
         file = Path(CI_CONFIG.library_root).joinpath(*parts)
         if file.name == "package.mo":
             continue
-        try:
-            expressions = get_expressions(
-                filepath_model=file,
-                naming_config=naming_config
-            )
-        except Exception as err:
-            logger.error(f"Can't process file {file} due to {err}")
-        problematic_expressions = {}
-        for expression in expressions[2:]:  # First two expressions are always the model and within statement
-            # Extend modifiers include no new names
-            if expression.startswith("extends"):
-                continue
-            # The model annotation includes no new names
-            if expression.startswith("annotation"):
-                continue
-            # If no equation is present, the model ends with a line "end "
-            if expression.startswith("end "):
-                continue
-            expression_without_annotation = remove_annotation(expression, naming_config=naming_config)
-            name_is_ok, doc_is_ok, reason_name, reason_doc, list_parts_not_okay = line_is_ok(
-                expression_without_annotation, naming_config=naming_config
-            )
-
-            if not name_is_ok and not doc_is_ok:
-                problematic_expressions[expression] = f"{reason_doc}, {reason_name}"
-            elif not name_is_ok:
-                problematic_expressions[expression] = reason_name
-            elif not doc_is_ok:
-                problematic_expressions[expression] = reason_doc
-            else:
-                pass
-
-        if problematic_expressions:
-            output += "\n\n\n" + str(file) + "\n"
-            output += "\n\n".join([
-                f"{i + 1}: {problematic_expressions[key]}. "
-                f"Affected line: {key}" for i, key in enumerate(problematic_expressions)
-            ])
-            all_problematic_expressions.update(problematic_expressions)
+        model_files.append(file)
+    chunksize = max(1, len(model_files) // (4 * (n_workers or os.cpu_count() or 1)))
+    with ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_set_worker_config, initargs=(naming_config, name_verdicts)
+    ) as executor:
+        for file, problematic_expressions, used_name_verdicts in executor.map(
+                _get_problematic_expressions, model_files, chunksize=chunksize):
+            for name, verdict in used_name_verdicts.items():
+                # Most recently used verdicts are kept at the end
+                name_verdicts.pop(name, None)
+                name_verdicts[name] = verdict
+            if problematic_expressions:
+                output += "\n\n\n" + str(file) + "\n"
+                output += "\n\n".join([
+                    f"{i + 1}: {problematic_expressions[key]}. "
+                    f"Affected line: {key}" for i, key in enumerate(problematic_expressions)
+                ])
+                all_problematic_expressions.update(problematic_expressions)
+
+    if use_cache:
+        _save_name_verdict_cache(config_hash=config_hash, name_verdicts=name_verdicts)
 
     filename = f"wrong_code_parts_{library}.txt"
     with open(filename, "w+", encoding="utf-8") as file:
@@ -262,6 +396,49 @@ def get_possibly_wrong_code_sections(
     return all_problematic_expressions, filename
 
 
+def _set_worker_config(naming_config: NamingGuidelineConfig, name_verdicts: dict):
+    global _WORKER_NAMING_CONFIG
+    _WORKER_NAMING_CONFIG = compile_naming_config(naming_config)
+    _WORKER_NAMING_CONFIG.name_verdicts.update(name_verdicts)
+
+
+def _get_problematic_expressions(file: Path):
+    naming_config = _WORKER_NAMING_CONFIG
+    try:
+        expressions = get_expressions(
+            filepath_model=file,
+            naming_config=naming_config
+        )
+    except Exception as err:
+        logger.error(f"Can't process file {file} due to {err}")
+        return file, {}, naming_config.pop_used_name_verdicts()
+    problematic_expressions = {}
+    for expression in expressions[2:]:  # First two expressions are always the model and within statement
+        # Extend modifiers include no new names
+        if expression.startswith("extends"):
+            continue
+        # The model annotation includes no new names
+        if expression.startswith("annotation"):
+            continue
+        # If no equation is present, the model ends with a line "end "
+        if expression.startswith("end "):
+            continue
+        expression_without_annotation = remove_annotation(expression, naming_config=naming_config)
+        name_is_ok, doc_is_ok, reason_name, reason_doc, list_parts_not_okay = line_is_ok(
+            expression_without_annotation, naming_config=naming_config
+        )
+
+        if not name_is_ok and not doc_is_ok:
+            problematic_expressions[expression] = f"{reason_doc}, {reason_name}"
+        elif not name_is_ok:
+            problematic_expressions[expression] = reason_name
+        elif not doc_is_ok:
+            problematic_expressions[expression] = reason_doc
+        else:
+            pass
+    return file, problematic_expressions, naming_config.pop_used_name_verdicts()
+
+
 def get_expressions(filepath_model: str, naming_config: NamingGuidelineConfig):
     """
     This function extracts specific expressions out of modelica models.
@@ -279,15 +456,10 @@ def get_expressions(filepath_model: str, naming_config: NamingGuidelineConfig):
         script = file.read()
 
     # Remove multi-line comments
-    # Define the regular expression pattern to match content between /* and */
-    pattern = r'/\*.*?\*/'
-    script = re.sub(pattern, '', script, flags=re.DOTALL).strip()
+    script = _COMMENT_PATTERN.sub('', script).strip()
 
     # Get position of "equation" or "initial equation"
-    equation_start = re.search(
-        r'\nequation\n|\ninitial equation\n|\ninitial algorithm\n|\nalgorithm\n',
-        script
-    )
+    equation_start = _EQUATION_START_PATTERN.search(script)
     pos_equation = equation_start.span()[0] if equation_start else math.inf
 
     def _filter_text(text):
@@ -295,16 +467,17 @@ def get_expressions(filepath_model: str, naming_config: NamingGuidelineConfig):
 
     # Find desired expression in modelica script
     sep = ";\n"
-    _pattern = r"%s" % sep
     # Get position of expressions
     expressions = []
     last_loc = 0
-    for match in re.finditer(_pattern, script, re.MULTILINE):
+    loc = script.find(sep)
+    while loc != -1:
         if last_loc > pos_equation:
             break
-        loc = match.span()[0] + len(sep)
+        loc += len(sep)
         expressions.append(script[last_loc:loc])
         last_loc = loc
+        loc = script.find(sep, last_loc)
     else:
         expressions.append(script[last_loc:])
 
@@ -359,12 +532,23 @@ def line_is_ok(line, naming_config: NamingGuidelineConfig):
 
 
 def check_if_name_is_ok(name: str, naming_config: NamingGuidelineConfig):
+    naming_config = compile_naming_config(naming_config)
+    verdict = naming_config.name_verdicts.get(name)
+    if verdict is None:
+        verdict = _check_if_name_is_ok(name=name, naming_config=naming_config)
+        naming_config.name_verdicts[name] = verdict
+    naming_config.used_name_verdicts[name] = verdict
+    name_is_ok, reason_name, parts_not_ok = verdict
+    return name_is_ok, reason_name, list(parts_not_ok)
+
+
+def _check_if_name_is_ok(name: str, naming_config: CompiledNamingGuideline):
     name_clean = name
     if name in naming_config.special_names:
-        return True, "Name is correct", []
+        return True, "Name is correct", ()
     if " " in name:
         return False, ("Could not extract name from line and check correctness, "
-                       "is your type specification correct (full library path)?"), []
+                       "is your type specification correct (full library path)?"), ()
     for special_parts_with_cap in naming_config.special_parts_with_upper:
         name = name.replace(special_parts_with_cap, "")
     name_parts = split_camel_case(string=name)
@@ -376,16 +560,17 @@ def check_if_name_is_ok(name: str, naming_config: NamingGuidelineConfig):
         else:
             next_part = ""
         # separates SPECIAL_END from parts
-        for special_end in naming_config.special_ends:
-            if part.endswith(special_end):
-                name_parts = [s.replace(part, part[:-len(special_end)]) for s in name_parts]
-                part = part[:-len(special_end)]
-                break
+        special_end = naming_config.get_special_end(part)
+        if special_end is not None and special_end:
+            name_parts = [s.replace(part, part[:-len(special_end)]) for s in name_parts]
+            part = part[:-len(special_end)]
+        elif special_end is not None:
+            name_parts = [s.replace(part, "") for s in name_parts]
+            part = ""
         # separates special_starts from parts
-        for special_start in naming_config.special_starts:
-            if part.startswith(special_start):
-                part = part[len(special_start):]
-                break
+        special_start = naming_config.get_special_start(part)
+        if special_start is not None:
+            part = part[len(special_start):]
 
         part = remove_last_digit(part)  # trailing digits are ok, e.g. vol1, vol2, etc.
 
@@ -393,8 +578,7 @@ def check_if_name_is_ok(name: str, naming_config: NamingGuidelineConfig):
                 (part in naming_config.special_parts) or
                 (len(part) == 3) or
                 (len(part) == 0) or
-                (part.lower() in naming_config.two_character_words) or
-                (part.lower() in naming_config.four_character_words) or
+                (part.lower() in naming_config.short_words) or
                 part == "d" and next_part == "T"  # Case for dT
         )
         parts_ok.append(part_is_ok)
@@ -402,24 +586,17 @@ def check_if_name_is_ok(name: str, naming_config: NamingGuidelineConfig):
         parts_not_ok = [part for part, ok in zip(name_parts, parts_ok) if not ok]
         return False, f"Name '{name_clean}' contains parts with more/less than " \
                       f"3 characters or which are not part of special cases. " \
-                      f"Affected parts: {', '.join(parts_not_ok)}", parts_not_ok
+                      f"Affected parts: {', '.join(parts_not_ok)}", tuple(parts_not_ok)
     else:
-        return True, f"Name '{name_clean}' is correct", []
+        return True, f"Name '{name_clean}' is correct", ()
 
 
 def remove_last_digit(string):
-    return re.sub(r'\d(?=\D*$)', '', string)
+    return _LAST_DIGIT_PATTERN.sub('', string)
 
 
 def split_camel_case(string):
-    parts = []
-    last_upper = 0
-    for i, char in enumerate(string):
-        if char.isupper() and last_upper != i:
-            parts.append(string[last_upper:i])
-            last_upper = i
-    parts.append(string[last_upper:len(string)])
-    return parts
+    return _CAMEL_CASE_PATTERN.split(string)
 
 
 def get_documentation_from_line(line: str):
@@ -436,10 +613,11 @@ def get_documentation_from_line(line: str):
 
 
 def get_name_from_line(line, naming_config: NamingGuidelineConfig):
+    naming_config = compile_naming_config(naming_config)
     parts = line.split(" ")
     _filtered_parts = []
     for part in parts:
-        if is_valid_modelica_type(part, naming_config=naming_config) or part in naming_config.modelica_special_names:
+        if naming_config.is_valid_modelica_type(part) or part in naming_config.modelica_special_names:
             continue
         _filtered_parts.append(part)
     line_clean = " ".join(_filtered_parts)
@@ -469,14 +647,10 @@ def is_full_modelica_line(line, naming_config: NamingGuidelineConfig):
     # Remove possible docs to avoid a case like
     # Real array[2, 2] = [0, 0; 0, 0] "An array of type Real with 2-2 dimensions";
     # This would be valid, but "Real" is in the documentation and the type.
-    contains_type = False
-    line_without_doc = re.sub(r'\".*?\"', "", line, re.DOTALL)
-    for part in line.split(" "):
-        if is_valid_modelica_type(part, naming_config=naming_config):
-            contains_type = True
-            break
-    if not contains_type:
+    naming_config = compile_naming_config(naming_config)
+    if not any(naming_config.is_valid_modelica_type(part) for part in line.split(" ")):
         return False
+    line_without_doc = _STRING_PATTERN.sub("", line)
     for opening_bracket, closing_bracket in zip(["(", "[", "{"], [")", "]", "}"]):
         if line_without_doc.count(opening_bracket) != line_without_doc.count(closing_bracket):
             return False
@@ -498,6 +672,14 @@ def parse_args():
         help="your base branch (main)"
     )
     check_test_group.add_argument("--changed-flag", action="store_true")
+    check_test_group.add_argument(
+        "--n-workers", default=None, type=int,
+        help="Number of parallel processes (default: number of cpus)"
+    )
+    check_test_group.add_argument(
+        "--use-cache", action="store_true",
+        help="Reuse the verdicts of names of previous runs (cache in ci/cache)"
+    )
 
     return parser.parse_args()
 
@@ -539,7 +721,9 @@ if __name__ == '__main__':
     PROBLEMATIC_EXPRESSIONS, FILENAME = get_possibly_wrong_code_sections(
         files=FILES_TO_CHECK,
         library=ARGS.library,
-        naming_config=NAMING_CONFIG
+        naming_config=NAMING_CONFIG,
+        n_workers=ARGS.n_workers,
+        use_cache=ARGS.use_cache
     )
     # move_output_to_artifacts
     TARGET = CI_CONFIG.get_file_path("result", "naming_violation_file")
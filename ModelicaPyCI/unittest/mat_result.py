@@ -0,0 +1,142 @@
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+# Precision digit P of the MOPT type of a MATLAB v4 matrix
+_MAT_V4_DTYPES = {0: "f8", 1: "f4", 2: "i4", 3: "i2", 4: "u2", 5: "u1"}
+
+
+class MatResultFile:
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Lazy reader for result files of Dymola (dsres) and OpenModelica in the
+        MATLAB v4 format. Only the matrix headers are read on opening, all
+        matrices are memory-mapped. Names and the dataInfo table are decoded
+        on first use, values only for the requested variables and time steps.
+        Aliased variables share one column of data_2, see get_columns.
+        Args:
+            path (): .mat result file
+        """
+        self.path = Path(path)
+        self.matrices = _read_mat_v4_matrices(self.path)
+        self.transposed = _get_strings(self.matrices["Aclass"], transposed=False)[3] == "binTrans"
+        self.data_2 = self._get_matrix("data_2")
+        self._variables = None
+        self._time = None
+
+    def _get_matrix(self, name: str):
+        matrix = self.matrices[name]
+        return matrix.T if self.transposed else matrix
+
+    @property
+    def variables(self):
+        """
+        Dict with the name of each variable and its matrix (1: data_1, 2: data_2),
+        its column in the matrix and its sign, decoded from the dataInfo table.
+        """
+        if self._variables is None:
+            names = _get_strings(self.matrices["name"], transposed=self.transposed)
+            data_info = np.asarray(self._get_matrix("dataInfo")[:, :2], dtype=int)
+            matrices = np.where(data_info[:, 0] == 0, 2, data_info[:, 0])
+            self._variables = {
+                name: (int(matrix), abs(int(column)) - 1, 1 if column > 0 else -1)
+                for name, matrix, column in zip(names, matrices, data_info[:, 1])
+            }
+        return self._variables
+
+    @property
+    def names(self):
+        return list(self.variables)
+
+    @property
+    def time(self):
+        if self._time is None:
+            self._time = np.asarray(self.data_2[:, 0], dtype=float)
+        return self._time
+
+    def get_trajectory_variables(self):
+        """
+        Returns the names of all variables stored in data_2, i.e. all variables but time and parameters.
+        """
+        return [
+            name for name, (matrix, column, _) in self.variables.items()
+            if matrix == 2 and column != 0
+        ]
+
+    def get_columns(self, names: list):
+        """
+        Returns the data_2 columns and signs of the given variables.
+        Aliases of the same variable have the same column.
+        """
+        columns = np.array([self.variables[name][1] for name in names], dtype=int)
+        signs = np.array([self.variables[name][2] for name in names], dtype=int)
+        return columns, signs
+
+    def get_column_values(self, columns: np.ndarray, rows=None):
+        """
+        Returns the values of data_2 with the shape (len(rows), len(columns)).
+        Only the given columns are copied from the file.
+        """
+        columns = np.asarray(columns, dtype=int)
+        if rows is None:
+            return np.asarray(self.data_2[:, columns], dtype=float)
+        return np.asarray(self.data_2[np.asarray(rows)[:, None], columns[None, :]], dtype=float)
+
+    def get_values(self, names: list, rows=None):
+        """
+        Returns the values of the given data_2 variables at the given rows (time step indices)
+        as array with the shape (len(rows), len(names)).
+        """
+        columns, signs = self.get_columns(names)
+        unique_columns, inverse = np.unique(columns, return_inverse=True)
+        return self.get_column_values(unique_columns, rows=rows)[:, inverse] * signs
+
+    def get_trajectory(self, name: str):
+        """
+        Returns the values of one variable for all time steps.
+        """
+        return self.get_values([name])[:, 0]
+
+
+def _read_mat_v4_matrices(path: Path):
+    matrices = {}
+    header_dtype = np.dtype("<i4")
+    file_size = path.stat().st_size
+    with open(path, "rb") as file:
+        offset = 0
+        while offset < file_size:
+            file.seek(offset)
+            header = np.frombuffer(file.read(20), dtype=header_dtype)
+            if len(header) < 5:
+                break
+            mopt, mrows, ncols, imagf, namlen = (int(value) for value in header)
+            if mopt > 5000 or mopt < 0:
+                header = header.byteswap()
+                mopt, mrows, ncols, imagf, namlen = (int(value) for value in header)
+            byte_order = ">" if mopt // 1000 == 1 else "<"
+            dtype = np.dtype(byte_order + _MAT_V4_DTYPES[(mopt // 10) % 10])
+            name = file.read(namlen).rstrip(b"\0").decode("ascii")
+            data_offset = offset + 20 + namlen
+            if mrows * ncols > 0:
+                matrices[name] = np.memmap(
+                    path, dtype=dtype, mode="r", offset=data_offset, shape=(mrows, ncols), order="F"
+                )
+            else:
+                matrices[name] = np.zeros((mrows, ncols), dtype=dtype)
+            offset = data_offset + mrows * ncols * dtype.itemsize * (2 if imagf else 1)
+    return matrices
+
+
+def _get_strings(matrix: np.ndarray, transposed: bool):
+    """
+    Decode a text matrix with one string per row, or per column if transposed.
+    """
+    chars = np.ascontiguousarray((matrix.T if transposed else matrix), dtype=np.uint8)
+    if chars.shape[1] == 0:
+        return [""] * chars.shape[0]
+    return [
+        string.decode("latin-1").rstrip(" ")
+        for string in chars.view(f"S{chars.shape[1]}").ravel()
+    ]
@@ -1,19 +1,21 @@
 import argparse
 import os
-import platform
+import time
 from pathlib import Path
 
 import matplotlib.pyplot as plt
 import numpy as np
-from OMPython import OMCSessionZMQ
-from ebcpy import DymolaAPI, TimeSeriesData
-from ebcpy.utils.statistics_analyzer import StatisticsAnalyzer
+from ebcpy import DymolaAPI
 
 from ModelicaPyCI.load_global_config import CI_CONFIG
 from ModelicaPyCI.structure import config_structure
 from ModelicaPyCI.structure import sort_mo_model as mo
 from ModelicaPyCI.pydyminterface import python_dymola_interface
-from ModelicaPyCI.utils import logger
+from ModelicaPyCI.unittest.mat_result import MatResultFile
+from ModelicaPyCI.unittest.om_session_pool import OMCSession, OMCSessionError, OMCSessionPool
+from ModelicaPyCI.unittest.result_comparison import compare_results
+from ModelicaPyCI.unittest.result_store import CheckResult, ResultStore, ERROR, SUCCESS, classify_log
+from ModelicaPyCI.utils import compile_exceptions, get_profile_durations, logger, profile
 
 
 class StoreDictKeyPair(argparse.Action):
@@ -67,29 +69,38 @@ class CheckOpenModelica:
     def __init__(self,
                  library: str,
                  library_package_mo: Path,
-                 working_path: Path = Path(Path.cwd())):
+                 working_path: Path = Path(Path.cwd()),
+                 n_sessions: int = 1,
+                 timeout: float = None,
+                 result_store: ResultStore = None):
         """
         Args:
             working_path:
             library ():
             library_package_mo ():
+            n_sessions (): number of parallel OpenModelica sessions
+            timeout (): maximal time in seconds to check or simulate one model, None for no limit.
+            result_store (): Store of the check results, default is the result_store_file of the result directory.
         """
         self.library_package_mo = library_package_mo
         self.working_path = working_path
+        self.timeout = timeout
 
         self.library = library
         # [start openModelica]
-        logger.info(f'1: Starting OpenModelica instance')
-        if platform.system() == "Windows":
-            self.omc = OMCSessionZMQ()
-
-        else:
-            self.omc = OMCSessionZMQ(dockerOpenModelicaPath="/usr/bin/omc_orig")
-        logger.info(f'OpenModelica Version number: {self.omc.sendExpression("getVersion()")}')
+        logger.info(f'1: Starting OpenModelica instances')
+        self.pool = OMCSessionPool(
+            library_package_mo=self.library_package_mo,
+            library=self.library,
+            n_sessions=n_sessions
+        )
+        self.tool_version = self.pool.send_expression("getVersion()")
+        logger.info(f'OpenModelica Version number: {self.tool_version}')
+        self.result_store = ResultStore() if result_store is None else result_store
+        # Start of the last check or simulation, durations of earlier packages are not stored again
+        self._check_start = None
         # [start dymola api]
         self.dym_api = None
-        self.load_library(library_package_mo=self.library_package_mo,
-                          library=self.library)
 
     def simulate_models(self, model_list: list, package: str, exception_list: list = None):
         all_sims_dir = CI_CONFIG.get_file_path("result", "OM_check_result_dir").joinpath(
@@ -98,186 +109,141 @@ class CheckOpenModelica:
         config_structure.create_path(all_sims_dir)
         config_structure.delete_files_in_path(all_sims_dir)
         logger.info(f'Simulate examples and validations')
+        self._check_start = time.time()
+        results = self.pool.map(
+            lambda session, example: self._simulate_model(
+                session=session, example=example, all_sims_dir=all_sims_dir
+            ),
+            model_list
+        )
         error_model = {}
-        for example in model_list:
-            err_list = []
-            logger.info(f'Simulate example {example}')
-            result = self.omc.sendExpression(f"simulate({example})")
-            if "The simulation finished successfully" in result["messages"]:
+        exception_pattern = compile_exceptions(exception_list)
+        for example, _err_msg in zip(model_list, results):
+            if isinstance(_err_msg, OMCSessionError):
+                _err_msg = str(_err_msg)
+            if _err_msg is None:
                 logger.info(f'\n Successful: {example}\n')
-                config_structure.prepare_data(source_target_dict={result["resultFile"]: all_sims_dir})
+                continue
+            check_result = classify_log(model=example, log=_err_msg, exception_list=exception_pattern)
+            if check_result.status == ERROR:
+                logger.error(f'  Error:     {example}')
+                logger.error(f'{_err_msg}')
             else:
-                _err_msg = result["messages"]
-                _err_msg += "\n" + self.omc.sendExpression("getErrorString()")
-                for line in _err_msg.split("\n"):
-                    exception_flag = False
-                    if len(line) == 0:
-                        continue
-                    if exception_list is not None:
-                        for exception in exception_list:
-                            if exception in line:
-                                exception_flag = True
-                        if exception_flag is False:
-                            err_list.append(line)
-                    else:
-                        err_list.append(line)
-                if len(err_list) > 0:
-                    logger.error(f'  Error:     {example}')
-                    logger.error(f'{_err_msg}')
-                else:
-                    logger.warning(f' Warning:     {example}')
-                    logger.warning(f'{_err_msg}')
-                error_model[example] = _err_msg
-            config_structure.delete_spec_file(root=os.getcwd(), pattern=example)
+                logger.warning(f' Warning:     {example}')
+                logger.warning(f'{_err_msg}')
+            error_model[example] = check_result
         config_structure.prepare_data(source_target_dict={API_log: all_sims_dir}, del_flag=True)
         return error_model
 
+    def _simulate_model(self, session: OMCSession, example: str, all_sims_dir: Path):
+        logger.info(f'Simulate example {example}')
+        with profile(example, category="simulate", tool="openmodelica"):
+            result = session.send_expression(f"simulate({example})", timeout=self.timeout)
+        try:
+            if "The simulation finished successfully" in result["messages"]:
+                config_structure.prepare_data(source_target_dict={result["resultFile"]: all_sims_dir})
+                return None
+            return result["messages"] + "\n" + session.send_expression("getErrorString()")
+        finally:
+            config_structure.delete_spec_file(root=session.working_dir, pattern=example)
+
     def check_models(
             self,
             package: str,
             model_list: list,
             exception_list: list = None):
         logger.info(f'Check models with OpenModelica')
+        self._check_start = time.time()
+        results = self.pool.map(self._check_model, model_list)
         error_model = {}
-        for m in model_list:
-            err_list = []
-            logger.info(f'Check model {m}')
-            result = self.omc.sendExpression(f"checkModel({m})")
-            if "completed successfully" in result:
+        exception_pattern = compile_exceptions(exception_list)
+        for m, _err_msg in zip(model_list, results):
+            if isinstance(_err_msg, OMCSessionError):
+                _err_msg = str(_err_msg)
+            if _err_msg is None:
                 logger.info(f' Successful:  {m}')
+                continue
+            check_result = classify_log(model=m, log=_err_msg, exception_list=exception_pattern)
+            if check_result.status == ERROR:
+                logger.error(m)
+                logger.error(_err_msg)
             else:
-                _err_msg = self.omc.sendExpression("getErrorString()")
-                for line in _err_msg.split("\n"):
-                    exception_flag = False
-                    if len(line) == 0:
-                        continue
-                    if exception_list is not None:
-                        for exception in exception_list:
-                            if exception in line:
-                                exception_flag = True
-                        if exception_flag is False:
-                            err_list.append(line)
-                    else:
-                        err_list.append(line)
-                if len(err_list) > 0:
-                    logger.error(m)
-                    logger.error(_err_msg)
-                else:
-                    logger.warning(m)
-                    logger.warning(_err_msg)
-                error_model[m] = _err_msg
+                logger.warning(m)
+                logger.warning(_err_msg)
+            error_model[m] = check_result
         return error_model
 
+    def _check_model(self, session: OMCSession, model: str):
+        logger.info(f'Check model {model}')
+        with profile(model, category="check", tool="openmodelica"):
+            result = session.send_expression(f"checkModel({model})", timeout=self.timeout)
+        if "completed successfully" in result:
+            return None
+        return session.send_expression("getErrorString()")
+
     def close_OM(self):
-        self.omc.sendExpression("quit()")
+        try:
+            self.pool.close()
+        finally:
+            self.result_store.close()
 
+    @profile("write error log", category="log")
     def write_errorlog(self,
                        pack: str = None,
                        error_dict: dict = None,
-                       exception_list: list = None,
-                       options: str = None):
+                       options: str = None,
+                       model_list: list = None,
+                       export_text_logs: bool = False):
         """
-        Write an error log with all models, that don´t pass the check
+        Store the results of all checked models and exit if a model failed.
         Args:
-            options:
+            options: check or simulate
             pack ():
-            exception_list ():
-            error_dict ():
+            error_dict (): failed models with their CheckResult, see check_models and simulate_models
+            model_list (): all checked models, the models not in error_dict are successful.
+            export_text_logs (): Write the check log and error log as text files.
         """
-        if error_dict is not None:
-            if pack is not None:
-                ch_log = CI_CONFIG.get_file_path("result", "OM_check_result_dir").joinpath(
-                    options, f'{self.library}.{pack}-check_log.txt')
-                error_log = CI_CONFIG.get_file_path("result", "OM_check_result_dir").joinpath(
-                    options, f'{self.library}.{pack}-error_log.txt')
-                os.makedirs(Path(ch_log).parent, exist_ok=True)
-                check_log = open(ch_log, "w")
-                err_log = open(error_log, "w")
-                for error_model in error_dict:
-                    err_list = []
-                    warning_list = []
-                    for line in error_dict[error_model].split("\n"):
-                        exception_flag = False
-                        if len(line) == 0:
-                            continue
-                        if exception_list is not None:
-                            for exception in exception_list:
-                                if exception in line:
-                                    exception_flag = True
-                                    warning_list.append(line)
-                            if exception_flag is False:
-                                err_list.append(line)
-                        else:
-                            err_list.append(line)
-                    if len(err_list) > 0:
-                        check_log.write(f'\n\nError in model:  {error_model} \n')
-                        err_log.write(f'\n\nError in model:  {error_model} \n')
-                        for err in err_list:
-                            check_log.write(err + "\n")
-                            err_log.write(err + "\n")
-                        if len(warning_list) > 0:
-                            for warning in warning_list:
-                                check_log.write(warning + "\n")
-                        else:
-                            for err in err_list:
-                                check_log.write(err + "\n")
-                                err_log.write(err + "\n")
-                    else:
-                        check_log.write(f'\n\nWarning in model:  {error_model} \n')
-                        if len(warning_list) > 0:
-                            for warning in warning_list:
-                                check_log.write(warning + "\n")
-                check_log.close()
-                err_log.close()
-                var = self._read_error_log(pack=pack, err_log=error_log, check_log=ch_log,
-                                           options=options)
-                if var != 0:
-                    exit(var)
-                return var
-            else:
-                logger.error(f'Package is not set.')
-                exit(1)
-        else:
+        if error_dict is None:
             logger.info(f"Check was successful.")
+            return 0
+        if pack is None:
+            logger.error(f'Package is not set.')
+            exit(1)
+        durations = get_profile_durations(category=options, names=model_list, since=self._check_start)
+        results = [
+            CheckResult(model=model, status=SUCCESS, duration=durations.get(model))
+            for model in model_list or [] if model not in error_dict
+        ]
+        for error_model, check_result in error_dict.items():
+            results.append(check_result._replace(duration=durations.get(error_model)))
+        self.result_store.add_results(
+            tool="openmodelica", library=self.library, package=pack, option=options, results=results,
+            tool_version=self.tool_version
+        )
+        if export_text_logs and error_dict:
+            self._export_text_logs(pack=pack, options=options)
+        var = self.result_store.get_exit_code(tool="openmodelica", library=self.library, package=pack, option=options)
+        if var != 0:
+            logger.error(f'Open Modelica for package {pack} check failed')
+            exit(var)
+        logger.info(f'Open Modelica check was successful')
+        return var
 
-    def _read_error_log(self, pack: str, err_log, check_log, options: str = None):
-        """
-
-        Args:
-            pack:
-            err_log:
-            check_log:
-            options:
-
-        Returns:
-
-        """
-        error_log = open(err_log, "r")
-        lines = error_log.readlines()
-        error_log_list = []
-        for line in lines:
-            if "Error in model" in line:
-                error_log_list.append(line)
-                line = line.strip("\n")
-                logger.error(line)
-        if len(error_log_list) > 0:
-            logger.error(f'Open Modelica for package {pack}check failed')
-            var = 1
-        else:
-            logger.info(f'Open Modelica check was successful')
-            var = 0
-        error_log.close()
+    def _export_text_logs(self, pack: str, options: str):
+        result_dir = CI_CONFIG.get_file_path("result", "OM_check_result_dir").joinpath(options)
+        ch_log = result_dir.joinpath(f'{self.library}.{pack}-check_log.txt')
+        error_log = result_dir.joinpath(f'{self.library}.{pack}-error_log.txt')
+        self.result_store.export_text_logs(
+            check_log=ch_log, error_log=error_log, tool="openmodelica", library=self.library,
+            package=pack, option=options
+        )
         config_structure.prepare_data(source_target_dict={
-            check_log: CI_CONFIG.get_file_path("result", "OM_check_result_dir").joinpath(
-                options, f'{self.library}.{pack}'
-            ),
-            err_log: CI_CONFIG.get_file_path("result", "OM_check_result_dir").joinpath(
-                options, f'{self.library}.{pack}')},
+            ch_log: result_dir.joinpath(f'{self.library}.{pack}'),
+            error_log: result_dir.joinpath(f'{self.library}.{pack}')},
             del_flag=True)
-        return var
 
     def install_library(self, libraries: list = None):
-        load_modelica = self.omc.sendExpression(f'installPackage(Modelica, "4.0.0+maint.om", exactMatch=true)')
+        load_modelica = self.pool.send_expression(f'installPackage(Modelica, "4.0.0+maint.om", exactMatch=true)')
         if load_modelica is True:
             logger.info(f'Load library modelica in Openmodelica.')
         else:
@@ -289,27 +255,15 @@ class CheckOpenModelica:
                 version = inst[1]
                 exact_match = inst[2]
                 install_string = f'{lib_name}, "{version}", {exact_match} '
-                inst_lib = self.omc.sendExpression(f'installPackage({install_string})')
+                inst_lib = self.pool.send_expression(f'installPackage({install_string})')
                 if inst_lib is True:
                     logger.info(f'Install library "{lib_name}" with version "{version}" ')
                 else:
                     logger.error(f'Error: Load of "{lib_name}" with version "{version}" failed!')
                     exit(1)
-        logger.error(self.omc.sendExpression("getErrorString()"))
-
-    def load_library(self, library_package_mo: Path = None, library: str = None):
-        if library_package_mo is not None:
-            load_bib = self.omc.sendExpression(f'loadFile("{library_package_mo}")')
-            if load_bib is True:
-                logger.info(f'Load library {library}: {library_package_mo}')
-            else:
-                logger.error(f'Error: Load of {library_package_mo} failed!')
-                exit(1)
-        else:
-            logger.info(f'Library path is not set.')
-            exit(1)
-        logger.error(self.omc.sendExpression("getErrorString()"))
+        logger.error(self.pool.send_expression("getErrorString()"))
 
+    @profile("simulate with Dymola", category="phase")
     def sim_with_dymola(self, pack: str = None, example_list: list = None):
         all_sims_dir = CI_CONFIG.get_file_path("result", "OM_check_result_dir").joinpath(f'{self.library}.{pack}')
         if example_list is not None:
@@ -342,6 +296,7 @@ class CheckOpenModelica:
         else:
             logger.info(f'No examples to check. ')
 
+    @profile("compare Dymola and OpenModelica", category="phase")
     def compare_dym_to_om(self,
                           example_list: list = None,
                           stats: dict = None,
@@ -352,13 +307,11 @@ class CheckOpenModelica:
                 stats = {
                     "om": {
                         "failed": 0,
-                        "success": 0,
-                        "to_big_to_compare": 0
+                        "success": 0
                     },
                     "dymola": {
                         "failed": 0,
-                        "success": 0,
-                        "to_big_to_compare": 0
+                        "success": 0
                     }
                 }
             errors = {}
@@ -366,7 +319,6 @@ class CheckOpenModelica:
             om_dir = all_sims_dir
             dym_dir = Path(all_sims_dir, "dym")
             plot_dir = Path(all_sims_dir, "plots", pack)
-            _tol = 0.0001
             for example in example_list:
                 continue_after_for = False
                 for tool, _dir in zip(["om", "dymola"], [om_dir, dym_dir]):
@@ -375,68 +327,22 @@ class CheckOpenModelica:
                         stats[tool]["failed"] += 1
                         continue_after_for = True
                         continue
-                    if os.stat(path_mat).st_size / (1024 * 1024) > 400:
-                        stats[tool]["to_big_to_compare"] += 1
-                        continue_after_for = True
                     stats[tool]["success"] += 1
                 if continue_after_for:
                     continue
 
-                om_tsd = TimeSeriesData(Path(om_dir, f'{example}.mat'))
-                dym_tsd = TimeSeriesData(Path(dym_dir, f'{example}.mat'))
-                om_tsd_ref = om_tsd.copy()
-
-                cols = {}
-                for c in dym_tsd.columns:
-                    cols[c] = c.replace(" ", "")
-                dym_tsd = dym_tsd.rename(columns=cols)
-                dym_tsd_ref = dym_tsd.copy()
-                # Round index, sometimes it's 0.99999999995 instead of 1 e.g.
-                om_tsd.index = np.round(om_tsd.index, 4)
-                dym_tsd.index = np.round(dym_tsd.index, 4)
-                # Drop duplicate rows, e.g. last point is often duplicate.
-                om_tsd = om_tsd.drop_duplicates()
-                dym_tsd = dym_tsd.drop_duplicates()
-                idx_to_remove = []
-                _n_diff_idx = 0
-                for idx in om_tsd.index:
-                    if idx not in dym_tsd.index:
-                        idx_to_remove.append(idx)
-                om_tsd = om_tsd.drop(idx_to_remove)
-                _n_diff_idx += len(idx_to_remove)
-                idx_to_remove = []
-                for idx in dym_tsd.index:
-                    if idx not in om_tsd.index:
-                        idx_to_remove.append(idx)
-                dym_tsd = dym_tsd.drop(idx_to_remove)
-                _n_diff_idx += len(idx_to_remove)
-                _col_err = {}
-                _n_diff_cols = 0
-                cols_to_plot = []
-                for col in om_tsd.columns:
-                    if col not in dym_tsd.columns:
-                        _n_diff_cols += 1
-                        continue
-                    dym = dym_tsd.loc[:, col].values
-                    om = om_tsd.loc[:, col].values
-                    if np.std(om) + np.std(dym) <= 1e-5:
-                        continue  # Stationary
-                    cols_to_plot.append(col)
-                    try:
-                        _col_err[col] = StatisticsAnalyzer.calc_rmse(dym, om)
-                    except ValueError as err:
-                        logger.error(f"Index still differs {example}: {err}")
-                        break
-                for c in dym_tsd.columns:
-                    if c not in _col_err:
-                        _n_diff_cols += 1
+                om_result = MatResultFile(Path(om_dir, f'{example}.mat'))
+                dym_result = MatResultFile(Path(dym_dir, f'{example}.mat'))
+                _col_err, _n_diff_idx, _n_diff_cols = compare_results(om_result, dym_result)
                 if with_plot:
                     _dir = Path(plot_dir, example)
-                    if cols_to_plot:
+                    if _col_err:
                         os.makedirs(_dir, exist_ok=True)
-                    for col in cols_to_plot:
-                        plt.plot(om_tsd_ref.loc[:, col], label="OM")
-                        plt.plot(dym_tsd_ref.loc[:, col], label="Dymola")
+                    om_names = {name.replace(" ", ""): name for name in om_result.get_trajectory_variables()}
+                    dym_names = {name.replace(" ", ""): name for name in dym_result.get_trajectory_variables()}
+                    for col in _col_err:
+                        plt.plot(om_result.time, om_result.get_trajectory(om_names[col]), label="OM")
+                        plt.plot(dym_result.time, dym_result.get_trajectory(dym_names[col]), label="Dymola")
                         plt.legend()
                         plt.xlabel("Time in s")
                         plt.savefig(Path(_dir, f'{col}.png'))
@@ -481,11 +387,22 @@ def parse_args():
         default=None,
         help="Possible startup-mos script to e.g. load additional libraries"
     )
-
-    # TODO: Requires ModelManagent, not supported on OpenModelica-Image
-    # check_test_group.add_argument("--extended-examples",
-    #                               default=False,
-    #                               action="store_true")
+    check_test_group.add_argument("--extended-examples",
+                                  default=False,
+                                  action="store_true")
+    check_test_group.add_argument("--n-sessions",
+                                  default=1,
+                                  type=int,
+                                  help="Number of parallel OpenModelica sessions")
+    check_test_group.add_argument("--timeout",
+                                  default=None,
+                                  type=float,
+                                  help="Maximal time in seconds to check or simulate one model")
+    check_test_group.add_argument("--export-text-logs",
+                                  default=False,
+                                  action="store_true",
+                                  help="Write the check log and error log of failed packages as text files "
+                                       "in addition to the result store")
     # [OM - Options: OM_CHECK, OM_SIM, DYMOLA_SIM, COMPARE]
     check_test_group.add_argument("--om-options",
                                   nargs="+",
@@ -506,58 +423,65 @@ if __name__ == '__main__':
     config_structure.check_file_setting(LIBRARY_PACKAGE_MO=LIBRARY_PACKAGE_MO)
 
     OM = CheckOpenModelica(library=args.library,
-                           library_package_mo=LIBRARY_PACKAGE_MO)
+                           library_package_mo=LIBRARY_PACKAGE_MO,
+                           n_sessions=args.n_sessions,
+                           timeout=args.timeout)
     get_model_list_kwargs = dict(
         library=args.library,
         changed_flag=args.changed_flag,
-        extended_examples_flag=False,
+        extended_examples_flag=args.extended_examples,
         filter_whitelist_flag=args.filter_whitelist_flag,
         library_package_mo=LIBRARY_PACKAGE_MO,
         tool="om"
     )
-    for package in args.packages:
-        for options in args.om_options:
-            if options == "OM_CHECK":
-                simulate_flag = False
-                options = "check"
-                func = OM.check_models
-            else:
-                simulate_flag = True
-                options = "simulate"
-                func = OM.simulate_models
-            model_list = mo.get_model_list(
-                package=package,
-                simulate_flag=simulate_flag,
-                **get_model_list_kwargs
-            )
-            error_model_dict = func(
-                package=package,
-                model_list=model_list,
-                exception_list=None
-            )
-            exit_var = OM.write_errorlog(
-                pack=package,
-                error_dict=error_model_dict,
-                exception_list=None,
-                options=options)
-
-            if options == "DYMOLA_SIM":
-                model_list = mo.get_model_list(
-                    package=package,
-                    simulate_flag=True,
-                    **get_model_list_kwargs
-                )
-                OM.sim_with_dymola(example_list=model_list, pack=package)
-            if args.om_options == "COMPARE":
-                ERROR_DATA = {}
-                STATS = None
+    # Closed also if a package fails and exits
+    try:
+        for package in args.packages:
+            for options in args.om_options:
+                if options == "OM_CHECK":
+                    simulate_flag = False
+                    options = "check"
+                    func = OM.check_models
+                else:
+                    simulate_flag = True
+                    options = "simulate"
+                    func = OM.simulate_models
                 model_list = mo.get_model_list(
                     package=package,
-                    simulate_flag=True,
+                    simulate_flag=simulate_flag,
                     **get_model_list_kwargs
                 )
-                STATS = OM.compare_dym_to_om(pack=package,
-                                             example_list=model_list,
-                                             stats=STATS)
-
-    OM.close_OM()
+                with profile(f"{package} {options}", category="phase", n_models=len(model_list)):
+                    error_model_dict = func(
+                        package=package,
+                        model_list=model_list,
+                        exception_list=None
+                    )
+                exit_var = OM.write_errorlog(
+                    pack=package,
+                    error_dict=error_model_dict,
+                    options=options,
+                    model_list=model_list,
+                    export_text_logs=args.export_text_logs)
+
+                if options == "DYMOLA_SIM":
+                    model_list = mo.get_model_list(
+                        package=package,
+                        simulate_flag=True,
+                        **get_model_list_kwargs
+                    )
+                    OM.sim_with_dymola(example_list=model_list, pack=package)
+                if args.om_options == "COMPARE":
+                    ERROR_DATA = {}
+                    STATS = None
+                    model_list = mo.get_model_list(
+                        package=package,
+                        simulate_flag=True,
+                        **get_model_list_kwargs
+                    )
+                    STATS = OM.compare_dym_to_om(pack=package,
+                                                 example_list=model_list,
+                                                 stats=STATS)
+
+    finally:
+        OM.close_OM()
@@ -0,0 +1,212 @@
+import os
+import platform
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from OMPython import OMCSessionZMQ
+
+from ModelicaPyCI.utils import logger, profile
+
+try:
+    from OMPython import OMTypedParser
+except ImportError:  # Other OMPython versions, the sessions use the public sendExpression
+    OMTypedParser = None
+
+
+class OMCSessionError(Exception):
+    """Raised if an OpenModelica session timed out or crashed."""
+
+
+class OMCSession:
+
+    def __init__(self, library_package_mo: Path, library: str, working_dir: Path = None):
+        """
+        OpenModelica session with the library loaded. Each session runs in its
+        own working directory, so parallel simulations do not share files.
+        Args:
+            library_package_mo (): package.mo of the library to load.
+            library (): name of the library.
+            working_dir (): working directory of the session, default is a new temporary directory.
+        """
+        if platform.system() == "Windows":
+            self.omc = OMCSessionZMQ()
+        else:
+            self.omc = OMCSessionZMQ(dockerOpenModelicaPath="/usr/bin/omc_orig")
+        self._channel = _OMCChannel.from_session(self.omc)
+        if working_dir is None:
+            working_dir = Path(tempfile.mkdtemp(prefix="omc_session_", dir=os.getcwd()))
+        self.working_dir = Path(working_dir)
+        self.send_expression(f'cd("{self.working_dir.as_posix()}")')
+        if self.send_expression(f'loadFile("{Path(library_package_mo).as_posix()}")') is not True:
+            error = self.send_expression("getErrorString()")
+            self.close()
+            raise OMCSessionError(f'Load of {library_package_mo} failed: {error}')
+        logger.info(f'Load library {library}: {library_package_mo}')
+        # Clear messages of loading the library, they are not related to the models.
+        self.send_expression("getErrorString()")
+
+    def send_expression(self, expression: str, timeout: float = None, parsed: bool = True):
+        """
+        Send an expression to OpenModelica and return the answer.
+        Raises:
+            OMCSessionError: if the omc process exited or no answer came within the timeout.
+        """
+        if self._channel is not None:
+            return self._channel.send_expression(expression=expression, timeout=timeout, parsed=parsed)
+        try:
+            return self.omc.sendExpression(expression, parsed=parsed)
+        except Exception as err:
+            raise OMCSessionError(f"OpenModelica failed during {expression}: {err}") from err
+
+    def close(self, kill: bool = False):
+        try:
+            if kill and self._channel is not None:
+                self._channel.process.kill()
+            else:
+                self.omc.sendExpression("quit()")
+        except Exception as err:
+            logger.debug("Could not close OpenModelica session: %s", err)
+        shutil.rmtree(self.working_dir, ignore_errors=True)
+
+
+class _OMCChannel:
+
+    def __init__(self, socket, process):
+        """
+        The zmq socket and the omc process of an OMCSessionZMQ.
+        OMCSessionZMQ.sendExpression blocks without limit, even if omc crashed.
+        Hence, the socket and the process are polled. Both are private attributes of
+        OMPython, all access to them is in this class. requirements.txt pins the
+        OMPython versions which have them.
+        """
+        self.socket = socket
+        self.process = process
+
+    @classmethod
+    def from_session(cls, omc: OMCSessionZMQ):
+        """
+        Returns the channel of the session, None if this OMPython version does not have
+        the private attributes. Then, timeouts and crashes of the session are not detected.
+        """
+        socket = getattr(omc, "_omc", None)
+        process = getattr(omc, "_omc_process", None)
+        if OMTypedParser is None or not hasattr(socket, "poll") or not hasattr(process, "poll"):
+            logger.warning(
+                "This OMPython version is not supported for timeouts of OpenModelica sessions, "
+                "install the version of requirements.txt. Using OMCSessionZMQ.sendExpression without timeout."
+            )
+            return None
+        return cls(socket=socket, process=process)
+
+    def send_expression(self, expression: str, timeout: float = None, parsed: bool = True):
+        import zmq
+        if self.process.poll() is not None:
+            raise OMCSessionError("OpenModelica process exited.")
+        self.socket.send_string(str(expression))
+        start = time.time()
+        while not self.socket.poll(1000, zmq.POLLIN):
+            if self.process.poll() is not None:
+                raise OMCSessionError(f"OpenModelica process crashed during {expression}")
+            if timeout is not None and time.time() - start > timeout:
+                raise OMCSessionError(f"OpenModelica did not answer {expression} within {timeout} s")
+        result = self.socket.recv_string()
+        if parsed:
+            return OMTypedParser.parseString(result)
+        return result
+
+
+class OMCSessionPool:
+
+    def __init__(self,
+                 library_package_mo: Path,
+                 library: str,
+                 n_sessions: int = 1):
+        """
+        Pool of long-lived OpenModelica sessions, each with the library loaded once.
+        Models are dispatched to the free sessions in parallel. A session which
+        crashed or timed out is killed and replaced by a new one.
+        Args:
+            library_package_mo (): package.mo of the library to load.
+            library (): name of the library.
+            n_sessions (): number of parallel OpenModelica sessions.
+        """
+        self.library_package_mo = library_package_mo
+        self.library = library
+        self.n_sessions = max(1, n_sessions)
+        self._sessions = queue.Queue()
+        self._n_sessions_running = 0
+        self._lock = threading.Lock()
+
+    def send_expression(self, expression: str):
+        """
+        Send an expression to one session of the pool, e.g. getVersion().
+        """
+        session = self._get_session()
+        try:
+            return session.send_expression(expression)
+        finally:
+            self._sessions.put(session)
+
+    def map(self, function, items: list):
+        """
+        Call function(session, item) for all items, in parallel on the sessions of the pool.
+        Returns:
+            results (): results in the order of items. If the session crashed or timed out,
+            the result is the OMCSessionError.
+        """
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.n_sessions, len(items))) as executor:
+            return list(executor.map(lambda item: self._run(function, item), items))
+
+    def close(self):
+        while not self._sessions.empty():
+            self._sessions.get().close()
+        self._n_sessions_running = 0
+
+    def _get_session(self):
+        while True:
+            try:
+                return self._sessions.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                start_session = self._n_sessions_running < self.n_sessions
+                if start_session:
+                    self._n_sessions_running += 1
+                    n_session = self._n_sessions_running
+            if not start_session:
+                # Wait for a free session, a crashed one is replaced in the next loop.
+                try:
+                    return self._sessions.get(timeout=1)
+                except queue.Empty:
+                    continue
+            logger.info(f'Starting OpenModelica session {n_session}')
+            try:
+                with profile(f"OpenModelica session {n_session}", category="openmodelica"):
+                    return OMCSession(library_package_mo=self.library_package_mo, library=self.library)
+            except Exception:
+                with self._lock:
+                    self._n_sessions_running -= 1
+                raise
+
+    def _run(self, function, item):
+        session = self._get_session()
+        try:
+            return function(session, item)
+        except OMCSessionError as err:
+            # The next model starts a new session in place of this one.
+            logger.error(f'OpenModelica session failed for {item}: {err}')
+            session.close(kill=True)
+            with self._lock:
+                self._n_sessions_running -= 1
+            session = None
+            return err
+        finally:
+            if session is not None:
+                self._sessions.put(session)
@@ -1,5 +1,4 @@
 import argparse
-import shutil
 from pathlib import Path
 import os
 import yaml
@@ -10,7 +9,7 @@ from ModelicaPyCI.structure import sort_mo_model as mo
 from ModelicaPyCI.structure import config_structure
 from ModelicaPyCI.pydyminterface import python_dymola_interface
 from ModelicaPyCI.load_global_config import CI_CONFIG
-from ModelicaPyCI.utils import create_changed_files_file, logger
+from ModelicaPyCI.utils import get_changed_files, logger, profile
 
 
 def write_exit_file(message: str = None):
@@ -93,15 +92,19 @@ class BuildingspyRegressionCheck:
                     single_package=sinlge_package_name
                 )
 
-            response = self.ut.run()
+            with profile(package_modelica_name, category="regression test"):
+                response = self.ut.run()
 
             result_path = Path(CI_CONFIG.get_file_path("result", "regression_dir"), sinlge_package_name)
             source_target_dict = {}
             for file in self.ut.get_unit_test_log_files():
                 source_target_dict[file] = result_path
-            config_structure.prepare_data(source_target_dict=source_target_dict, del_flag=True)
-            # Copy funnel_comp folder (leads to long logs with copy_tree
-            shutil.move("funnel_comp", result_path.joinpath("funnel_comp"))
+            with profile(package_modelica_name, category="log"):
+                config_structure.prepare_data(source_target_dict=source_target_dict, del_flag=True)
+                # funnel_comp is renamed as a whole if the package has no results yet
+                config_structure.prepare_data(
+                    source_target_dict={"funnel_comp": result_path.joinpath("funnel_comp")}, del_flag=True
+                )
 
             if response != 0:
                 err_list.append(package_modelica_name)
@@ -823,19 +826,11 @@ if __name__ == '__main__':
             if args.changed_flag is False:
                 PACKAGE_LIST = [package]
             if args.changed_flag is True:
-                changed_files_file = create_changed_files_file(repo_root=args.library_root)
-
-                dymola_api = python_dymola_interface.load_dymola_api(
-                    packages=[LIBRARY_PACKAGE_MO],
-                    min_number_of_unused_licences=args.min_number_of_unused_licences,
-                    startup_mos=STARTUP_MOS
-                )
+                changed_files = get_changed_files(repo_root=args.library_root)
 
                 PACKAGE_LIST = mo.get_changed_regression_models(
-                    dymola_api=dymola_api,
-                    root_package=Path(package.replace(".", os.sep)),
                     library=args.library,
-                    changed_files=changed_files_file,
+                    changed_files=[changed_file.path for changed_file in changed_files],
                     package=package
                 )
         # Start regression test
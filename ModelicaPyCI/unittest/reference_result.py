@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import re
+import struct
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from ModelicaPyCI.load_global_config import CI_CONFIG
+from ModelicaPyCI.utils import logger
+
+# A variable of a buildingspy reference file, e.g. "heaCap.T=[2.9315e+02, 2.9316e+02]".
+# Names may have array subscripts with spaces, e.g. "vol[1, 2].T=[...]".
+_VARIABLE_PATTERN = re.compile(r'^[ \t]*([^=\s\[]+(?:\[[^\]]*\][^=\s\[]*)*)=\[([^\]]*)\]', re.MULTILINE)
+
+_REFERENCE_RESULTS = {}
+
+# Binary cache file: magic, length of the json header, json header, float64 values
+# with one row per variable (time first), the values start at a multiple of 64 bytes.
+_CACHE_MAGIC = b"MPCIREF1"
+_CACHE_VERSION = 3
+_CACHE_ALIGNMENT = 64
+
+
+def read_reference_file(path: Union[str, Path]):
+    """
+    Read a reference result file of buildingspy, e.g. in Resources/ReferenceResults/Dymola.
+    All values of the file are converted to floats in one NumPy call.
+    Variables with only two values (start and end, e.g. parameters or the time)
+    are linearly interpolated to the number of values of the other variables,
+    hence the time is np.linspace(start, end, n_values).
+    Args:
+        path (): reference .txt file
+    Returns:
+        df (): DataFrame with one column per variable and the time as index
+    """
+    with open(path, "r") as file:
+        content = file.read()
+    matches = _VARIABLE_PATTERN.findall(content)
+    names = [name for name, _ in matches]
+    value_strings = [values.split(",") for _, values in matches]
+    lengths = np.array([len(values) for values in value_strings], dtype=int)
+    all_values = np.array([value for values in value_strings for value in values], dtype=float)
+    columns = np.split(all_values, np.cumsum(lengths)[:-1]) if len(lengths) else []
+
+    n_values = set(lengths[lengths != 2].tolist())
+    if len(n_values) > 1:
+        raise ValueError("Reference results are not equally sampled")
+    n_values = n_values.pop() if n_values else 2
+    data = {name: values for name, values in zip(names, columns) if len(values) != 2}
+    for name, values in zip(names, columns):
+        if len(values) == 2:
+            data[name] = np.linspace(values[0], values[1], n_values)
+    df = pd.DataFrame(data)
+    return df.set_index("time")
+
+
+def get_reference_result(path: Union[str, Path], use_cache: bool = False):
+    """
+    Returns the parsed reference file, see read_reference_file.
+    Each file is parsed once per process and read again only if it changed,
+    so plotting and verification share the result. Do not modify the returned DataFrame.
+    Args:
+        path (): reference .txt file
+        use_cache (): load the values from the binary cache in ci/cache, see load_reference_cache.
+    """
+    path = os.path.normpath(path)
+    stat = os.stat(path)
+    file_state = (stat.st_mtime_ns, stat.st_size)
+    if path not in _REFERENCE_RESULTS or _REFERENCE_RESULTS[path][0] != file_state:
+        if use_cache:
+            names, values = load_reference_cache(path)
+            df = pd.DataFrame(values[1:].T, index=pd.Index(values[0], name="time"), columns=names[1:], copy=False)
+        else:
+            df = read_reference_file(path)
+        _REFERENCE_RESULTS[path] = (file_state, df)
+    return _REFERENCE_RESULTS[path][1]
+
+
+def load_reference_cache(path: Union[str, Path]):
+    """
+    Returns the values of a reference file from its binary cache in ci/cache.
+    The cache is memory-mapped, a variable is only read from disk when it is used.
+    Its name is built from the resolved path, so reference files with the same name,
+    e.g. of different tools or libraries, have their own cache.
+    If the modification time or size of the reference file changed, its sha256 is compared.
+    If the sha256 is the same, e.g. after a new checkout, only the stored stat is updated.
+    If the cache is missing or the sha256 changed, the reference file is parsed and the cache is written again.
+    Args:
+        path (): reference .txt file
+    Returns:
+        names (): names of the variables, the first one is the time
+        values (): read-only array with the shape (len(names), n_values)
+    """
+    path = Path(path).resolve()
+    path_hash = hashlib.sha256(str(path).encode("utf-8")).hexdigest()[:16]
+    cache_file = CI_CONFIG.get_file_path("cache", "reference_result_dir").joinpath(f"{path.stem}_{path_hash}.bin")
+    stat = path.stat()
+    file_stat = [stat.st_mtime_ns, stat.st_size]
+    header = _read_cache_header(cache_file)
+    if header is None or header["stat"] != file_stat:
+        with open(path, "rb") as file:
+            file_hash = hashlib.sha256(file.read()).hexdigest()
+        if header is None or header["sha256"] != file_hash:
+            df = read_reference_file(path)
+            _write_reference_cache(
+                cache_file=cache_file, file_hash=file_hash, file_stat=file_stat, names=["time"] + list(df.columns),
+                values=np.vstack([df.index.to_numpy(dtype=float), df.to_numpy(dtype=float).T])
+            )
+            header = _read_cache_header(cache_file)
+        else:
+            header = _update_cache_stat(cache_file=cache_file, header=header, file_stat=file_stat)
+    if 0 in header["shape"]:
+        return header["names"], np.zeros(header["shape"])
+    values = np.memmap(
+        cache_file, dtype="<f8", mode="r", offset=header["offset"], shape=tuple(header["shape"])
+    )
+    return header["names"], values
+
+
+def _read_cache_header(cache_file: Path):
+    if not os.path.isfile(cache_file):
+        return None
+    try:
+        with open(cache_file, "rb") as file:
+            if file.read(len(_CACHE_MAGIC)) != _CACHE_MAGIC:
+                return None
+            header_length, = struct.unpack("<I", file.read(4))
+            header = json.loads(file.read(header_length).decode("utf-8"))
+    except (OSError, ValueError, struct.error) as err:
+        logger.warning(f'Could not read reference result cache {cache_file}: {err}')
+        return None
+    if header.get("version") != _CACHE_VERSION:
+        return None
+    return header
+
+
+def _write_reference_cache(cache_file: Path, file_hash: str, file_stat: list, names: list, values: np.ndarray):
+    header = {
+        "version": _CACHE_VERSION, "sha256": file_hash, "stat": file_stat,
+        "names": names, "shape": list(values.shape)
+    }
+    # The offset is part of the header, hence its length must be known first.
+    header_start = len(_CACHE_MAGIC) + 4
+    header["offset"] = 0
+    header_length = len(json.dumps(header).encode("utf-8")) + 20
+    offset = -(-(header_start + header_length) // _CACHE_ALIGNMENT) * _CACHE_ALIGNMENT
+    header["offset"] = offset
+    header_bytes = json.dumps(header).encode("utf-8").ljust(offset - header_start)
+    os.makedirs(cache_file.parent, exist_ok=True)
+    tmp_file = cache_file.with_suffix(".tmp")
+    try:
+        with open(tmp_file, "wb") as file:
+            file.write(_CACHE_MAGIC)
+            file.write(struct.pack("<I", len(header_bytes)))
+            file.write(header_bytes)
+            file.write(np.ascontiguousarray(values, dtype="<f8").tobytes())
+        os.replace(tmp_file, cache_file)
+    except BaseException:
+        if os.path.isfile(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+def _update_cache_stat(cache_file: Path, header: dict, file_stat: list):
+    """
+    Store the new stat of an unchanged reference file in the cache header.
+    The header is written in place if it fits into its padding, else the cache is written again.
+    """
+    header = dict(header, stat=file_stat)
+    header_start = len(_CACHE_MAGIC) + 4
+    header_bytes = json.dumps(header).encode("utf-8")
+    if len(header_bytes) <= header["offset"] - header_start:
+        with open(cache_file, "r+b") as file:
+            file.seek(header_start)
+            file.write(header_bytes.ljust(header["offset"] - header_start))
+        return header
+    values = np.fromfile(cache_file, dtype="<f8", offset=header["offset"]).reshape(header["shape"])
+    _write_reference_cache(
+        cache_file=cache_file, file_hash=header["sha256"], file_stat=file_stat,
+        names=header["names"], values=values
+    )
+    return _read_cache_header(cache_file)
@@ -0,0 +1,89 @@
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+from ModelicaPyCI.unittest.mat_result import MatResultFile
+
+
+def align_time(time_a: np.ndarray, time_b: np.ndarray, decimals: int = 4):
+    """
+    Merge two time grids on their shared time steps.
+    The time is rounded, as it is sometimes 0.99999999995 instead of 1, and duplicate
+    time steps of events are reduced to their first occurrence.
+    Returns:
+        rows_a (): indices of the shared time steps in time_a
+        rows_b (): indices of the shared time steps in time_b
+        n_different (): number of time steps which are only in one of the grids
+    """
+    unique_a, first_a = np.unique(np.round(time_a, decimals), return_index=True)
+    unique_b, first_b = np.unique(np.round(time_b, decimals), return_index=True)
+    _, idx_a, idx_b = np.intersect1d(unique_a, unique_b, assume_unique=True, return_indices=True)
+    n_different = len(unique_a) + len(unique_b) - 2 * len(idx_a)
+    return first_a[idx_a], first_b[idx_b], n_different
+
+
+def compare_results(
+        result_a: Union[str, Path, MatResultFile],
+        result_b: Union[str, Path, MatResultFile],
+        chunk_size_mb: float = 64,
+        stationary_tolerance: float = 1e-5):
+    """
+    Compare two simulation results on their shared time steps.
+    The files are streamed in chunks of time steps, so the memory scales with
+    the chunk size and the number of compared variables, not the file size.
+    Errors of all variables are computed as vectorized array operations, once
+    for each pair of data columns, so aliased variables are not read twice.
+    Args:
+        result_a (): first result, e.g. of OpenModelica
+        result_b (): second result, e.g. of Dymola
+        chunk_size_mb (): maximal size of the values of one chunk of time steps
+        stationary_tolerance (): variables with a sum of standard deviations below are not compared
+    Returns:
+        errors (): dict with the root mean square error of each compared variable
+        n_diff_events (): number of time steps which are only in one result
+        n_different_cols (): number of variables which are only in one result or not compared
+    """
+    if not isinstance(result_a, MatResultFile):
+        result_a = MatResultFile(result_a)
+    if not isinstance(result_b, MatResultFile):
+        result_b = MatResultFile(result_b)
+    names_a = {name.replace(" ", ""): name for name in result_a.get_trajectory_variables()}
+    names_b = {name.replace(" ", ""): name for name in result_b.get_trajectory_variables()}
+    shared_names = [name for name in names_a if name in names_b]
+    rows_a, rows_b, n_diff_events = align_time(result_a.time, result_b.time)
+
+    # Aliases share one column, hence each pair of columns is compared only once.
+    columns_a, signs_a = result_a.get_columns([names_a[name] for name in shared_names])
+    columns_b, signs_b = result_b.get_columns([names_b[name] for name in shared_names])
+    pairs = np.stack([columns_a, columns_b, signs_a * signs_b], axis=1).reshape(-1, 3)
+    unique_pairs, inverse = np.unique(pairs, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    unique_a, pair_idx_a = np.unique(unique_pairs[:, 0], return_inverse=True)
+    unique_b, pair_idx_b = np.unique(unique_pairs[:, 1], return_inverse=True)
+    signs = unique_pairs[:, 2]
+
+    n_rows = len(rows_a)
+    n_cols = len(unique_pairs)
+    sums = np.zeros((2, n_cols))
+    sums_of_squares = np.zeros((3, n_cols))
+    if n_rows > 0 and n_cols > 0:
+        chunk_rows = max(1, int(chunk_size_mb * 1024 * 1024 / (8 * (len(unique_a) + len(unique_b) + n_cols))))
+        for start in range(0, n_rows, chunk_rows):
+            values_a = result_a.get_column_values(unique_a, rows=rows_a[start:start + chunk_rows])[:, pair_idx_a]
+            values_b = result_b.get_column_values(unique_b, rows=rows_b[start:start + chunk_rows])[:, pair_idx_b]
+            values_b *= signs
+            sums[0] += values_a.sum(axis=0)
+            sums[1] += values_b.sum(axis=0)
+            sums_of_squares[0] += np.square(values_a).sum(axis=0)
+            sums_of_squares[1] += np.square(values_b).sum(axis=0)
+            sums_of_squares[2] += np.square(values_b - values_a).sum(axis=0)
+    errors = {}
+    if n_rows > 0 and n_cols > 0:
+        means = sums / n_rows
+        std = np.sqrt(np.maximum(sums_of_squares[:2] / n_rows - np.square(means), 0))
+        rmse = np.sqrt(sums_of_squares[2] / n_rows)[inverse]
+        compared = (std.sum(axis=0) > stationary_tolerance)[inverse]
+        errors = {name: float(error) for name, error, is_compared in zip(shared_names, rmse, compared) if is_compared}
+    n_different_cols = len(names_a) - len(shared_names) + len(names_b) - len(errors)
+    return errors, n_diff_events, n_different_cols
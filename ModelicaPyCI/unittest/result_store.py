@@ -0,0 +1,240 @@
+import json
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import NamedTuple, Union
+
+from ModelicaPyCI.load_global_config import CI_CONFIG
+from ModelicaPyCI.utils import compile_exceptions, get_run_id, logger
+
+SUCCESS = "success"
+WARNING = "warning"
+ERROR = "error"
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    tool_version TEXT,
+    library TEXT NOT NULL,
+    package TEXT NOT NULL,
+    option TEXT NOT NULL,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL,
+    errors TEXT NOT NULL,
+    warnings TEXT NOT NULL,
+    duration REAL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1
+)
+"""
+_CREATE_INDEX = "CREATE INDEX IF NOT EXISTS results_run ON results (run_id, tool, library, package, option)"
+
+
+class CheckResult(NamedTuple):
+    model: str
+    status: str
+    errors: list = []
+    warnings: list = []
+    duration: float = None
+    # Number of checks or simulations of the model, e.g. 2 after a retry, 0 for cached results
+    attempts: int = 1
+
+
+def classify_log(model: str, log, exception_list: list = None, duration: float = None):
+    """
+    Split the log of a failed check or simulation into errors and warnings.
+    Lines containing one of the exceptions are warnings.
+    Args:
+        model (): checked model
+        log (): log as string or list of lines
+        exception_list (): list of exceptions or the pattern of compile_exceptions
+        duration (): duration of the check or simulation in seconds
+    Returns:
+        result (): CheckResult, with the status error if the log has at least one error line
+    """
+    if log is None or isinstance(log, bool):
+        lines = []
+    elif isinstance(log, str):
+        lines = log.split("\n")
+    else:
+        lines = [line for line in log if not isinstance(line, int)]
+    if isinstance(exception_list, re.Pattern):
+        pattern = exception_list
+    else:
+        pattern = compile_exceptions(exception_list)
+    errors, warnings = [], []
+    for line in lines:
+        if len(line) == 0:
+            continue
+        if pattern is not None and pattern.search(line):
+            warnings.append(line)
+        else:
+            errors.append(line)
+    return CheckResult(
+        model=model, status=ERROR if errors else WARNING, errors=errors, warnings=warnings, duration=duration
+    )
+
+
+class ResultStore:
+
+    def __init__(self, db_file: Union[str, Path] = None, run_id: str = None):
+        """
+        SQLite store of the check and simulation results of each model.
+        The exit codes, summaries and text logs of a run are queried from it.
+        Args:
+            db_file (): database file, default is the result_store_file in the result directory.
+            run_id (): id of the run, default is the id of this process, see utils.get_run_id
+        """
+        if db_file is None:
+            db_file = CI_CONFIG.get_file_path("result", "result_store_file")
+        self.db_file = Path(db_file)
+        self.run_id = get_run_id() if run_id is None else run_id
+        os.makedirs(self.db_file.parent, exist_ok=True)
+        self._connection = sqlite3.connect(self.db_file)
+        with self._connection:
+            self._connection.execute(_CREATE_TABLE)
+            self._connection.execute(_CREATE_INDEX)
+            columns = [row[1] for row in self._connection.execute("PRAGMA table_info(results)")]
+            if "attempts" not in columns:
+                self._connection.execute("ALTER TABLE results ADD COLUMN attempts INTEGER NOT NULL DEFAULT 1")
+
+    def add_results(self, tool: str, library: str, package: str, option: str,
+                    results: list, tool_version: str = None):
+        """
+        Add the results of one package and option, e.g. check or simulate.
+        Args:
+            results (): list of CheckResult
+        """
+        created = time.time()
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO results (run_id, tool, tool_version, library, package, option, model, status, "
+                "errors, warnings, duration, created, attempts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (self.run_id, tool, tool_version, library, package, option, result.model, result.status,
+                     json.dumps(result.errors), json.dumps(result.warnings), result.duration, created,
+                     result.attempts)
+                    for result in results
+                ]
+            )
+
+    def get_results(self, tool: str = None, library: str = None, package: str = None,
+                    option: str = None, status: str = None):
+        """
+        Returns the results of this run as list of CheckResult, in the order they were added.
+        Filters which are None are not applied.
+        """
+        return self._select_results(
+            run_id=self.run_id, tool=tool, library=library, package=package, option=option, status=status
+        )
+
+    def get_last_results(self, tool: str, library: str, option: str = None):
+        """
+        Returns the results of the last run of each package as list of CheckResult,
+        e.g. if the packages are checked in separate CI jobs.
+        """
+        filters = {"tool": tool, "library": library, "option": option}
+        rows = self._connection.execute(
+            "SELECT DISTINCT package FROM results " + self._get_where(run_id=None, **filters) + " ORDER BY package",
+            self._get_parameters(run_id=None, **filters)
+        )
+        results = []
+        for package, in rows.fetchall():
+            run_id = self.get_last_run_id(tool=tool, library=library, option=option, package=package)
+            results.extend(self._select_results(run_id=run_id, package=package, **filters))
+        return results
+
+    def get_summary(self, tool: str = None, library: str = None, package: str = None, option: str = None):
+        """
+        Returns the number of models of each status, e.g. for badges.
+        """
+        rows = self._connection.execute(
+            "SELECT status, COUNT(*) FROM results " + self._get_where(
+                tool=tool, library=library, package=package, option=option
+            ) + " GROUP BY status",
+            self._get_parameters(tool=tool, library=library, package=package, option=option)
+        )
+        summary = {SUCCESS: 0, WARNING: 0, ERROR: 0}
+        summary.update(dict(rows))
+        return summary
+
+    def get_last_run_id(self, tool: str, library: str, option: str = None, package: str = None):
+        """
+        Returns the id of the last run which stored results of the tool and library, None if there is none.
+        Filters which are None are not applied, e.g. option="simulate" skips runs which only checked models.
+        """
+        filters = {"tool": tool, "library": library, "package": package, "option": option}
+        row = self._connection.execute(
+            "SELECT run_id FROM results " + self._get_where(run_id=None, **filters) + " ORDER BY rowid DESC LIMIT 1",
+            self._get_parameters(run_id=None, **filters)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def get_exit_code(self, tool: str = None, library: str = None, package: str = None, option: str = None):
+        """
+        Returns 1 and logs the failed models if a model has errors, else 0.
+        """
+        failed = self.get_results(tool=tool, library=library, package=package, option=option, status=ERROR)
+        for result in failed:
+            logger.error(f'Error in model:  {result.model}')
+        return 1 if failed else 0
+
+    def export_text_logs(self, check_log: Path, error_log: Path, tool: str = None, library: str = None,
+                         package: str = None, option: str = None):
+        """
+        Write the human-readable logs: the check log with errors and warnings
+        and the error log with the errors of all failed models.
+        """
+        os.makedirs(Path(check_log).parent, exist_ok=True)
+        os.makedirs(Path(error_log).parent, exist_ok=True)
+        with open(check_log, "w") as check_log_file, open(error_log, "w") as error_log_file:
+            for result in self.get_results(tool=tool, library=library, package=package, option=option):
+                if result.status == ERROR:
+                    check_log_file.write(f'\nError in model:  {result.model} \n')
+                    error_log_file.write(f'\nError in model:  {result.model} \n')
+                    for err in result.errors:
+                        check_log_file.write(str(err) + "\n")
+                        error_log_file.write(str(err) + "\n")
+                    for warning in result.warnings:
+                        check_log_file.write(str(warning) + "\n")
+                elif result.status == WARNING and result.warnings:
+                    check_log_file.write(f'\n\nWarning in model:  {result.model} \n')
+                    for warning in result.warnings:
+                        check_log_file.write(str(warning) + "\n")
+        return error_log, check_log
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _select_results(self, run_id: str, **filters):
+        rows = self._connection.execute(
+            "SELECT model, status, errors, warnings, duration, attempts FROM results " +
+            self._get_where(run_id=run_id, **filters) + " ORDER BY rowid",
+            self._get_parameters(run_id=run_id, **filters)
+        )
+        return [
+            CheckResult(model=model, status=status, errors=json.loads(errors),
+                        warnings=json.loads(warnings), duration=duration, attempts=attempts)
+            for model, status, errors, warnings, duration, attempts in rows
+        ]
+
+    def _get_where(self, **filters):
+        """
+        Returns the WHERE clause of the filters which are not None, run_id defaults to the id of this store.
+        """
+        filters.setdefault("run_id", self.run_id)
+        conditions = [f"{key} = ?" for key, value in filters.items() if value is not None]
+        return "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    def _get_parameters(self, **filters):
+        filters.setdefault("run_id", self.run_id)
+        return [value for value in filters.values() if value is not None]
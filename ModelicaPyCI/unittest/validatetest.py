@@ -1,6 +1,8 @@
 import argparse
 import glob
+import multiprocessing
 import os
+import time
 from natsort import natsorted
 from pathlib import Path
 
@@ -9,8 +11,11 @@ from ebcpy import DymolaAPI
 from ModelicaPyCI.load_global_config import CI_CONFIG
 from ModelicaPyCI.structure import sort_mo_model as mo
 from ModelicaPyCI.structure import config_structure
+from ModelicaPyCI.structure.check_result_cache import CheckResultCache
 from ModelicaPyCI.pydyminterface import python_dymola_interface
-from ModelicaPyCI.utils import logger
+from ModelicaPyCI.pydyminterface.dymola_worker_pool import DymolaWorkerPool
+from ModelicaPyCI.unittest.result_store import CheckResult, ResultStore, SUCCESS, classify_log
+from ModelicaPyCI.utils import compile_exceptions, get_profile_durations, logger, profile
 
 
 class CheckPythonDymola:
@@ -19,21 +24,44 @@ class CheckPythonDymola:
                  dymola_api: DymolaAPI,
                  library: str,
                  library_package_mo: Path,
+                 worker_pool: DymolaWorkerPool = None,
+                 result_cache: CheckResultCache = None,
+                 dymola_api_kwargs: dict = None,
+                 result_store: ResultStore = None
                  ):
         """
         The class check or simulate models. Return an error-log. Can filter models from a whitelist
         Args:
             library_package_mo: root path of library (e.g. ../AixLib/package.mo)
-            dymola_api (DymolaAPI): python_dymola_interface class.
+            dymola_api (DymolaAPI): python_dymola_interface class. If None, Dymola is
+                started with dymola_api_kwargs once a model has to be checked.
             library (): library to test.
+            worker_pool (): If given, models are checked in parallel by the Dymola instances of the pool.
+            result_cache (): If given, cached results are used instead of checking the model again.
+            dymola_api_kwargs (): kwargs of python_dymola_interface.load_dymola_api
+            result_store (): Store of the check results, default is the result_store_file of the result directory.
         """
         # [Libraries]
         self.library_package_mo = library_package_mo
         self.library = library
         # [Start Dymola]
-        self.dymola_api = dymola_api
+        self._dymola_api = dymola_api
+        self.dymola_api_kwargs = dymola_api_kwargs
+        self.worker_pool = worker_pool
+        self.result_cache = result_cache
+        self.result_store = ResultStore() if result_store is None else result_store
+        # Number of checkModel calls of the last check of each model, 0 for cached results
+        self.attempts = {}
+        # Start of the last check_dymola_model, durations of earlier checks are not stored again
+        self._check_start = None
         self.dymola_log = Path(self.library_package_mo).parent.joinpath(f'{self.library}-log.txt')
 
+    @property
+    def dymola_api(self) -> DymolaAPI:
+        if self._dymola_api is None:
+            self._dymola_api = python_dymola_interface.load_dymola_api(**self.dymola_api_kwargs)
+        return self._dymola_api
+
     def check_dymola_model(self,
                            check_model_list: list = None,
                            exception_list: list = None,
@@ -42,97 +70,128 @@ class CheckPythonDymola:
         Check models and return an error log, if the check failed
         Args:
             sim_ex_flag (): list of examples
-            exception_list ():  models not to check
+            exception_list ():  Exceptions like certain warnings that are not recognized as errors.
             check_model_list (): list of models to be checked
         Returns:
-            error_model_message_dic (): dictionary with models and its error message
+            error_model_message_dic (): dictionary with the failed models and their classified log (CheckResult)
         """
         error_model_message_dic = {}
         if len(check_model_list) == 0 or check_model_list is None:
             logger.error(f'Found no models.')
             return error_model_message_dic
-        results = python_dymola_interface.parallel_model_check(
-            dymola_api=self.dymola_api, dym_models=check_model_list, sim_ex_flag=sim_ex_flag,
-            use_mp=False
-        )
-        for dym_model, result in zip(check_model_list, results):
+        self._check_start = time.time()
+        results = {}
+        models_to_check = []
+        for dym_model in check_model_list:
+            if self.result_cache is not None:
+                results[dym_model] = self.result_cache.get(model=dym_model, simulate=sim_ex_flag)
+            if results.get(dym_model) is None:
+                models_to_check.append(dym_model)
+            else:
+                self.attempts[dym_model] = 0
+                logger.info(f'Using cached result for {dym_model}')
+        if models_to_check:
+            if self.worker_pool is None:
+                check_results = python_dymola_interface.parallel_model_check(
+                    dymola_api=self.dymola_api, dym_models=models_to_check, sim_ex_flag=sim_ex_flag,
+                    use_mp=False
+                )
+            else:
+                check_results = self.worker_pool.check_models(dym_models=models_to_check, sim_ex_flag=sim_ex_flag)
+            for dym_model, check_result in zip(models_to_check, check_results):
+                results[dym_model] = check_result.result
+                self.attempts[dym_model] = check_result.attempts
+                if self.result_cache is not None and check_result.cacheable:
+                    self.result_cache.set(model=dym_model, simulate=sim_ex_flag, result=check_result.result)
+            if self.worker_pool is None:
+                self.dymola_api.dymola.savelog(f'{self.dymola_log}')
+        if self.result_cache is not None:
+            self.result_cache.evict()
+        exception_pattern = compile_exceptions(exception_list)
+        for dym_model in check_model_list:
+            result = results[dym_model]
             if result is True:
                 logger.info(f'Successful:  {dym_model}')
             else:
-                log = result
-                err_list, warning_list = sort_warnings_from_log(log=log, exception_list=exception_list)
-                if len(err_list) > 0:
-                    logger.error(f' {dym_model} \n{err_list}')
-                if len(warning_list) > 0:
-                    logger.warning(f'Warning:  {dym_model} \n{warning_list}')
-                error_model_message_dic[dym_model] = log
-
-        self.dymola_api.dymola.savelog(f'{self.dymola_log}')
+                check_result = classify_log(model=dym_model, log=result, exception_list=exception_pattern)
+                if len(check_result.errors) > 0:
+                    logger.error(f' {dym_model} \n{check_result.errors}')
+                if len(check_result.warnings) > 0:
+                    logger.warning(f'Warning:  {dym_model} \n{check_result.warnings}')
+                error_model_message_dic[dym_model] = check_result
         return error_model_message_dic
 
-    def write_error_log(self,
-                        pack: str,
-                        error_dict: dict,
-                        exception_list: list = None):
+    @profile("store results", category="log")
+    def store_results(self,
+                      pack: str,
+                      options: str,
+                      model_list: list,
+                      error_dict: dict):
         """
-        Write an error log with all models, that don´t pass the check.
+        Store the status, errors, warnings, duration and attempts of all checked models in the result store.
+        Args:
+            pack (): Package to check.
+            options (): DYM_CHECK or DYM_SIM
+            model_list (): All checked models.
+            error_dict (): Failed models with their CheckResult, see check_dymola_model.
+        """
+        if self.worker_pool is not None:
+            # The models are checked in the worker processes, their events are not in this process
+            durations = self.worker_pool.durations
+        else:
+            durations = get_profile_durations(
+                category="simulate" if options == "DYM_SIM" else "check", names=model_list, since=self._check_start
+            )
+        results = []
+        for model in model_list:
+            if model in error_dict:
+                results.append(error_dict[model]._replace(
+                    duration=durations.get(model), attempts=self.attempts.get(model, 1)
+                ))
+            else:
+                results.append(CheckResult(
+                    model=model, status=SUCCESS, duration=durations.get(model), attempts=self.attempts.get(model, 1)
+                ))
+        retried = [result.model for result in results if result.attempts > 1]
+        if retried:
+            logger.warning(f'Checked {len(retried)} models again after a transient error: {retried}')
+        self.result_store.add_results(
+            tool="dymola", library=self.library, package=pack, option=options, results=results,
+            tool_version=python_dymola_interface.get_dymola_version()
+        )
+
+    @profile("write error log", category="log")
+    def write_error_log(self, pack: str, options: str):
+        """
+        Export the stored results of the package as check log and error log,
+        which contains only the models that don´t pass the check.
         Args:
             pack (): Package to check.
-            exception_list (): Exceptions like certain warnings that are not recognized as errors.
-            error_dict (): Dictionary of models with log message, that does not pass the check.
+            options (): DYM_CHECK or DYM_SIM
         """
         ch_log = Path(CI_CONFIG.get_file_path("result", "check_result_dir"),
                       f'{self.library}.{pack}-check_log.txt')
         error_log = Path(CI_CONFIG.get_file_path("result", "check_result_dir"),
                          f'{self.library}.{pack}-error_log.txt')
-        os.makedirs(Path(ch_log).parent, exist_ok=True)
-        with open(ch_log, 'w') as check_log, open(error_log, "w") as err_log:
-            for error_model in error_dict:
-                err_list, warning_list = sort_warnings_from_log(log=error_dict[error_model],
-                                                                exception_list=exception_list)
-                if len(err_list) > 0:
-                    check_log.write(f'\nError in model:  {error_model} \n')
-                    err_log.write(f'\nError in model:  {error_model} \n')
-                    for err in err_list:
-                        check_log.write(str(err) + "\n")
-                        err_log.write(str(err) + "\n")
-                    if len(warning_list) > 0:
-                        for warning in warning_list:
-                            check_log.write(str(warning) + "\n")
-                else:
-                    if len(warning_list) > 0:
-                        check_log.write(f'\n\nWarning in model:  {error_model} \n')
-                        for warning in warning_list:
-                            check_log.write(str(warning) + "\n")
+        self.result_store.export_text_logs(
+            check_log=ch_log, error_log=error_log, tool="dymola", library=self.library, package=pack, option=options
+        )
+        config_structure.prepare_data(source_target_dict={
+            ch_log: Path(CI_CONFIG.get_file_path("result", "check_result_dir"), f'{self.library}.{pack}'),
+            error_log: Path(CI_CONFIG.get_file_path("result", "check_result_dir"), f'{self.library}.{pack}')},
+            del_flag=True)
         return error_log, ch_log
 
-    def read_error_log(self, pack: str, err_log: Path, check_log):
+    def get_exit_code(self, pack: str, options: str):
         """
-        Args:
-            pack:Package to test
-            err_log:
-            check_log:
-        Returns:
+        Returns 1 if a model of the package failed the check, else 0.
         """
-        with open(err_log, "r") as error_log:
-            lines = error_log.readlines()
-            error_log_list = []
-            for line in lines:
-                if "Error in model" in line:
-                    error_log_list.append(line)
-                    line = line.strip("\n")
-                    logger.error(f'{line}')
-
-        config_structure.prepare_data(source_target_dict={
-            check_log: Path(CI_CONFIG.get_file_path("result", "check_result_dir"), f'{self.library}.{pack}'),
-            err_log: Path(CI_CONFIG.get_file_path("result", "check_result_dir"), f'{self.library}.{pack}')},
-            del_flag=True)
-        if len(error_log_list) > 0:
+        var = self.result_store.get_exit_code(tool="dymola", library=self.library, package=pack, option=options)
+        if var != 0:
             logger.error(f'Dymola check failed')
-            return 1
         else:
             logger.info(f'Dymola check was successful')
-            return 0
+        return var
 
 
 class CreateWhitelist:
@@ -200,36 +259,6 @@ class CreateWhitelist:
             exit(1)
 
 
-def sort_warnings_from_log(log: str = None, exception_list: list = None):
-    err_list, warning_list = [], []
-    """result = ' '.join(map(str, log))
-    exception_flag = False
-    if exception_list is not None:
-        for exception in exception_list:
-            if exception in result:
-                exception_flag = True
-                warning_list.append(result)
-        if exception_flag is False:
-            err_list.append(result)
-        else:
-            err_list.append(result)"""
-    if log is not None:
-        for line in log:
-            if isinstance(line, int) is True:
-                continue
-            exception_flag = False
-            if exception_list is not None:
-                for exception in exception_list:
-                    if exception in line:
-                        exception_flag = True
-                        warning_list.append(line)
-                if exception_flag is False:
-                    err_list.append(line)
-            else:
-                err_list.append(line)
-    return err_list, warning_list
-
-
 def return_exit_var(package_results: dict):
     var = 0
     for package, opt_check_dict in package_results.items():
@@ -301,7 +330,6 @@ def create_whitelist(args, dymola_api, library_package_mo):
             package=".",
             changed_flag=False,
             simulate_flag=simulate_flag,
-            dymola_api=dymola_api,
             filter_whitelist_flag=False,
             extended_examples_flag=args.extended_examples,
             library_package_mo=library_package_mo
@@ -314,45 +342,84 @@ def create_whitelist(args, dymola_api, library_package_mo):
         )
 
 
-def validate_only(args, dymola_api, library_package_mo):
-    check_python_dymola = CheckPythonDymola(
-        dymola_api=dymola_api,
-        library=args.library,
-        library_package_mo=library_package_mo
-    )
-
+def validate_only(args, dymola_api, library_package_mo, dymola_api_kwargs: dict = None):
+    n_workers = min(int(args.n_workers), multiprocessing.cpu_count())
+    if args.use_result_cache:
+        result_cache = CheckResultCache(
+            cache_dir=CI_CONFIG.get_file_path("cache", "check_result_dir"),
+            library_path=Path(library_package_mo).parent,
+            tool="dymola",
+            tool_version=python_dymola_interface.get_dymola_version(),
+            flags={"startup_mos": args.startup_mos},
+            additional_libraries=args.additional_libraries_to_load,
+            max_size_mb=CI_CONFIG.cache.check_result_max_size_mb
+        )
+    else:
+        result_cache = None
     package_results = {}
-    for package in args.packages:
-        option_check_dictionary = {}
-        for options in args.dym_options:
-            simulate_flag = options == "DYM_SIM"
-            model_list = mo.get_model_list(
-                library=args.library,
-                package=package,
-                changed_flag=args.changed_flag,
+    worker_pool = None
+    # The pool and the store are closed also if a package fails
+    with ResultStore() as result_store:
+        try:
+            # The pool starts as many workers as licenses are usable and scales up to n_workers
+            if n_workers > 1:
+                worker_pool = DymolaWorkerPool(
+                    packages=[library_package_mo] + args.additional_libraries_to_load,
+                    n_workers=n_workers,
+                    startup_mos=args.startup_mos,
+                    dymola_log=Path(library_package_mo).parent.joinpath(f'{args.library}-log.txt'),
+                    license_scheduler=python_dymola_interface.get_dymola_license_scheduler(
+                        min_number_of_unused_licences=args.min_number_of_unused_licences
+                    ),
+                    timeout=args.timeout
+                )
+            check_python_dymola = CheckPythonDymola(
                 dymola_api=dymola_api,
-                extended_examples_flag=args.extended_examples,
-                simulate_flag=simulate_flag,
-                filter_whitelist_flag=args.filter_whitelist_flag,
-                library_package_mo=library_package_mo
-            )
-
-            error_model_dict = check_python_dymola.check_dymola_model(
-                check_model_list=model_list,
-                exception_list=None,
-                sim_ex_flag=simulate_flag
-            )
-            if not error_model_dict:
-                logger.info(f"Check was successful.")
-                continue
-            error_log, ch_log = check_python_dymola.write_error_log(
-                pack=package,
-                error_dict=error_model_dict,
-                exception_list=None
+                library=args.library,
+                library_package_mo=library_package_mo,
+                worker_pool=worker_pool,
+                result_cache=result_cache,
+                dymola_api_kwargs=dymola_api_kwargs,
+                result_store=result_store
             )
-            var = check_python_dymola.read_error_log(pack=package, err_log=error_log, check_log=ch_log)
-            option_check_dictionary[options] = var
-        package_results[package] = option_check_dictionary
+            for package in args.packages:
+                option_check_dictionary = {}
+                for options in args.dym_options:
+                    simulate_flag = options == "DYM_SIM"
+                    model_list = mo.get_model_list(
+                        library=args.library,
+                        package=package,
+                        changed_flag=args.changed_flag,
+                        extended_examples_flag=args.extended_examples,
+                        simulate_flag=simulate_flag,
+                        filter_whitelist_flag=args.filter_whitelist_flag,
+                        library_package_mo=library_package_mo
+                    )
+
+                    with profile(f"{package} {options}", category="phase", n_models=len(model_list)):
+                        error_model_dict = check_python_dymola.check_dymola_model(
+                            check_model_list=model_list,
+                            exception_list=None,
+                            sim_ex_flag=simulate_flag
+                        )
+                    check_python_dymola.store_results(
+                        pack=package,
+                        options=options,
+                        model_list=model_list,
+                        error_dict=error_model_dict
+                    )
+                    if args.export_text_logs and error_model_dict:
+                        check_python_dymola.write_error_log(pack=package, options=options)
+                    if not error_model_dict:
+                        logger.info(f"Check was successful.")
+                        continue
+                    option_check_dictionary[options] = check_python_dymola.get_exit_code(
+                        pack=package, options=options
+                    )
+                package_results[package] = option_check_dictionary
+        finally:
+            if worker_pool is not None:
+                worker_pool.close()
     return_exit_var(package_results=package_results)
 
 
@@ -384,6 +451,19 @@ def parse_args():
         default=None,
         help="Possible startup-mos script to e.g. load additional libraries"
     )
+    check_test_group.add_argument(
+        "--n-workers",
+        default=1,
+        type=int,
+        help="Maximum number of Dymola instances to check or simulate models in parallel. "
+             "Bounded by the number of cpus and free licenses."
+    )
+    check_test_group.add_argument(
+        "--timeout",
+        default=None,
+        type=float,
+        help="Maximal time in seconds to check or simulate one model with --n-workers > 1"
+    )
     # [ bool - flag]
     check_test_group.add_argument("--changed-flag", action="store_true")
     check_test_group.add_argument("--filter-whitelist-flag", default=False, action="store_true")
@@ -392,6 +472,20 @@ def parse_args():
         default=False,
         action="store_true"
     )
+    check_test_group.add_argument(
+        "--use-result-cache",
+        help="Reuse results of models whose sources and dependencies did not change. "
+             "The cache is stored in the ci cache directory.",
+        default=False,
+        action="store_true"
+    )
+    check_test_group.add_argument(
+        "--export-text-logs",
+        help="Write the check log and error log of failed packages as text files "
+             "in addition to the result store.",
+        default=False,
+        action="store_true"
+    )
     check_test_group.add_argument(
         "--create-whitelist-flag",
         help="Create a whitelist of a library with failed models.",
@@ -414,17 +508,23 @@ if __name__ == '__main__':
     for lib in ARGS.additional_libraries_to_load:
         add_lib_path = Path(ARGS.additional_libraries_to_load[lib], lib, "package.mo")
         config_structure.check_file_setting(add_lib_path=add_lib_path)
-    DYMOLA_API = python_dymola_interface.load_dymola_api(
+    DYMOLA_API_KWARGS = dict(
         packages=[LIBRARY_PACKAGE_MO] + ARGS.additional_libraries_to_load,
         min_number_of_unused_licences=ARGS.min_number_of_unused_licences,
         startup_mos=ARGS.startup_mos, use_mp=False
     )
+    if ARGS.create_whitelist_flag:
+        DYMOLA_API = python_dymola_interface.load_dymola_api(**DYMOLA_API_KWARGS)
+    else:
+        # Dymola is only started if models have to be checked, e.g. not if all results are cached.
+        DYMOLA_API = None
 
     if ARGS.create_whitelist_flag is False:
         validate_only(
             args=ARGS,
             dymola_api=DYMOLA_API,
-            library_package_mo=LIBRARY_PACKAGE_MO
+            library_package_mo=LIBRARY_PACKAGE_MO,
+            dymola_api_kwargs=DYMOLA_API_KWARGS
         )
     if ARGS.create_whitelist_flag is True:
         create_whitelist(
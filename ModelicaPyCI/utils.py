@@ -1,14 +1,27 @@
+import atexit
+import csv
+import functools
+import glob
+import json
 import logging
 import os
+import re
+import subprocess
+import sys
+import threading
+import time
 import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Union
+from typing import NamedTuple, Union
 
 from ModelicaPyCI.structure import config_structure
 
 
 logger = logging.getLogger("ModelicaPyCI")
 
+_CHANGED_FILES = {}
+
 
 class ColoredFormatter(logging.Formatter):
     """Logging Formatter to add colors and count warning / errors"""
@@ -48,34 +61,249 @@ def setup_logging():
 
 setup_logging()
 
+# If CI_PROFILE_DIR is set, the timings of each run are written to this directory on exit.
+_PROFILE_DIR_ENV = "CI_PROFILE_DIR"
+# Id of the profiled run, inherited by subprocesses, e.g. Dymola workers.
+_PROFILE_RUN_ENV = "CI_PROFILE_RUN_ID"
+_PROFILE_EVENTS = []
+_PROFILE_LOCK = threading.Lock()
+_IS_PROFILE_MAIN = _PROFILE_RUN_ENV not in os.environ
+_RUN_ID = None
 
-def create_changed_files_file(repo_root: Union[str, Path] = None, to_branch: str = None):
-    from ModelicaPyCI.load_global_config import CI_CONFIG
 
-    old_cwd = os.getcwd()
-    if repo_root is not None:
-        os.chdir(repo_root)
-    if not os.path.isdir(Path().joinpath(".git")):
+class ProfileEvent(NamedTuple):
+    name: str
+    category: str
+    start: float
+    duration: float
+    pid: int
+    thread: int
+    args: dict
+
+
+@contextmanager
+def profile(name: str, category: str = "phase", **args):
+    """
+    Measure the duration of a phase of a CI run, e.g. the check of one model.
+    Can be used as context manager or decorator. The events are written by write_profile.
+    Args:
+        name (): name of the phase or model
+        category (): category, e.g. phase, license, dymola, model, log
+        args (): further information of the event, must be json serializable
+    """
+    start = time.time()
+    perf_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - perf_start
+        event = ProfileEvent(
+            name=name, category=category, start=start, duration=duration,
+            pid=os.getpid(), thread=threading.get_ident(), args=args
+        )
+        with _PROFILE_LOCK:
+            _PROFILE_EVENTS.append(event)
+        logger.debug("%s %s took %.3f s", category, name, duration)
+
+
+def get_run_id():
+    """
+    Returns the id of this CI run. If the run is profiled, the id is shared with its subprocesses.
+    """
+    global _RUN_ID
+    if _PROFILE_RUN_ENV in os.environ:
+        return os.environ[_PROFILE_RUN_ENV]
+    with _PROFILE_LOCK:
+        if _RUN_ID is None:
+            _RUN_ID = f"{Path(sys.argv[0]).stem or 'python'}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+            if _PROFILE_DIR_ENV in os.environ:
+                os.environ[_PROFILE_RUN_ENV] = _RUN_ID
+        return _RUN_ID
+
+
+def get_profile_durations(category: str, names: list = None, since: float = None):
+    """
+    Returns the duration of the last event of each name of the category, e.g. of each checked model.
+    Args:
+        category (): category of the events, e.g. check
+        names (): if given, only the events of these names, e.g. the models of the current package
+        since (): if given, only the events started at or after this time.time()
+    """
+    names = None if names is None else set(names)
+    return {
+        event.name: event.duration for event in get_profile_events()
+        if event.category == category and (names is None or event.name in names)
+        and (since is None or event.start >= since)
+    }
+
+
+def get_profile_events():
+    with _PROFILE_LOCK:
+        return list(_PROFILE_EVENTS)
+
+
+def write_profile(profile_dir: Union[str, Path], run_id: str = None):
+    """
+    Write the events of this run, including the events of its subprocesses, as
+    <run_id>.json (events and the total duration of each category),
+    <run_id>.csv and <run_id>.trace.json (Chrome trace, open in chrome://tracing or Perfetto).
+    Returns:
+        files (): written files
+    """
+    profile_dir = Path(profile_dir)
+    run_id = run_id or get_run_id()
+    events = get_profile_events()
+    for part_file in glob.glob(str(profile_dir.joinpath(f"{run_id}_*.part.json"))):
+        with open(part_file, "r") as file:
+            events.extend(ProfileEvent(**event) for event in json.load(file))
+        os.remove(part_file)
+    events.sort(key=lambda event: event.start)
+    totals = {}
+    for event in events:
+        totals[event.category] = totals.get(event.category, 0) + event.duration
+    os.makedirs(profile_dir, exist_ok=True)
+    json_file = profile_dir.joinpath(f"{run_id}.json")
+    with open(json_file, "w") as file:
+        json.dump({
+            "run_id": run_id,
+            "totals": totals,
+            "events": [event._asdict() for event in events]
+        }, file, indent=2, default=str)
+    csv_file = profile_dir.joinpath(f"{run_id}.csv")
+    with open(csv_file, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(ProfileEvent._fields)
+        for event in events:
+            writer.writerow([*event[:-1], json.dumps(event.args, default=str)])
+    trace_file = profile_dir.joinpath(f"{run_id}.trace.json")
+    with open(trace_file, "w") as file:
+        json.dump({"traceEvents": [
+            {
+                "name": event.name, "cat": event.category, "ph": "X",
+                "ts": event.start * 1e6, "dur": event.duration * 1e6,
+                "pid": event.pid, "tid": event.thread, "args": event.args
+            } for event in events
+        ]}, file, default=str)
+    logger.info("Wrote profile of run %s to %s", run_id, profile_dir)
+    return json_file, csv_file, trace_file
+
+
+def _write_profile_at_exit():
+    profile_dir = Path(os.environ[_PROFILE_DIR_ENV])
+    run_id = get_run_id()
+    if _IS_PROFILE_MAIN:
+        write_profile(profile_dir=profile_dir, run_id=run_id)
+        return
+    events = get_profile_events()
+    if not events:
+        return
+    # Subprocesses write their events for the main process of the run
+    os.makedirs(profile_dir, exist_ok=True)
+    with open(profile_dir.joinpath(f"{run_id}_{os.getpid()}.part.json"), "w") as file:
+        json.dump([event._asdict() for event in events], file, default=str)
+
+
+if _PROFILE_DIR_ENV in os.environ:
+    # Set the id before subprocesses are started, so they write their events for this run
+    get_run_id()
+    atexit.register(_write_profile_at_exit)
+
+
+class ChangedFile(NamedTuple):
+    path: str
+    status: str
+    origin: str = None
+
+
+def get_changed_files(
+        repo_root: Union[str, Path] = None,
+        to_branch: Union[str, list] = None,
+        merge_base: bool = False,
+        diff_filter: str = "AMRT"
+):
+    """
+    Returns the changed files of the git repository, compared to one or multiple target branches.
+    The diff is run once per process and arguments, later calls return the cached result.
+    Args:
+        repo_root (): root of the git repository, default is the current path.
+        to_branch (): branch or list of branches (without origin/) to compare to. If None, compare to HEAD^^.
+        merge_base (): If True, compare to the merge-base of HEAD and the branch instead of the branch itself.
+        diff_filter (): git diff filter of the file status, default: added, modified, renamed and type changed.
+            Renames are detected (-M), so a renamed file is listed with its new path.
+    Returns:
+        changed_files (): list of ChangedFile with the path, the git status letter and for
+        renamed files the original path. Files changed compared to multiple branches are listed once.
+    """
+    repo_root = os.path.abspath(os.getcwd() if repo_root is None else repo_root)
+    if to_branch is None or isinstance(to_branch, str):
+        to_branches = (to_branch,)
+    else:
+        to_branches = tuple(to_branch)
+    cache_key = (repo_root, to_branches, merge_base, diff_filter)
+    if cache_key in _CHANGED_FILES:
+        return list(_CHANGED_FILES[cache_key])
+    if not os.path.exists(os.path.join(repo_root, ".git")):
         logger.error(
-            f"Current path {os.getcwd()} is not a "
-            f"git-directory, can't check changed models: {os.listdir()}"
+            f"Current path {repo_root} is not a "
+            f"git-directory, can't check changed models: {os.listdir(repo_root)}"
         )
         exit(1)
 
-    changed_files_file = CI_CONFIG.get_file_path("ci_files", "changed_file")
-    config_structure.check_path_setting(ci_files=CI_CONFIG.get_dir_path("ci_files"), create_flag=True)
+    changed_files = {}
+    for branch in to_branches:
+        if branch is None:
+            compare_to = "HEAD^^"
+        else:
+            compare_to = _run_git(["rev-parse", f"origin/{branch}"], repo_root=repo_root).strip()
+        if merge_base:
+            compare_to = _run_git(["merge-base", "HEAD", compare_to], repo_root=repo_root).strip()
+        output = _run_git(
+            ["diff", "--name-status", "-M", "-z", f"--diff-filter={diff_filter}", compare_to],
+            repo_root=repo_root
+        )
+        tokens = output.split("\0")
+        idx = 0
+        while idx < len(tokens) and tokens[idx]:
+            status = tokens[idx][0]
+            if status in ("R", "C"):
+                changed_file = ChangedFile(path=tokens[idx + 2], status=status, origin=tokens[idx + 1])
+                idx += 3
+            else:
+                changed_file = ChangedFile(path=tokens[idx + 1], status=status)
+                idx += 2
+            changed_files.setdefault(changed_file.path, changed_file)
+    # The cached files are immutable, callers get a new list
+    _CHANGED_FILES[cache_key] = tuple(changed_files.values())
+    logger.info("Found %s changed files in %s", len(changed_files), repo_root)
+    return list(changed_files.values())
 
-    if to_branch is None:
-        compare_to = "HEAD^^"
-    else:
-        compare_to = os_system_with_return(f"git rev-parse origin/{to_branch}")
 
-    return_value = os_system_with_return(f"git diff --raw --diff-filter=AMT --name-only {compare_to}")
+def _run_git(args: list, repo_root: str):
+    process = subprocess.run(
+        ["git", *args], cwd=repo_root, stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding="utf-8"
+    )
+    if process.returncode != 0:
+        logger.error("git %s failed: %s", " ".join(args), process.stderr.strip())
+        raise subprocess.CalledProcessError(process.returncode, ["git", *args], process.stdout, process.stderr)
+    return process.stdout
 
-    os.chdir(old_cwd)
 
+def create_changed_files_file(
+        repo_root: Union[str, Path] = None,
+        to_branch: Union[str, list] = None,
+        merge_base: bool = False
+):
+    """
+    Writes the paths of the changed files, see get_changed_files, to the changed_file of the ci_files.
+    """
+    from ModelicaPyCI.load_global_config import CI_CONFIG
+
+    changed_files = get_changed_files(repo_root=repo_root, to_branch=to_branch, merge_base=merge_base)
+
+    changed_files_file = CI_CONFIG.get_file_path("ci_files", "changed_file")
+    config_structure.check_path_setting(ci_files=CI_CONFIG.get_dir_path("ci_files"), create_flag=True)
     with open(changed_files_file, "w") as file:
-        file.write(return_value)
+        file.write("\n".join(changed_file.path for changed_file in changed_files))
     config_structure.check_file_setting(changed_files_file=changed_files_file)
 
     return changed_files_file
@@ -90,3 +318,20 @@ def os_system_with_return(command):
     if return_value.endswith("\n"):
         return return_value[:-1]
     return return_value
+
+
+def compile_exceptions(exception_list: list = None):
+    """
+    Compile the exceptions, e.g. certain warnings that are not recognized as errors,
+    into one regular expression, so each log line is searched once for all of them.
+    Returns:
+        pattern (): compiled pattern, None if there are no exceptions
+    """
+    if not exception_list:
+        return None
+    return _compile_exceptions(tuple(exception_list))
+
+
+@functools.lru_cache(maxsize=16)
+def _compile_exceptions(exceptions: tuple):
+    return re.compile("|".join(re.escape(exception) for exception in dict.fromkeys(exceptions)))
@@ -0,0 +1,88 @@
+import subprocess
+
+import pytest
+
+from ModelicaPyCI import utils
+from ModelicaPyCI.utils import ChangedFile, get_changed_files
+
+PIPE = "within MyLib.Components;\nmodel Pipe\n" + "".join(f"  Real x{i};\n" for i in range(20)) + "end Pipe;\n"
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=ci", "-c", "user.email=ci@example.com", *args],
+        cwd=repo, check=True, stdout=subprocess.PIPE, encoding="utf-8"
+    ).stdout.strip()
+
+
+def _commit(repo, files: dict, message: str):
+    for name, content in files.items():
+        file = repo.joinpath(name)
+        if content is None:
+            file.unlink()
+            continue
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(content)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", message)
+    return _git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "_CHANGED_FILES", {})
+    _git(tmp_path, "init", "-q")
+    base = _commit(tmp_path, {
+        "MyLib/Pipe.mo": PIPE, "MyLib/Valve.mo": "model Valve\nend Valve;\n",
+        "MyLib/Tank.mo": "model Tank\nend Tank;\n", "MyLib/Pump.mo": "model Pump\nend Pump;\n"
+    }, "base")
+    _git(tmp_path, "update-ref", "refs/remotes/origin/main", base)
+    # Other branch, diverged from the base
+    _git(tmp_path, "checkout", "-q", "-b", "dev")
+    _git(tmp_path, "update-ref", "refs/remotes/origin/dev", _commit(
+        tmp_path, {"MyLib/Pump.mo": "model Pump\n  Real y;\nend Pump;\n"}, "dev"
+    ))
+    _git(tmp_path, "checkout", "-q", "-b", "feature", base)
+    _commit(tmp_path, {
+        "MyLib/Valve.mo": "model Valve\n  Real y;\nend Valve;\n",
+        "MyLib/Pipe.mo": None,
+        "MyLib/Components/Pipe.mo": PIPE,
+        "MyLib/Tank.mo": None
+    }, "rename and delete")
+    _commit(tmp_path, {"MyLib/Heat Exchanger.mo": "model HeatExchanger\nend HeatExchanger;\n"}, "add")
+    return tmp_path
+
+
+def test_changed_files_to_one_branch(repo):
+    changed_files = [
+        ChangedFile(path="MyLib/Components/Pipe.mo", status="R", origin="MyLib/Pipe.mo"),
+        ChangedFile(path="MyLib/Heat Exchanger.mo", status="A"),
+        ChangedFile(path="MyLib/Valve.mo", status="M"),
+    ]
+    assert get_changed_files(repo_root=repo, to_branch="main") == changed_files
+    # Compared to HEAD^^, the base commit
+    assert get_changed_files(repo_root=repo) == changed_files
+    assert get_changed_files(repo_root=repo, to_branch="main", diff_filter="D") == [
+        ChangedFile(path="MyLib/Tank.mo", status="D")
+    ]
+
+
+def test_changed_files_to_multiple_branches(repo):
+    # The change of the other branch is listed as a change of this branch
+    assert get_changed_files(repo_root=repo, to_branch="dev") == [
+        ChangedFile(path="MyLib/Components/Pipe.mo", status="R", origin="MyLib/Pipe.mo"),
+        ChangedFile(path="MyLib/Heat Exchanger.mo", status="A"),
+        ChangedFile(path="MyLib/Pump.mo", status="M"),
+        ChangedFile(path="MyLib/Valve.mo", status="M"),
+    ]
+    assert [changed_file.path for changed_file in get_changed_files(
+        repo_root=repo, to_branch=["main", "dev"]
+    )] == ["MyLib/Components/Pipe.mo", "MyLib/Heat Exchanger.mo", "MyLib/Valve.mo", "MyLib/Pump.mo"]
+    assert get_changed_files(repo_root=repo, to_branch="dev", merge_base=True) == \
+           get_changed_files(repo_root=repo, to_branch="main")
+
+
+def test_cached_changed_files_are_not_modified(repo):
+    changed_files = get_changed_files(repo_root=repo, to_branch="main")
+    changed_files.clear()
+    assert len(get_changed_files(repo_root=repo, to_branch="main")) == 3
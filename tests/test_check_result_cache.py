@@ -0,0 +1,57 @@
+from ModelicaPyCI.structure import dependency_graph, library_index
+from ModelicaPyCI.structure.check_result_cache import CheckResultCache
+
+from test_dependency_graph import write_library
+
+TABLE_MODEL = (
+    "within MyLib.Components;\nmodel Table\n"
+    "  Modelica.Blocks.Sources.CombiTimeTable table(\n"
+    "    fileName=Modelica.Utilities.Files.loadResource(\"modelica://MyLib/Resources/Data/table.txt\"));\n"
+    "end Table;\n"
+)
+TABLE_TEST = (
+    "within MyLib.Examples;\nmodel TableTest\n  extends Modelica.Icons.Example;\n"
+    "  MyLib.Components.Table table;\nend TableTest;\n"
+)
+
+
+def _get_key(tmp_path, monkeypatch, model: str):
+    # New index and graph, as both are only built once per process
+    monkeypatch.setattr(library_index, "_LIBRARY_INDEX", library_index.LibraryIndex())
+    monkeypatch.setattr(dependency_graph, "_DEPENDENCY_GRAPHS", {})
+    result_cache = CheckResultCache(
+        cache_dir=tmp_path.joinpath("cache"),
+        library_path=tmp_path.joinpath("MyLib"),
+        tool="dymola",
+        tool_version="2024x",
+        additional_libraries=[tmp_path.joinpath("OtherLib", "package.mo")]
+    )
+    return result_cache.get_key(model=model, simulate=True)
+
+
+def test_changed_dependency_or_resource_invalidates_key(tmp_path, monkeypatch):
+    library_path = write_library(tmp_path)
+    library_path.joinpath("Components", "Table.mo").write_text(TABLE_MODEL)
+    library_path.joinpath("Examples", "TableTest.mo").write_text(TABLE_TEST)
+    library_path.joinpath("Resources", "Data").mkdir(parents=True)
+    library_path.joinpath("Resources", "Data", "table.txt").write_text("#1\ndouble tab1(2,2)\n0 0\n1 1\n")
+    tmp_path.joinpath("OtherLib").mkdir()
+    tmp_path.joinpath("OtherLib", "package.mo").write_text('package OtherLib\n  annotation(version="1.0.0");\nend OtherLib;\n')
+
+    key = _get_key(tmp_path, monkeypatch, model="MyLib.Examples.TableTest")
+    pipe_key = _get_key(tmp_path, monkeypatch, model="MyLib.Examples.PipeTest")
+    assert key is not None
+    assert _get_key(tmp_path, monkeypatch, model="MyLib.Examples.TableTest") == key
+
+    library_path.joinpath("Resources", "Data", "table.txt").write_text("#1\ndouble tab1(2,2)\n0 0\n1 2\n")
+    resource_key = _get_key(tmp_path, monkeypatch, model="MyLib.Examples.TableTest")
+    assert resource_key != key
+    # Models which do not read the table keep their results
+    assert _get_key(tmp_path, monkeypatch, model="MyLib.Examples.PipeTest") == pipe_key
+
+    library_path.joinpath("Components", "Table.mo").write_text(TABLE_MODEL.replace("table(", "table(\n    tableOnFile=true,"))
+    dependency_key = _get_key(tmp_path, monkeypatch, model="MyLib.Examples.TableTest")
+    assert dependency_key != resource_key
+
+    tmp_path.joinpath("OtherLib", "package.mo").write_text('package OtherLib\n  annotation(version="1.1.0");\nend OtherLib;\n')
+    assert _get_key(tmp_path, monkeypatch, model="MyLib.Examples.TableTest") != dependency_key
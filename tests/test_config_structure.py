@@ -0,0 +1,72 @@
+import errno
+import os
+
+import pytest
+
+from ModelicaPyCI.structure import config_structure
+
+
+def _write_files(root, files: dict):
+    for name, content in files.items():
+        file = root.joinpath(name)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(content)
+
+
+def _read_files(root):
+    return {
+        file.relative_to(root).as_posix(): file.read_text()
+        for file in sorted(root.rglob("*")) if file.is_file()
+    }
+
+
+SOURCE_FILES = {"a.txt": "new a", "sub/b.txt": "b"}
+
+
+def test_move_folder_to_new_target(tmp_path):
+    source = tmp_path.joinpath("source")
+    _write_files(source, SOURCE_FILES)
+    target = tmp_path.joinpath("result", "target")
+    config_structure.prepare_data(source_target_dict={source: target}, del_flag=True)
+    assert _read_files(target) == SOURCE_FILES
+    assert not source.exists()
+
+
+@pytest.mark.parametrize("del_flag", [True, False])
+def test_merge_folder_into_non_empty_target(tmp_path, del_flag):
+    source = tmp_path.joinpath("source")
+    _write_files(source, SOURCE_FILES)
+    target = tmp_path.joinpath("target")
+    _write_files(target, {"a.txt": "old a", "other.txt": "other"})
+    config_structure.prepare_data(source_target_dict={source: target}, del_flag=del_flag)
+    assert _read_files(target) == {"a.txt": "new a", "other.txt": "other", "sub/b.txt": "b"}
+    assert source.exists() is not del_flag
+    if not del_flag:
+        assert _read_files(source) == SOURCE_FILES
+
+
+@pytest.mark.parametrize("del_flag", [True, False])
+def test_stage_single_file(tmp_path, del_flag):
+    source = tmp_path.joinpath("log.txt")
+    source.write_text("log")
+    target = tmp_path.joinpath("result", "logs")
+    config_structure.prepare_data(source_target_dict={source: target}, del_flag=del_flag)
+    assert _read_files(target) == {"log.txt": "log"}
+    assert source.exists() is not del_flag
+
+
+def test_move_to_other_file_system(tmp_path, monkeypatch):
+    def replace(source, target):
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+    monkeypatch.setattr(config_structure.os, "replace", replace)
+    source = tmp_path.joinpath("source")
+    _write_files(source, SOURCE_FILES)
+    target = tmp_path.joinpath("target")
+    config_structure.prepare_data(source_target_dict={source: target}, del_flag=True)
+    assert _read_files(target) == SOURCE_FILES
+    assert not source.exists()
+
+
+def test_missing_source(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        config_structure.prepare_data(source_target_dict={tmp_path.joinpath("missing"): tmp_path.joinpath("target")})
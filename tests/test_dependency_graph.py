@@ -0,0 +1,51 @@
+from pathlib import Path
+
+from ModelicaPyCI.structure.dependency_graph import ModelicaDependencyGraph
+from ModelicaPyCI.structure.library_index import LibraryIndex
+
+LIBRARY_FILES = {
+    "package.mo": "within ;\npackage MyLib\nend MyLib;\n",
+    "Components/package.mo": "within MyLib;\npackage Components\nend Components;\n",
+    "Components/Pipe.mo": "within MyLib.Components;\nmodel Pipe\n  Real x;\nend Pipe;\n",
+    "Components/Valve.mo": "within MyLib.Components;\nmodel Valve\n  Real y;\nend Valve;\n",
+    "Examples/package.mo": (
+        "within MyLib;\npackage Examples\n  extends Modelica.Icons.ExamplesPackage;\nend Examples;\n"
+    ),
+    "Examples/PipeTest.mo": (
+        "within MyLib.Examples;\nmodel PipeTest\n  extends Modelica.Icons.Example;\n"
+        "  MyLib.Components.Pipe pipe;\nend PipeTest;\n"
+    ),
+    "Examples/ValveTest.mo": (
+        "within MyLib.Examples;\nmodel ValveTest\n  extends Modelica.Icons.Example;\n"
+        "  Components.Valve valve;\nend ValveTest;\n"
+    ),
+}
+
+
+def write_library(root: Path):
+    library_path = root.joinpath("MyLib")
+    for name, content in LIBRARY_FILES.items():
+        file = library_path.joinpath(name)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(content)
+    return library_path
+
+
+def test_package_change_affects_no_examples(tmp_path):
+    library_path = write_library(tmp_path)
+    graph = ModelicaDependencyGraph(library_path=library_path, library_index=LibraryIndex())
+    assert graph.get_dependents("MyLib") == []
+    assert graph.get_dependents("MyLib.Components") == []
+    assert graph.get_affected_examples([library_path.joinpath("package.mo")]) == []
+    assert graph.get_affected_examples([library_path.joinpath("Components", "package.mo")]) == []
+    assert graph.get_affected_examples([library_path.joinpath("Components", "Pipe.mo")]) == [
+        "MyLib.Examples.PipeTest"
+    ]
+
+
+def test_examples_package_is_no_example(tmp_path):
+    library_path = write_library(tmp_path)
+    graph = ModelicaDependencyGraph(library_path=library_path, library_index=LibraryIndex())
+    assert not graph.is_example("MyLib.Examples")
+    assert graph.is_example("MyLib.Examples.PipeTest")
+    assert graph.is_example("MyLib.Examples.ValveTest")
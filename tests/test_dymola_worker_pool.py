@@ -0,0 +1,79 @@
+import queue
+import time
+
+import pytest
+
+dymola_worker_pool = pytest.importorskip("ModelicaPyCI.pydyminterface.dymola_worker_pool")
+
+
+class _FakeProcess:
+
+    def __init__(self, alive: bool = True):
+        self.alive = alive
+        self.terminated = False
+
+    def is_alive(self):
+        return self.alive
+
+    def join(self, timeout=None):
+        pass
+
+    def terminate(self):
+        self.terminated = True
+        self.alive = False
+
+    def kill(self):
+        self.alive = False
+
+
+def _create_pool(monkeypatch, timeout: float = None):
+    pool = dymola_worker_pool.DymolaWorkerPool(packages=[], n_workers=2, timeout=timeout)
+    pool._result_queue = queue.Queue()
+    pool.started_workers = []
+    monkeypatch.setattr(pool, "_start_worker", lambda: pool.started_workers.append(True))
+    return pool
+
+
+def test_stopped_worker_is_no_crash(monkeypatch):
+    pool = _create_pool(monkeypatch)
+    pool._workers = {0: _FakeProcess(alive=False), 1: _FakeProcess(alive=False), 2: _FakeProcess()}
+    # Worker 0 stopped to free its license, worker 1 could not start, both messages are not read yet
+    pool._result_queue.put(("stopped", 0, None, None))
+    pool._result_queue.put(("error", 1, None, "No license"))
+    results, running = {}, {}
+    pool._handle_dead_workers(running=running, results=results, start_times={}, dym_models=["M"])
+    assert list(pool._workers) == [2]
+    assert pool._n_restarts == 0
+    assert pool.started_workers == []
+
+
+def test_crashed_worker_fails_its_model(monkeypatch):
+    pool = _create_pool(monkeypatch)
+    pool._workers = {0: _FakeProcess(alive=False), 1: _FakeProcess()}
+    pool._result_queue.put(("started", 0, 0, None))
+    results, running = {}, {}
+    pool._handle_dead_workers(running=running, results=results, start_times={}, dym_models=["M"])
+    assert "died while checking M" in results[0].result
+    assert not results[0].cacheable
+    assert pool._n_restarts == 1
+    assert pool.started_workers == [True]
+
+
+def test_hanging_model_stops_and_replaces_worker(monkeypatch):
+    pool = _create_pool(monkeypatch, timeout=5)
+    hanging_process = _FakeProcess()
+    pool._workers = {0: hanging_process, 1: _FakeProcess()}
+    results, running = {}, {0: 0, 1: 1}
+    start_times = {0: time.monotonic() - 10, 1: time.monotonic()}
+    pool._handle_timeouts(running=running, results=results, start_times=start_times, dym_models=["M", "N"])
+    assert hanging_process.terminated
+    assert "took longer than 5 seconds" in results[0].result
+    assert running == {1: 1} and list(start_times) == [1]
+    assert list(pool._workers) == [1]
+    assert pool.started_workers == [True]
+    # A late result of the stopped worker does not replace the timeout
+    pool._handle_message(
+        message=("done", 0, 0, "late"), running=running, results=results, start_times=start_times,
+        dym_models=["M", "N"]
+    )
+    assert results[0].result != "late"
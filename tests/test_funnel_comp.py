@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ModelicaPyCI.converter import funnel_comp
+
+MODEL = "MyLib.Examples.PipeTest"
+
+
+def _write_funnel_comp(funnel_path):
+    x = np.linspace(0, 3600, 7)
+    files = {
+        "pipe.port_a.m_flow": {"reference": 0.1 * x, "test": 0.1 * x + 1e-7, "errors": np.zeros(7)},
+        "pipe.T": {"reference": 293.15 + x / 3600, "test": 293.15 + x / 1800, "errors": x / 3600},
+        # Funnel comparison without a test result
+        "valve.y": {"reference": np.ones(7)}
+    }
+    for variable, results in files.items():
+        folder = funnel_path.joinpath(f"{MODEL}.mat_{variable}")
+        folder.mkdir(parents=True)
+        for file, y in results.items():
+            pd.DataFrame({"x": x, "y": y}).to_csv(folder.joinpath(f"{file}.csv"), index=False)
+    funnel_path.joinpath(f"{MODEL}.mat_empty").mkdir()
+    for file in ["reference", "test"]:
+        funnel_path.joinpath(f"{MODEL}.mat_empty", f"{file}.csv").write_text("")
+    return files
+
+
+def test_load_funnel_comp(tmp_path):
+    files = _write_funnel_comp(tmp_path)
+    df = funnel_comp.load_funnel_comp(funnel_path=tmp_path, n_workers=2)
+    assert sorted(set(df.index)) == [(MODEL, "pipe.T"), (MODEL, "pipe.port_a.m_flow"), (MODEL, "valve.y")]
+    for variable, results in files.items():
+        for file in funnel_comp.FUNNEL_FILES:
+            data = funnel_comp.get_funnel_data(df, model=MODEL, variable=variable, file=file)
+            if file not in results:
+                assert data.empty
+                continue
+            expected = pd.read_csv(tmp_path.joinpath(f"{MODEL}.mat_{variable}", f"{file}.csv"))
+            pd.testing.assert_frame_equal(data, expected)
+    df = funnel_comp.load_funnel_comp(
+        funnel_path=tmp_path, variables=[(MODEL, "pipe.T"), (MODEL, "pipe.p")]
+    )
+    assert set(df.index) == {(MODEL, "pipe.T")}
+    assert funnel_comp.get_funnel_data(df, model=MODEL, variable="pipe.p", file="test").empty
+
+
+def _read_csv_funnel(path):
+    # Format of google_charts.read_csv_funnel before the bulk loader
+    var_model = pd.read_csv(path.joinpath("reference.csv"))
+    var_test = pd.read_csv(path.joinpath("test.csv"))
+    value_list = []
+    for i in zip(var_model[['x', 'y']].values.tolist(), [e[1] for e in var_test[['x', 'y']].values.tolist()]):
+        i = str(i)
+        for char in "([])":
+            i = i.replace(char, "")
+        value_list.append("[" + i + "]")
+    return value_list
+
+
+def test_read_csv_funnel_format(tmp_path):
+    google_charts = pytest.importorskip("ModelicaPyCI.converter.google_charts")
+    _write_funnel_comp(tmp_path)
+    for variable in ["pipe.port_a.m_flow", "pipe.T"]:
+        path = tmp_path.joinpath(f"{MODEL}.mat_{variable}")
+        assert google_charts.read_csv_funnel(path) == _read_csv_funnel(path)
+    assert google_charts.read_csv_funnel(tmp_path.joinpath(f"{MODEL}.mat_empty")) is None
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+google_charts = pytest.importorskip("ModelicaPyCI.converter.google_charts")
+
+
+def test_funnel_violations_on_other_grid_are_kept():
+    x = np.linspace(0, 100, 10001)
+    y = np.sin(x / 10)
+    # The funnel grid does not contain the test points
+    errors_df = pd.DataFrame({"x": [0.0, 25.00375, 50.0, 73.12345], "y": [0.0, 0.1, 0.0, 0.2]})
+    violations = google_charts._get_funnel_violations(errors_df=errors_df, x=x)
+    assert list(np.flatnonzero(violations)) == [2500, 2501, 7312, 7313]
+    indices = google_charts.downsample(x=x, y=y, max_points=100, keep=violations)
+    assert {2500, 2501, 7312, 7313}.issubset(indices)
+    assert len(indices) < 200
+
+
+def test_funnel_violations_outside_of_test_grid():
+    x = np.array([1.0, 2.0, 3.0])
+    errors_df = pd.DataFrame({"x": [0.5, 3.5], "y": [1.0, 1.0]})
+    violations = google_charts._get_funnel_violations(errors_df=errors_df, x=x)
+    assert list(violations) == [True, False, True]
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from ModelicaPyCI.load_global_config import CI_CONFIG
+
+html_tidy = pytest.importorskip("ModelicaPyCI.syntax.html_tidy")
+
+MODEL = '''within MyLib.Components;
+model {name}
+  annotation (Documentation(info="<html>
+<p>{name}<br><img src=\\"modelica://MyLib/Resources/Images/{name}.png\\"></p>
+</html>", revisions="<html>
+<ul><li>First implementation</li></ul>
+</html>"));
+end {name};
+'''
+
+
+def _write_models(names: list):
+    for name in names:
+        with open(f"MyLib/Components/{name}.mo", "w", encoding="utf-8") as file:
+            file.write(MODEL.format(name=name))
+    return [f"MyLib.Components.{name}" for name in names]
+
+
+def _check_html_files(model_list: list, n_workers: int, use_cache: bool = False):
+    tidy = html_tidy.HtmlTidy(
+        package="MyLib", correct_overwrite=False, log=True, correct_view=True, library="MyLib",
+        whitelist_library=None, filter_whitelist=False, use_cache=use_cache
+    )
+    for log_file in [tidy.html_error_log, tidy.html_correct_log]:
+        log_file.write_text("")
+    tidy.check_html_files(model_list=model_list, n_workers=n_workers)
+    return tidy.html_error_log.read_text(encoding="utf-8"), tidy.html_correct_log.read_text(encoding="utf-8")
+
+
+@pytest.fixture
+def model_list(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tmp_path.joinpath("MyLib", "Components").mkdir(parents=True)
+    return _write_models(["Pipe", "Valve", "Pump", "Tank", "Heater"])
+
+
+def test_process_pool_writes_logs_in_model_order(model_list):
+    error_log, correct_log = _check_html_files(model_list=model_list, n_workers=2)
+    expected_error_log = ""
+    for model in model_list:
+        model_file = model.replace(".", "/") + ".mo"
+        _, error_list, _, _ = html_tidy._getInfoRevisionsHTML(model_file=model_file)
+        expected_error_log += f'\n---- {model_file} ----' + "".join(f'\n{error}\n' for error in error_list)
+    assert error_log == expected_error_log
+    assert [line for line in error_log.split("\n") if line.startswith("----")] == \
+           [f"---- {model.replace('.', '/')}.mo ----" for model in model_list]
+    assert (error_log, correct_log) == _check_html_files(model_list=model_list, n_workers=1)
+
+
+def test_section_cache_is_reused(model_list):
+    logs = _check_html_files(model_list=model_list, n_workers=2)
+    assert _check_html_files(model_list=model_list, n_workers=2, use_cache=True) == logs
+    cache_file = CI_CONFIG.get_file_path("cache", "html_tidy_file")
+    with open(cache_file, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    # Info of each model and one shared revisions section
+    assert len(data["sections"]) == len(model_list) + 1
+    assert _check_html_files(model_list=model_list, n_workers=2, use_cache=True) == logs
+
+    # Cached results are used instead of calling tidy
+    for key in data["sections"]:
+        data["sections"][key] = ["<p>cached</p>", "line 1 column 1 - Warning: cached"]
+    with open(cache_file, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+    error_log, correct_log = _check_html_files(model_list=model_list, n_workers=2, use_cache=True)
+    assert error_log.count("Warning: cached") == 2 * len(model_list)
+    assert "<p>cached</p>" in correct_log
@@ -0,0 +1,22 @@
+from ModelicaPyCI.load_global_config import CI_CONFIG
+from ModelicaPyCI.structure import dependency_graph, library_index
+from ModelicaPyCI.structure.impact_analysis import RegressionImpactAnalysis
+
+from test_dependency_graph import write_library
+
+
+def test_package_change_selects_only_dependent_models(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(library_index, "_LIBRARY_INDEX", library_index.LibraryIndex())
+    monkeypatch.setattr(dependency_graph, "_DEPENDENCY_GRAPHS", {})
+    library_path = write_library(tmp_path)
+    script_dir = library_path.joinpath(CI_CONFIG.artifacts.library_resource_dir, "Examples")
+    script_dir.mkdir(parents=True)
+    for model in ["PipeTest", "ValveTest"]:
+        script_dir.joinpath(f"{model}.mos").write_text(f'simulateModel("MyLib.Examples.{model}");\n')
+
+    impact_analysis = RegressionImpactAnalysis(library_path=library_path)
+    assert impact_analysis.get_affected_models(["MyLib/package.mo"]) == []
+    assert impact_analysis.get_affected_models(["MyLib/Components/package.mo"]) == []
+    assert impact_analysis.get_affected_models(["MyLib/Examples/package.mo"]) == []
+    assert impact_analysis.get_affected_models(["MyLib/Components/Valve.mo"]) == ["MyLib.Examples.ValveTest"]
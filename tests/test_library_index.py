@@ -0,0 +1,84 @@
+import json
+import os
+
+from ModelicaPyCI.structure import library_index, sort_mo_model
+from ModelicaPyCI.structure.library_index import INDEX_VERSION, LibraryIndex
+
+from test_dependency_graph import write_library
+
+
+def test_get_models(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(library_index, "_LIBRARY_INDEX", LibraryIndex())
+    write_library(tmp_path)
+    assert sorted(sort_mo_model.get_models(path="MyLib", library="MyLib")) == [
+        "MyLib.Components.Pipe", "MyLib.Components.Valve", "MyLib.Examples.PipeTest", "MyLib.Examples.ValveTest"
+    ]
+    assert sorted(sort_mo_model.get_models(path="MyLib", library="MyLib", simulate_flag=True)) == [
+        "MyLib.Examples.PipeTest", "MyLib.Examples.ValveTest"
+    ]
+
+
+def test_parse_content():
+    entry = library_index._parse_content(
+        "within MyLib.Examples;\n"
+        "model PipeTest \"Test of the pipe, extends Modelica.Icons.Example\"\n"
+        "  extends Modelica.Icons.Example;\n"
+        "  import MyLib.Components.{Pipe, Valve};\n"
+        "  // MyLib.Components.Commented is no reference\n"
+        "  Pipe pipe;\n"
+        "  record Data\n    Real x;\n  end Data;\n"
+        "end PipeTest;\n"
+    )
+    assert entry["within"] == "MyLib.Examples"
+    assert entry["extends"] == ["Modelica.Icons.Example"]
+    assert entry["imports"] == [["Pipe", "MyLib.Components.Pipe"], ["Valve", "MyLib.Components.Valve"]]
+    assert entry["classes"] == ["Data"]
+    assert entry["is_example"]
+    assert "Pipe" in entry["references"]
+    assert not any("Commented" in reference for reference in entry["references"])
+
+
+def test_index_is_only_parsed_again_for_changed_files(tmp_path, monkeypatch):
+    library_path = write_library(tmp_path)
+    index_file = tmp_path.joinpath("cache", "library_index.json")
+    pipe_file = os.path.normpath(library_path.joinpath("Components", "Pipe.mo"))
+    valve_file = os.path.normpath(library_path.joinpath("Components", "Valve.mo"))
+    index = LibraryIndex(index_file=index_file)
+    assert len(index.get_files(library_path)) == 7
+    assert index_file.exists()
+
+    parsed = []
+
+    def parse_content(content):
+        parsed.append(content)
+        return original_parse_content(content)
+    original_parse_content = library_index._parse_content
+    monkeypatch.setattr(library_index, "_parse_content", parse_content)
+
+    # A new process loads the index and does not parse the unchanged files
+    index = LibraryIndex(index_file=index_file)
+    assert len(index.get_files(library_path)) == 7
+    assert parsed == []
+    # A new mtime with the same content is only hashed
+    os.utime(pipe_file, ns=(1, 1))
+    assert index.get_entry(pipe_file)["mtime"] == 1
+    assert parsed == []
+    # A changed file is parsed again
+    library_path.joinpath("Components", "Pipe.mo").write_text(
+        "within MyLib.Components;\nmodel Pipe\n  extends MyLib.Components.Valve;\nend Pipe;\n"
+    )
+    assert index.get_entry(pipe_file)["extends"] == ["MyLib.Components.Valve"]
+    assert len(parsed) == 1
+    # A deleted file is removed from the index
+    os.remove(valve_file)
+    assert index.get_entry(valve_file) is None
+    assert valve_file not in index.files
+    with open(index_file, "r") as file:
+        assert valve_file not in json.load(file)["files"]
+
+
+def test_outdated_index_is_not_loaded(tmp_path):
+    index_file = tmp_path.joinpath("library_index.json")
+    index_file.write_text(json.dumps({"version": INDEX_VERSION - 1, "files": {"Old.mo": {}}}))
+    assert LibraryIndex(index_file=index_file).files == {}
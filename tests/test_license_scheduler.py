@@ -0,0 +1,92 @@
+import fcntl
+import time
+
+import pytest
+
+from ModelicaPyCI.load_global_config import CI_CONFIG
+from ModelicaPyCI.pydyminterface import license_scheduler
+
+
+def _is_locked(lock_file):
+    with open(lock_file, "a+") as file:
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+        return False
+
+
+def test_server_is_queried_outside_of_the_lock(tmp_path, monkeypatch):
+    lock_file = tmp_path.joinpath("licenses.json")
+    monkeypatch.setattr(CI_CONFIG.license, "lock_file", str(lock_file))
+    queries = []
+
+    def get_number_of_unused_licenses(url, port):
+        queries.append(_is_locked(lock_file))
+        return 3
+    monkeypatch.setattr(license_scheduler, "get_number_of_unused_licenses", get_number_of_unused_licenses)
+
+    scheduler = license_scheduler.LicenseScheduler(url="license.server", port=50064)
+    scheduler._update_state()
+    assert queries == [False]
+    assert scheduler._n_unused == 3
+    scheduler.claim(2)
+    assert scheduler._get_number_of_usable_licenses() == 1
+    # Polls of other jobs within min_poll_seconds use the shared state
+    other_scheduler = license_scheduler.LicenseScheduler(url="license.server", port=50064)
+    other_scheduler._update_state()
+    assert queries == [False]
+    assert other_scheduler._get_number_of_usable_licenses() == 1
+
+
+class _FakeDymola:
+    _portnumber = 1
+
+    def ExecuteCommand(self, command):
+        return True
+
+
+class _FakeDymolaAPI:
+
+    def __init__(self, has_license: bool):
+        self.has_license = has_license
+        self.dymola = _FakeDymola()
+
+    def license_is_available(self):
+        return self.has_license
+
+    def close(self):
+        pass
+
+
+class _FakeScheduler:
+
+    def __init__(self):
+        self.calls = []
+
+    def claim(self, n_licenses: int = 1):
+        self.calls.append("claim")
+
+    def release(self, n_licenses: int = 1):
+        self.calls.append("release")
+
+    def wait_for_licenses(self, n_licenses: int = 1, timeout: float = None):
+        self.calls.append("wait")
+        return 1
+
+
+def test_license_retry_only_waits_for_the_scheduler(monkeypatch):
+    python_dymola_interface = pytest.importorskip("ModelicaPyCI.pydyminterface.python_dymola_interface")
+    scheduler = _FakeScheduler()
+    dymola_apis = [_FakeDymolaAPI(has_license=False), _FakeDymolaAPI(has_license=True)]
+    monkeypatch.setattr(python_dymola_interface, "check_enough_licenses_available", lambda **kwargs: None)
+    monkeypatch.setattr(python_dymola_interface, "get_dymola_license_scheduler", lambda **kwargs: scheduler)
+    monkeypatch.setattr(python_dymola_interface, "_start_dymola_api", lambda **kwargs: dymola_apis.pop(0))
+
+    def sleep(seconds):
+        raise AssertionError("The retry must only wait for the license scheduler")
+    monkeypatch.setattr(python_dymola_interface.time, "sleep", sleep)
+    dymola_api = python_dymola_interface.load_dymola_api(packages=[])
+    assert dymola_api.has_license
+    assert scheduler.calls == ["claim", "release", "wait", "claim", "release"]
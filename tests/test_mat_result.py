@@ -0,0 +1,28 @@
+import numpy as np
+
+from ModelicaPyCI.unittest.mat_result import MatResultFile
+from test_result_comparison import write_mat_result
+
+
+def test_read_aliases_and_negated_aliases(tmp_path):
+    time = np.linspace(0, 1, 11)
+    for transposed in [True, False]:
+        path = tmp_path.joinpath(f"result_{transposed}.mat")
+        write_mat_result(path, {
+            "pipe.m_flow": 2 * time,
+            "valve.m_flow": ("pipe.m_flow", 1),
+            "pipe.port_b.m_flow": ("pipe.m_flow", -1),
+            "pipe.T": 293.15 + time,
+            "pipe.length": 10.0
+        }, time=time, transposed=transposed)
+        result = MatResultFile(path)
+        assert result.names == ["time", "pipe.m_flow", "valve.m_flow", "pipe.port_b.m_flow", "pipe.T", "pipe.length"]
+        assert result.get_trajectory_variables() == ["pipe.m_flow", "valve.m_flow", "pipe.port_b.m_flow", "pipe.T"]
+        np.testing.assert_allclose(result.time, time)
+        np.testing.assert_allclose(result.get_trajectory("valve.m_flow"), 2 * time)
+        np.testing.assert_allclose(result.get_trajectory("pipe.port_b.m_flow"), -2 * time)
+        columns, signs = result.get_columns(["pipe.m_flow", "valve.m_flow", "pipe.port_b.m_flow", "pipe.T"])
+        assert list(columns) == [1, 1, 1, 2]
+        assert list(signs) == [1, 1, -1, 1]
+        values = result.get_values(["pipe.T", "pipe.port_b.m_flow"], rows=np.array([0, 10]))
+        np.testing.assert_allclose(values, [[293.15, 0], [294.15, -2]])
@@ -0,0 +1,137 @@
+import re
+
+import pytest
+
+naming_guideline = pytest.importorskip("ModelicaPyCI.syntax.naming_guideline")
+
+NAMES = [
+    "TSet", "dTCon", "m_flow_nominal", "port_a", "use_inputFilter", "heatport_from_a", "vol1", "vol12",
+    "QFlo_flow", "COP_nominal", "PIDCon", "deltaMSen", "energyDynamics", "isOn", "timeConst",
+    "hConWal", "VolFlo", "pumpSpeed", "x", "TZoneAir_start", "conPID", "pre_x1", "Real T", "",
+    "m_flow_small", "dp_const", "yMax_max", "u_in", "useHeaCur_out", "absHumAir"
+]
+
+MODEL = '''within MyLib.Components;
+model Pipe "Pipe with a volume"
+  parameter Real TSet = 293.15 "Set temperature";
+  parameter Real pumpSpeed = 1 "Speed";
+  Real m_flow_nominal "Nominal mass flow rate";
+  Real vol1;
+  parameter Real table[2, 2] = [0, 0;
+    1, 1] "Table";
+  Modelica.Blocks.Interfaces.RealInput u "In";
+equation
+  m_flow_nominal = 1;
+end Pipe;
+'''
+
+
+def _split_camel_case(string):
+    parts = []
+    last_upper = 0
+    for i, char in enumerate(string):
+        if char.isupper() and last_upper != i:
+            parts.append(string[last_upper:i])
+            last_upper = i
+    parts.append(string[last_upper:len(string)])
+    return parts
+
+
+def _check_if_name_is_ok(name: str, naming_config):
+    # Checker before the compiled naming guideline
+    name_clean = name
+    if name in naming_config.special_names:
+        return True, "Name is correct", []
+    if " " in name:
+        return False, ("Could not extract name from line and check correctness, "
+                       "is your type specification correct (full library path)?"), []
+    for special_parts_with_cap in naming_config.special_parts_with_upper:
+        name = name.replace(special_parts_with_cap, "")
+    name_parts = _split_camel_case(string=name)
+    parts_ok = []
+    for idx, part in enumerate(name_parts):
+        next_part = name_parts[idx + 1] if idx < len(name_parts) - 1 else ""
+        for special_end in naming_config.special_ends:
+            if part.endswith(special_end):
+                name_parts = [s.replace(part, part[:-len(special_end)]) for s in name_parts]
+                part = part[:-len(special_end)]
+                break
+        for special_start in naming_config.special_starts:
+            if part.startswith(special_start):
+                part = part[len(special_start):]
+                break
+        part = re.sub(r'\d(?=\D*$)', '', part)
+        parts_ok.append(
+            (part in naming_config.special_parts) or
+            (len(part) == 3) or
+            (len(part) == 0) or
+            (part.lower() in naming_config.two_character_words) or
+            (part.lower() in naming_config.four_character_words) or
+            part == "d" and next_part == "T"
+        )
+    if not all(parts_ok):
+        parts_not_ok = [part for part, ok in zip(name_parts, parts_ok) if not ok]
+        return False, f"Name '{name_clean}' contains parts with more/less than " \
+                      f"3 characters or which are not part of special cases. " \
+                      f"Affected parts: {', '.join(parts_not_ok)}", parts_not_ok
+    return True, f"Name '{name_clean}' is correct", []
+
+
+def test_compiled_verdicts_match_list_checker():
+    naming_config = naming_guideline.NamingGuidelineConfig()
+    for name in NAMES:
+        assert naming_guideline.check_if_name_is_ok(name=name, naming_config=naming_config) == \
+               _check_if_name_is_ok(name=name, naming_config=naming_config), name
+    assert naming_guideline.split_camel_case("TZoneAir_start") == _split_camel_case("TZoneAir_start")
+
+
+def test_problematic_expressions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tmp_path.joinpath("MyLib", "Components").mkdir(parents=True)
+    tmp_path.joinpath("MyLib", "Components", "Pipe.mo").write_text(MODEL, encoding="utf-8")
+    problematic_expressions, _ = naming_guideline.get_possibly_wrong_code_sections(
+        files=["MyLib.Components.Pipe", "MyLib.Components.package"], library="MyLib",
+        naming_config=naming_guideline.NamingGuidelineConfig(), n_workers=2
+    )
+    assert problematic_expressions == {
+        'parameter Real pumpSpeed = 1 "Speed";':
+            "Name 'pumpSpeed' contains parts with more/less than 3 characters or which are not part "
+            "of special cases. Affected parts: pump, Speed",
+        'Real vol1;': "Missing documentation",
+        # Array rows are joined to one expression
+        'parameter Real table[2, 2] = [0, 0;1, 1] "Table";':
+            "Name 'table' contains parts with more/less than 3 characters or which are not part "
+            "of special cases. Affected parts: table",
+        'Modelica.Blocks.Interfaces.RealInput u "In";': "Documentation too short"
+    }
+
+
+def test_name_verdict_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tmp_path.joinpath("MyLib", "Components").mkdir(parents=True)
+    tmp_path.joinpath("MyLib", "Components", "Pipe.mo").write_text(MODEL, encoding="utf-8")
+    naming_config = naming_guideline.NamingGuidelineConfig()
+    config_hash = naming_guideline.get_config_hash(naming_config)
+    problematic_expressions, _ = naming_guideline.get_possibly_wrong_code_sections(
+        files=["MyLib.Components.Pipe"], library="MyLib", naming_config=naming_config, use_cache=True
+    )
+    name_verdicts = naming_guideline._load_name_verdict_cache(config_hash=config_hash)
+    assert list(name_verdicts) == ["pumpSpeed", "m_flow_nominal", "vol1;", "table", "u"]
+    assert name_verdicts["pumpSpeed"] == naming_guideline.check_if_name_is_ok("pumpSpeed", naming_config)
+
+    # Cached verdicts are used instead of checking the names
+    name_verdicts["pumpSpeed"] = (True, "Name 'pumpSpeed' is correct", ())
+    naming_guideline._save_name_verdict_cache(config_hash=config_hash, name_verdicts=name_verdicts)
+    cached_expressions, _ = naming_guideline.get_possibly_wrong_code_sections(
+        files=["MyLib.Components.Pipe"], library="MyLib",
+        naming_config=naming_guideline.NamingGuidelineConfig(), use_cache=True
+    )
+    assert list(cached_expressions) == [key for key in problematic_expressions if "pumpSpeed" not in key]
+
+    # A changed config invalidates the cache
+    changed_config = naming_guideline.NamingGuidelineConfig(special_parts_with_upper=["COP"])
+    assert naming_guideline._load_name_verdict_cache(naming_guideline.get_config_hash(changed_config)) == {}
+    changed_expressions, _ = naming_guideline.get_possibly_wrong_code_sections(
+        files=["MyLib.Components.Pipe"], library="MyLib", naming_config=changed_config, use_cache=True
+    )
+    assert changed_expressions == problematic_expressions
@@ -0,0 +1,38 @@
+import pytest
+
+om_session_pool = pytest.importorskip("ModelicaPyCI.unittest.om_session_pool")
+
+
+class _PublicOMCSession:
+    """OMCSessionZMQ without the private socket and process attributes"""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.expressions = []
+
+    def sendExpression(self, expression, parsed=True):
+        self.expressions.append(expression)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+def _create_session(omc):
+    session = om_session_pool.OMCSession.__new__(om_session_pool.OMCSession)
+    session.omc = omc
+    session._channel = om_session_pool._OMCChannel.from_session(omc)
+    return session
+
+
+def test_unsupported_ompython_uses_public_api():
+    omc = _PublicOMCSession(answer="4.0.0")
+    session = _create_session(omc)
+    assert session._channel is None
+    assert session.send_expression("getVersion()", timeout=10) == "4.0.0"
+    assert omc.expressions == ["getVersion()"]
+
+
+def test_unsupported_ompython_raises_session_error():
+    session = _create_session(_PublicOMCSession(answer=RuntimeError("omc died")))
+    with pytest.raises(om_session_pool.OMCSessionError, match="omc died"):
+        session.send_expression("simulate(MyLib.Examples.PipeTest)")
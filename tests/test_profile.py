@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from ModelicaPyCI import utils
+from ModelicaPyCI.utils import get_profile_durations, profile, write_profile
+
+SUBPROCESS = """
+from ModelicaPyCI.utils import profile
+with profile("MyLib.Examples.PipeTest", category="check", tool="dymola"):
+    pass
+"""
+
+
+def test_write_profile_merges_subprocess_events(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "_PROFILE_EVENTS", [])
+    run_id = "validatetest_20261017_120000_1"
+    with profile("MyLib.Components check", category="phase"):
+        env = dict(
+            os.environ, CI_PROFILE_DIR=str(tmp_path), CI_PROFILE_RUN_ID=run_id,
+            PYTHONPATH=os.pathsep.join([str(Path(__file__).parents[1]), os.environ.get("PYTHONPATH", "")])
+        )
+        for _ in range(2):
+            subprocess.run([sys.executable, "-c", SUBPROCESS], env=env, check=True)
+    # Events of other runs are not merged
+    tmp_path.joinpath("other_run_1.part.json").write_text("[]")
+    assert len(list(tmp_path.glob(f"{run_id}_*.part.json"))) == 2
+
+    json_file, csv_file, trace_file = write_profile(profile_dir=tmp_path, run_id=run_id)
+    with open(json_file, "r") as file:
+        data = json.load(file)
+    assert [(event["name"], event["category"]) for event in data["events"]] == [
+        ("MyLib.Components check", "phase"),
+        ("MyLib.Examples.PipeTest", "check"),
+        ("MyLib.Examples.PipeTest", "check"),
+    ]
+    assert len({event["pid"] for event in data["events"]}) == 3
+    assert data["events"][1]["args"] == {"tool": "dymola"}
+    assert data["totals"]["check"] == sum(event["duration"] for event in data["events"][1:])
+    assert not list(tmp_path.glob(f"{run_id}_*.part.json"))
+    assert tmp_path.joinpath("other_run_1.part.json").exists()
+    assert len(csv_file.read_text().splitlines()) == 4
+    with open(trace_file, "r") as file:
+        assert len(json.load(file)["traceEvents"]) == 3
+
+
+def test_profile_durations_of_the_current_check(monkeypatch):
+    monkeypatch.setattr(utils, "_PROFILE_EVENTS", [])
+    for model in ["MyLib.Components.Pipe", "MyLib.Components.Valve"]:
+        with profile(model, category="check"):
+            pass
+    check_start = time.time()
+    with profile("MyLib.Examples.PipeTest", category="check"):
+        pass
+    with profile("MyLib.Examples.PipeTest", category="simulate"):
+        pass
+    assert list(get_profile_durations(category="check")) == [
+        "MyLib.Components.Pipe", "MyLib.Components.Valve", "MyLib.Examples.PipeTest"
+    ]
+    assert list(get_profile_durations(category="check", since=check_start)) == ["MyLib.Examples.PipeTest"]
+    assert list(get_profile_durations(
+        category="check", names=["MyLib.Components.Pipe", "MyLib.Examples.PipeTest"], since=check_start
+    )) == ["MyLib.Examples.PipeTest"]
+    assert list(get_profile_durations(category="check", names=["MyLib.Components.Valve"])) == [
+        "MyLib.Components.Valve"
+    ]
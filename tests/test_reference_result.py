@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+
+from ModelicaPyCI.unittest import reference_result
+from ModelicaPyCI.unittest.reference_result import read_reference_file
+
+REFERENCE_FILE = """last-generated=2024-01-01
+statistics-simulation=
+{
+  "linear": " ",
+  "nonlinear": " "
+}
+time=[0.0000000000000000e+00, 3.6000000000000000e+03]
+heaCap.T=[2.9315e+02, 2.9316e+02, 2.9317e+02, 2.9318e+02, 2.9319e+02]
+x[1, 2]=[3.0, 4.0]
+vol[2].dynBal.m=[1.0, 2.0, 3.0, 4.0, 5.0]
+"""
+
+
+def test_read_reference_file(tmp_path):
+    reference_file = tmp_path.joinpath("MyLib_Examples_Test.txt")
+    reference_file.write_text(REFERENCE_FILE)
+    df = read_reference_file(reference_file)
+    assert sorted(df.columns) == ["heaCap.T", "vol[2].dynBal.m", "x[1, 2]"]
+    np.testing.assert_allclose(df.index.to_numpy(), [0, 900, 1800, 2700, 3600])
+    # Variables with two values are linearly interpolated
+    np.testing.assert_allclose(df["x[1, 2]"].to_numpy(), [3.0, 3.25, 3.5, 3.75, 4.0])
+    np.testing.assert_allclose(df["vol[2].dynBal.m"].to_numpy(), [1, 2, 3, 4, 5])
+    np.testing.assert_allclose(df["heaCap.T"].to_numpy(), [293.15, 293.16, 293.17, 293.18, 293.19])
+
+
+def test_reference_cache_keeps_unchanged_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    reference_file = tmp_path.joinpath("MyLib_Examples_Test.txt")
+    reference_file.write_text(REFERENCE_FILE)
+    names, values = reference_result.load_reference_cache(reference_file)
+    assert names[0] == "time" and values.shape == (4, 5)
+    cache_files = list(tmp_path.rglob("*.bin"))
+    assert len(cache_files) == 1
+
+    # A new checkout changes the mtime, but not the content
+    os.utime(reference_file, ns=(1, 1))
+    names_touched, values_touched = reference_result.load_reference_cache(reference_file)
+    assert names_touched == names
+    np.testing.assert_array_equal(values_touched, values)
+    header = reference_result._read_cache_header(cache_files[0])
+    assert header["stat"] == [1, reference_file.stat().st_size]
+
+    def fail_to_read(path):
+        raise AssertionError("The unchanged reference file must not be read again")
+    monkeypatch.setattr(reference_result, "read_reference_file", fail_to_read)
+    reference_result.load_reference_cache(reference_file)
+
+
+def test_failed_cache_write_removes_tmp_file(tmp_path, monkeypatch):
+    def fail_to_replace(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(reference_result.os, "replace", fail_to_replace)
+    cache_file = tmp_path.joinpath("cache.bin")
+    with pytest.raises(OSError):
+        reference_result._write_reference_cache(
+            cache_file=cache_file, file_hash="", file_stat=[0, 0], names=["time"], values=np.zeros((1, 2))
+        )
+    assert list(tmp_path.iterdir()) == []
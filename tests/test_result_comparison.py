@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from ModelicaPyCI.unittest.result_comparison import compare_results
+
+
+def _get_char_matrix(strings: list):
+    length = max(len(string) for string in strings)
+    return np.array([[ord(char) for char in string.ljust(length)] for string in strings], dtype=np.uint8)
+
+
+def _write_matrix(file, name: str, matrix: np.ndarray):
+    matrix = np.asarray(matrix)
+    # MOPT type: precision digit (0: double, 2: int32, 5: uint8) and text flag
+    mopt = {np.dtype("float64"): 0, np.dtype("int32"): 20, np.dtype("uint8"): 51}[matrix.dtype]
+    header = np.array([mopt, matrix.shape[0], matrix.shape[1], 0, len(name) + 1], dtype="<i4")
+    file.write(header.tobytes())
+    file.write(name.encode("ascii") + b"\0")
+    file.write(matrix.astype(matrix.dtype.newbyteorder("<")).tobytes(order="F"))
+
+
+def write_mat_result(path, variables: dict, time: np.ndarray, transposed: bool = True):
+    """
+    Write a MATLAB v4 result file in the dsres format of Dymola and OpenModelica.
+    Args:
+        variables (): name: values for data_2 variables, name: (alias, sign) for aliases,
+            name: float for parameters in data_1
+        transposed (): binTrans (Dymola, OpenModelica) or binNormal format
+    """
+    names = ["time"]
+    data_info = [[0, 1, 0, -1]]
+    data_1 = [[time[0], time[-1]]]
+    data_2 = [time]
+    for name, values in variables.items():
+        names.append(name)
+        if isinstance(values, tuple):
+            alias, sign = values
+            matrix, column = data_info[names.index(alias)][:2]
+            data_info.append([matrix, sign * abs(column), 0, -1])
+        elif np.isscalar(values):
+            data_1.append([values, values])
+            data_info.append([1, len(data_1), 0, 0])
+        else:
+            data_2.append(np.asarray(values, dtype=float))
+            data_info.append([2, len(data_2), 0, -1])
+    matrices = {
+        "Aclass": _get_char_matrix(["Atrajectory", "1.1", "", "binTrans" if transposed else "binNormal"]),
+        "name": _get_char_matrix(names),
+        "description": _get_char_matrix([""] * len(names)),
+        "dataInfo": np.array(data_info, dtype=np.int32),
+        "data_1": np.array(data_1, dtype=float),
+        "data_2": np.array(data_2, dtype=float)
+    }
+    with open(path, "wb") as file:
+        for name, matrix in matrices.items():
+            if transposed and name != "Aclass":
+                matrix = matrix.T if name in ("name", "description", "dataInfo") else matrix
+            elif not transposed and name in ("data_1", "data_2"):
+                matrix = matrix.T
+            _write_matrix(file, name, matrix)
+
+
+def _compare_data_frames(om_df: pd.DataFrame, dym_df: pd.DataFrame):
+    # Comparison of om_check before the streaming of the result files
+    om_df.index = np.round(om_df.index, 4)
+    dym_df.index = np.round(dym_df.index, 4)
+    om_df = om_df.drop_duplicates()
+    dym_df = dym_df.drop_duplicates()
+    om_only = [idx for idx in om_df.index if idx not in dym_df.index]
+    dym_only = [idx for idx in dym_df.index if idx not in om_df.index]
+    om_df = om_df.drop(om_only)
+    dym_df = dym_df.drop(dym_only)
+    errors = {}
+    n_diff_cols = 0
+    for col in om_df.columns:
+        if col not in dym_df.columns:
+            n_diff_cols += 1
+            continue
+        dym = dym_df.loc[:, col].values
+        om = om_df.loc[:, col].values
+        if np.std(om) + np.std(dym) <= 1e-5:
+            continue
+        errors[col] = float(np.sqrt(np.mean(np.square(dym - om))))
+    n_diff_cols += len([col for col in dym_df.columns if col not in errors])
+    return errors, len(om_only) + len(dym_only), n_diff_cols
+
+
+def _get_variables(time: np.ndarray, offset: float, only: str):
+    return {
+        "pipe.m_flow": np.sin(time) + offset,
+        "valve.m_flow": ("pipe.m_flow", 1),
+        "pipe.port_b.m_flow": ("pipe.m_flow", -1),
+        "pipe.T": 293.15 + offset * time,
+        "pipe.p": np.full(len(time), 1e5),
+        only: time
+    }
+
+
+def _get_data_frame(variables: dict, time: np.ndarray):
+    data = {}
+    for name, values in variables.items():
+        if isinstance(values, tuple):
+            alias, sign = values
+            values = sign * variables[alias]
+        data[name] = values
+    return pd.DataFrame(data, index=time)
+
+
+def test_compare_results_as_drop_duplicates(tmp_path):
+    # Event at 0.5 and duplicate last point, Dymola with a finer and slightly shifted grid
+    time_om = np.concatenate([np.linspace(0, 0.5, 6), np.linspace(0.5, 1, 6), [1]])
+    time_dym = np.concatenate([np.linspace(0, 1, 21), [1]]) + 1e-11
+    variables_om = _get_variables(time_om, offset=0, only="om.only")
+    variables_dym = _get_variables(time_dym, offset=0.1, only="dym.only")
+    write_mat_result(tmp_path.joinpath("om.mat"), variables_om, time=time_om)
+    write_mat_result(tmp_path.joinpath("dym.mat"), variables_dym, time=time_dym)
+
+    errors, n_diff_events, n_different_cols = compare_results(
+        tmp_path.joinpath("om.mat"), tmp_path.joinpath("dym.mat"), chunk_size_mb=1e-4
+    )
+    ref_errors, ref_n_diff_events, ref_n_different_cols = _compare_data_frames(
+        _get_data_frame(variables_om, time_om), _get_data_frame(variables_dym, time_dym)
+    )
+    assert errors.keys() == ref_errors.keys()
+    for name, error in ref_errors.items():
+        assert np.isclose(errors[name], error)
+    assert n_diff_events == ref_n_diff_events == 10
+    assert n_different_cols == ref_n_different_cols
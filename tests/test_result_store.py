@@ -0,0 +1,94 @@
+from ModelicaPyCI.deploy import create_om_badge
+from ModelicaPyCI.unittest.result_store import CheckResult, ResultStore, ERROR, SUCCESS, WARNING, classify_log
+
+EXCEPTIONS = [
+    "Warning: Variable (a) is not used",
+    "Warning: Bad start value.",
+    "Warning: Bad start value."
+]
+LOG = (
+    "Warning: Variable (a) is not used\n"
+    "Warning: Bad start value. For pipe.T\n"
+    "\n"
+    "Warning: Variable a is not used\n"
+    "Warning: Bad start value: pipe.p\n"
+)
+
+
+def _add_run(db_file, run_id: str, package: str, option: str, results: list):
+    with ResultStore(db_file=db_file, run_id=run_id) as result_store:
+        result_store.add_results(
+            tool="openmodelica", library="MyLib", package=package, option=option, results=results
+        )
+
+
+def test_last_results_of_each_package(tmp_path):
+    db_file = tmp_path.joinpath("results.db")
+    _add_run(db_file, "old", "Components", "simulate", [CheckResult("MyLib.Components.A", ERROR)])
+    _add_run(db_file, "job_1", "Components", "simulate", [
+        CheckResult("MyLib.Components.A", SUCCESS), CheckResult("MyLib.Components.B", WARNING)
+    ])
+    _add_run(db_file, "job_2", "Examples", "simulate", [CheckResult("MyLib.Examples.C", ERROR)])
+    # Only checks, must not hide the simulations
+    _add_run(db_file, "job_3", "Examples", "check", [CheckResult("MyLib.Examples.C", SUCCESS)])
+
+    with ResultStore(db_file=db_file) as result_store:
+        assert result_store.get_last_run_id(tool="openmodelica", library="MyLib") == "job_3"
+        assert result_store.get_last_run_id(tool="openmodelica", library="MyLib", option="simulate") == "job_2"
+        assert result_store.get_last_run_id(
+            tool="openmodelica", library="MyLib", option="simulate", package="Components"
+        ) == "job_1"
+        results = result_store.get_last_results(tool="openmodelica", library="MyLib", option="simulate")
+    assert [(result.model, result.status) for result in results] == [
+        ("MyLib.Components.A", SUCCESS), ("MyLib.Components.B", WARNING), ("MyLib.Examples.C", ERROR)
+    ]
+
+
+def test_badge_counts_all_simulated_packages(tmp_path, monkeypatch):
+    db_file = tmp_path.joinpath("results.db")
+    _add_run(db_file, "job_1", "Components", "simulate", [
+        CheckResult("MyLib.Components.A", SUCCESS), CheckResult("MyLib.Components.B", WARNING)
+    ])
+    _add_run(db_file, "job_2", "Examples", "simulate", [
+        CheckResult("MyLib.Examples.C", ERROR), CheckResult("MyLib.Examples.D", SUCCESS)
+    ])
+    _add_run(db_file, "job_3", "Examples", "check", [CheckResult("MyLib.Examples.C", SUCCESS)])
+    monkeypatch.setattr(create_om_badge, "write_badge", lambda badge_name, om_readiness: om_readiness)
+    assert create_om_badge.create_badge_from_result_store(
+        badge_name="badge.svg", library="MyLib", result_store_file=db_file
+    ) == 0.75
+
+
+def test_classify_log_as_exception_loop():
+    result = classify_log(model="MyLib.Components.A", log=LOG, exception_list=EXCEPTIONS, duration=1.5)
+    # Classification of each line with a loop over the exceptions
+    lines = [line for line in LOG.split("\n") if line]
+    assert result.warnings == [line for line in lines if any(exception in line for exception in EXCEPTIONS)]
+    assert result.errors == [line for line in lines if not any(exception in line for exception in EXCEPTIONS)]
+    assert result.errors == ["Warning: Variable a is not used", "Warning: Bad start value: pipe.p"]
+    assert (result.status, result.duration) == (ERROR, 1.5)
+    # Logs of Dymola are lists with the return value of the translation
+    result = classify_log(model="MyLib.Components.A", log=[False, LOG.split("\n")[0], 1], exception_list=EXCEPTIONS)
+    assert (result.status, result.errors) == (WARNING, [])
+    result = classify_log(model="MyLib.Components.A", log=LOG, exception_list=None)
+    assert (result.status, len(result.errors)) == (ERROR, 4)
+
+
+def test_exit_code(tmp_path):
+    db_file = tmp_path.joinpath("results.db")
+    _add_run(db_file, "job_1", "Components", "check", [
+        CheckResult("MyLib.Components.A", SUCCESS),
+        classify_log(model="MyLib.Components.B", log=LOG.split("\n")[0], exception_list=EXCEPTIONS)
+    ])
+    with ResultStore(db_file=db_file, run_id="job_1") as result_store:
+        assert result_store.get_exit_code(tool="openmodelica", library="MyLib", package="Components") == 0
+        result_store.add_results(
+            tool="openmodelica", library="MyLib", package="Components", option="simulate",
+            results=[classify_log(model="MyLib.Components.A", log=LOG, exception_list=EXCEPTIONS)]
+        )
+        assert result_store.get_exit_code(tool="openmodelica", library="MyLib", option="check") == 0
+        assert result_store.get_exit_code(tool="openmodelica", library="MyLib", option="simulate") == 1
+        assert result_store.get_exit_code(tool="openmodelica", library="MyLib", package="Examples") == 0
+    # Exit codes are only of the current run
+    with ResultStore(db_file=db_file, run_id="job_2") as result_store:
+        assert result_store.get_exit_code(tool="openmodelica", library="MyLib") == 0
@@ -0,0 +1,57 @@
+import pytest
+
+from ModelicaPyCI.load_global_config import CI_CONFIG
+from ModelicaPyCI.utils import compile_exceptions
+
+MISSING_TABLE_FILE_LOG = (
+    "Error: Could not open file \"modelica://MyLib/Resources/Data/missing.txt\" of CombiTimeTable table\n"
+    "Error: Not possible to open file \"/builds/MyLib/Resources/Data/missing.txt\": No such file or directory\n"
+    "Error: Permission denied\n"
+    "The license of the Modelica Standard Library is the BSD 3-Clause License"
+)
+LICENSE_LOG = "Error: Failed to check out a license for feature DymolaStandard"
+
+
+def test_missing_table_file_is_not_transient():
+    pattern = compile_exceptions(CI_CONFIG.retry.transient_signatures)
+    assert not any(pattern.search(line) for line in MISSING_TABLE_FILE_LOG.split("\n"))
+    assert pattern.search(LICENSE_LOG)
+
+
+class _FakeDymola:
+
+    def __init__(self, log: str):
+        self.log = log
+        self.n_checks = 0
+
+    def checkModel(self, model, simulate=False):
+        self.n_checks += 1
+        return False
+
+    def getLastError(self):
+        return self.log
+
+
+class _FakeDymolaAPI:
+
+    def __init__(self, log: str):
+        self.dymola = _FakeDymola(log=log)
+
+
+def test_missing_table_file_is_not_retried(monkeypatch):
+    python_dymola_interface = pytest.importorskip("ModelicaPyCI.pydyminterface.python_dymola_interface")
+    monkeypatch.setattr(CI_CONFIG.retry, "backoff_seconds", 0)
+    dymola_api = _FakeDymolaAPI(log=MISSING_TABLE_FILE_LOG)
+    result = python_dymola_interface.check_or_simulate(
+        {"dymola_api": dymola_api, "dym_model": "MyLib.Examples.TableTest", "sim_ex_flag": True}
+    )
+    assert dymola_api.dymola.n_checks == 1
+    assert result.attempts == 1
+    assert result.cacheable
+
+    dymola_api = _FakeDymolaAPI(log=LICENSE_LOG)
+    result = python_dymola_interface.check_or_simulate(
+        {"dymola_api": dymola_api, "dym_model": "MyLib.Examples.TableTest", "sim_ex_flag": True}
+    )
+    assert dymola_api.dymola.n_checks == CI_CONFIG.retry.max_attempts
+    assert not result.cacheable
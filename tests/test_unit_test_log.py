@@ -0,0 +1,46 @@
+import pytest
+
+from ModelicaPyCI.converter.unit_test_log import ModelNameIndex, UnitTestFailure, iter_unit_test_failures
+from test_dependency_graph import write_library
+
+UNIT_TEST_LOG = """*** Error: MyLib_Examples_PipeTest.txt: Errors during result verification.
+  Absolute error = 1.2e-02 at time = 10.0 for pipe.port_a.m_flow
+  Absolute error = 3.4e-01 at time = 20.0 for pipe.T
+*** Warning: MyLib_Examples_ValveTest.txt: Reference file has no data.
+  Absolute error = 1.0e-02 at time = 10.0 for valve.y
+*** Error: MyLib_Examples_Pipe_Test.txt: Errors during result verification.
+  Absolute error = 5.6e-03 at time = 30.0 for pipe.dp
+Number of models with errors: 2
+"""
+
+
+def test_resolve_underscore_model_names(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    library_path = write_library(tmp_path)
+    library_path.joinpath("Examples", "Pipe_Test.mo").write_text(
+        "within MyLib.Examples;\nmodel Pipe_Test\n  extends Modelica.Icons.Example;\nend Pipe_Test;\n"
+    )
+    name_index = ModelNameIndex(model_names=["MyLib.Examples.PipeTest"], library="MyLib")
+    assert name_index.resolve("MyLib_Examples_PipeTest") == "MyLib.Examples.PipeTest"
+    assert name_index.library == "MyLib"
+    # Unknown names are searched in the models of the library
+    assert name_index.resolve("MyLib_Examples_Pipe_Test") == "MyLib.Examples.Pipe_Test"
+    assert name_index.resolve("MyLib_Components_Valve") == "MyLib.Components.Valve"
+    with pytest.raises(KeyError):
+        name_index.resolve("MyLib_Examples_PumpTest")
+
+
+def test_iter_unit_test_failures(tmp_path):
+    log_file = tmp_path.joinpath("unitTests-dymola.log")
+    log_file.write_text(UNIT_TEST_LOG)
+    name_index = ModelNameIndex(model_names=["MyLib.Examples.PipeTest", "MyLib.Examples.Pipe_Test"])
+    failures = list(iter_unit_test_failures(f_log=log_file, name_index=name_index))
+    assert [(failure.model, failure.variable) for failure in failures] == [
+        ("MyLib.Examples.PipeTest", "pipe.port_a.m_flow"),
+        ("MyLib.Examples.PipeTest", "pipe.T"),
+        ("MyLib.Examples.Pipe_Test", "pipe.dp"),
+    ]
+    assert failures[-1] == UnitTestFailure(
+        model="MyLib.Examples.Pipe_Test", variable="pipe.dp",
+        message="Absolute error = 5.6e-03 at time = 30.0 for pipe.dp"
+    )
@@ -0,0 +1,102 @@
+import pytest
+
+from ModelicaPyCI import utils
+from ModelicaPyCI.unittest.result_store import ResultStore
+from ModelicaPyCI.utils import profile
+
+validatetest = pytest.importorskip("ModelicaPyCI.unittest.validatetest")
+python_dymola_interface = pytest.importorskip("ModelicaPyCI.pydyminterface.python_dymola_interface")
+
+PACKAGES = {
+    "Components": ["MyLib.Components.Pipe", "MyLib.Components.Valve"],
+    "Examples": ["MyLib.Examples.PipeTest", "MyLib.Components.Valve"]
+}
+
+
+class _FakeDymola:
+
+    def savelog(self, path):
+        pass
+
+
+class _FakeDymolaAPI:
+    dymola = _FakeDymola()
+
+
+def _parallel_model_check(dymola_api, dym_models, sim_ex_flag, use_mp):
+    results = []
+    for dym_model in dym_models:
+        with profile(dym_model, category="simulate" if sim_ex_flag else "check", tool="dymola"):
+            results.append(python_dymola_interface.ModelCheckResult(result=True, attempts=1, cacheable=True))
+    return results
+
+
+class _FakeResultCache:
+
+    def __init__(self):
+        self.results = {}
+
+    def get(self, model: str, simulate: bool):
+        return self.results.get((model, simulate))
+
+    def set(self, model: str, simulate: bool, result):
+        self.results[(model, simulate)] = result
+
+    def evict(self):
+        pass
+
+
+class _FakeWorkerPool:
+
+    def __init__(self):
+        self.durations = {}
+
+    def check_models(self, dym_models: list, sim_ex_flag: bool):
+        self.durations = {dym_model: 2.0 for dym_model in dym_models}
+        return [python_dymola_interface.ModelCheckResult(result=True, attempts=1, cacheable=True)] * len(dym_models)
+
+
+def _check_packages(tmp_path, worker_pool=None):
+    with ResultStore(db_file=tmp_path.joinpath("results.db"), run_id="job_1") as result_store:
+        check_python_dymola = validatetest.CheckPythonDymola(
+            dymola_api=_FakeDymolaAPI(), library="MyLib", library_package_mo=tmp_path.joinpath("package.mo"),
+            worker_pool=worker_pool, result_cache=_FakeResultCache(), result_store=result_store
+        )
+        durations = {}
+        for package, model_list in PACKAGES.items():
+            error_dict = check_python_dymola.check_dymola_model(check_model_list=model_list)
+            check_python_dymola.store_results(
+                pack=package, options="DYM_CHECK", model_list=model_list, error_dict=error_dict
+            )
+            durations[package] = {
+                result.model: result.duration for result in result_store.get_results(package=package)
+            }
+    return durations
+
+
+def test_durations_of_the_checked_package(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "_PROFILE_EVENTS", [])
+    monkeypatch.setattr(python_dymola_interface, "parallel_model_check", _parallel_model_check)
+    durations = _check_packages(tmp_path)
+    events = {event.name: event.duration for event in utils.get_profile_events() if event.category == "check"}
+    assert durations["Components"] == {
+        "MyLib.Components.Pipe": events["MyLib.Components.Pipe"],
+        "MyLib.Components.Valve": events["MyLib.Components.Valve"]
+    }
+    # The cached result of the Valve has no duration of the check of the other package
+    assert durations["Examples"] == {
+        "MyLib.Examples.PipeTest": events["MyLib.Examples.PipeTest"],
+        "MyLib.Components.Valve": None
+    }
+
+
+def test_durations_of_the_worker_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "_PROFILE_EVENTS", [])
+    # Check of this process, e.g. before the pool was started
+    with profile("MyLib.Components.Valve", category="check", tool="dymola"):
+        pass
+    durations = _check_packages(tmp_path, worker_pool=_FakeWorkerPool())
+    assert durations == {
+        "Components": {"MyLib.Components.Pipe": 2.0, "MyLib.Components.Valve": 2.0},
+        "Examples": {"MyLib.Examples.PipeTest": 2.0, "MyLib.Components.Valve": None}
+    }